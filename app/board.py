@@ -0,0 +1,92 @@
+import asyncio
+import contextvars
+import logging
+
+import discord
+from discord import Embed
+
+from app import constants
+from app.helpers import plist
+
+
+def board_embed(attendees: list[dict], decliners: list[dict], cancellers: list[dict], cancelled: bool) -> Embed:
+    board = {
+        "title": f"{constants.dnd_config.campaign_name} session",
+        "fields": [
+            {"name": "Accepted", "value": plist(attendees)},
+            {"name": "Declined", "value": plist(decliners)},
+            {"name": "Voted to cancel", "value": plist(cancellers)},
+        ],
+    }
+    if cancelled:
+        board["description"] = "The upcoming session has been cancelled!"
+    return Embed.from_dict(board)
+
+
+class SessionBoard:
+    """Keeps one message per guild (the "session board") in its meeting room, listing who has accepted, declined, and
+    voted to cancel the upcoming session
+
+    The board is edited in place as players RSVP, rather than posting a new list every time. Updates are debounced: the
+    first request waits `delay` seconds before the board is redrawn, and any requests made while it waits are covered by
+    that same edit. The board's message ID is stored in the guild's config, and a new board is posted if there isn't one
+    yet (or it was deleted).
+    """
+
+    def __init__(self, tracker, resolver, outbox, delay: float = 2.0):
+        self.tracker = tracker
+        self.resolver = resolver
+        self.outbox = outbox
+        self.delay = delay
+        self._pending: dict[int, asyncio.Task] = {}
+        self._requested: set[int] = set()
+
+    def request_update(self, guild_id: int) -> asyncio.Task:
+        """Redraws the guild's board after `delay` seconds, unless a redraw is already waiting to happen"""
+        self._requested.add(guild_id)
+        if guild_id not in self._pending:
+            # In a context of its own, rather than a copy of the command's (and its db trace, see `app.db.tracing`)
+            self._pending[guild_id] = asyncio.create_task(self._debounce(guild_id), context=contextvars.Context())
+        return self._pending[guild_id]
+
+    async def _debounce(self, guild_id: int) -> None:
+        try:
+            while guild_id in self._requested:
+                await asyncio.sleep(self.delay)
+                # Requests from here on need another redraw, since this one may have already read the lists
+                self._requested.discard(guild_id)
+                try:
+                    await self.render(guild_id)
+                except Exception:
+                    logging.exception(f"Couldn't update the session board of guild {guild_id}")
+        finally:
+            del self._pending[guild_id]
+
+    async def render(self, guild_id: int):
+        """Draws the guild's board right away, editing the existing message or posting a new one
+
+        :param guild_id: (int) The guild to draw the board for
+        :return: The board message, or None if the guild isn't configured
+        """
+        config = await self.tracker.get_config_for_guild(guild_id)
+        if config is None:
+            return None
+
+        attendees, decliners, cancellers = await self.tracker.get_all(guild_id)
+        embed = board_embed(attendees, decliners, cancellers, config.cancel_session)
+        channel = await self.resolver.channel(config.meeting_room)
+
+        if message_id := config.board_message:
+            try:
+                return await self.outbox.edit(channel.get_partial_message(message_id), embed=embed)
+            except discord.NotFound:
+                logging.info(f"The session board of guild {guild_id} was deleted, posting a new one")
+
+        message = await self.outbox.send(channel, embed=embed)
+        await self.tracker.set_board_message(guild_id, message.id)
+        return message
+
+    async def flush(self) -> None:
+        """Waits for every pending board update"""
+        while self._pending:
+            await asyncio.gather(*self._pending.values(), return_exceptions=True)
@@ -0,0 +1,300 @@
+import logging
+from datetime import datetime
+
+import discord
+from discord import Embed, ScheduledEvent, app_commands
+from discord.ext import commands
+from discord.ext.commands import Context
+
+from app import constants, helpers
+from app.helpers import plist
+from app.inventory import InventoryError, parse_items
+from app.pages import Paginator, sliced
+from app.wizard import ConfigWizard
+
+
+class SessionCog(commands.Cog):
+    """The bot's commands, bound to the services an `App` wires together (see `app.factory`)"""
+
+    def __init__(self, app):
+        self.bot = app.bot
+        self.settings = app.settings
+        self.db_client = app.db_client
+        self.outbox = app.outbox
+        self.health = app.health
+        self.board = app.board
+        self.dispatcher = app.dispatcher
+        self.scheduler = app.scheduler
+        self.start_time = app.start_time
+
+    # Events
+    @commands.Cog.listener()
+    async def on_ready(self):
+        logging.debug(f"[{self.start_time}] - Logged in as {self.bot.user.name} - {self.bot.user.id}")
+        # on_ready fires again on every reconnect, but the scheduler only needs to be started once
+        self.scheduler.start()
+
+    # Commands
+    @commands.command()
+    async def status(self, ctx: Context):
+        # Answered from the health monitor's latest background ping, so this never waits on the database
+        health_stats = self.health.stats()
+        latency = ""
+        if health_stats["latency_p50"]:
+            p50, p95 = health_stats["latency_p50"] * 1000, health_stats["latency_p95"] * 1000
+            latency = f" (ping p50 {p50:.0f}ms, p95 {p95:.0f}ms)"
+        uptime = helpers.current_time() - self.start_time
+        eastern_time = datetime.now(constants.eastern_tz).strftime("%T")
+        await self.outbox.send(
+            ctx.message.channel,
+            f"Up for **{uptime}** on `{self.health.build.commit}`. Time is {eastern_time} eastern. "
+            f"Database is **{self.health.db_status}**{latency}.",
+        )
+
+    @commands.command()
+    async def config(self, ctx: Context):
+        """Starts the config of the bot. Asks for the session day, when to send the first alert, when to send the second
+        alert, and the session time, all in one message.
+
+        :param ctx: Context of the discord bot
+        :return:
+        """
+        wizard = ConfigWizard(ctx.author)
+        my_message = await self.outbox.send(ctx.message.channel, "Configure the session, then hit Save:", view=wizard)
+        await wizard.wait()
+        await my_message.delete()
+        if not wizard.saved:
+            await self.outbox.send(ctx.message.channel, "Fail! Configure faster!")
+            return
+
+        session_vc_id = discord.utils.get(ctx.guild.voice_channels, name=self.settings.discord.voice_channel)
+        session_vc_id = session_vc_id.id
+        bot_config = wizard.answers
+        await self.db_client.create_guild_config(
+            guild_id=ctx.guild.id,
+            voice_channel_id=session_vc_id,
+            dm_username=ctx.author.name,
+            dm_id=ctx.author.id,
+            session_day=bot_config["session-day"],
+            session_time=bot_config["session-time"],
+            meeting_room=ctx.message.channel.id,
+            first_alert=bot_config["first-alert"],
+            second_alert=bot_config["second-alert"],
+        )
+        await self.scheduler.reschedule(ctx.guild.id)
+        await self.outbox.send(ctx.message.channel, "Config saved!")
+
+    @commands.command()
+    async def unconfig(self, ctx: Context):
+        await self.db_client.rm_guild_config(ctx.guild.id)
+        self.scheduler.unschedule(ctx.guild.id)
+        await self.outbox.react(ctx.message, "👋")
+
+    @commands.command()
+    async def register(self, ctx: Context):
+        await self.db_client.register_player(
+            guild_id=ctx.guild.id, player_username=ctx.author.name, player_id=ctx.author.id
+        )
+        await self.outbox.react(ctx.message, "✅")
+
+    @commands.command()
+    async def players(self, ctx: Context):
+        players = await self.db_client.get_players_for_guild(ctx.guild.id)
+        if not players:
+            await self.outbox.send(ctx.message.channel, "No players registered!")
+        else:
+            pages = Paginator(
+                ctx.author,
+                "Registered Players",
+                sliced(players),
+                lambda page: [{"name": player.name, "value": f"ID: {player.id}"} for player in page],
+                total=len(players),
+            )
+            await self._send_pages(ctx, pages)
+
+    @commands.command()
+    async def cmds(self, ctx: Context):
+        await self.outbox.send(
+            ctx.message.channel,
+            embed=Embed().from_dict(
+                {
+                    "title": "Available Commands",
+                    "fields": [{"name": cmd.name, "value": f"`{cmd.name}`"} for cmd in self.bot.commands],
+                }
+            ),
+        )
+
+    @commands.command()
+    async def reset(self, ctx: Context):
+        await self.db_client.reset(ctx.guild.id)
+        await self.outbox.react(ctx.message, "✅")
+
+    @commands.command()
+    async def alert(self, ctx: Context):
+        # Send today's alerts right away, regardless of the scheduled time
+        await self.dispatcher.dispatch(datetime.now(constants.eastern_tz).weekday())
+
+    @commands.command(name="list")
+    async def list_(self, ctx: Context):
+        lists = await self.db_client.get_all(ctx.guild.id)
+
+        # Each page has up to a page's worth of names from each list, which keeps every field under its 1024 characters
+        async def fetch(skip: int, limit: int):
+            return [users[skip : skip + limit] for users in lists]
+
+        def render(page):
+            accept, decline, cancel = page
+            return [
+                {"name": "Accepted", "value": plist(accept)},
+                {"name": "Declined", "value": plist(decline)},
+                {"name": "Cancelled", "value": plist(cancel)},
+            ]
+
+        await self._send_pages(ctx, Paginator(ctx.author, "Lists", fetch, render, total=max(map(len, lists))))
+
+    @commands.command()
+    async def cancel(self, ctx: Context):
+        guild_id = ctx.guild.id
+        player_id = ctx.author.id
+
+        # If player calling command isn't DM, then tell them so and return
+        if not await self.db_client.is_player_dm(guild_id, player_id):
+            await self.outbox.reply(ctx.message, "Sorry this is a DM-only command. Have the DM run this instead")
+            return
+
+        was_cancelled = await self.db_client.cancel_session(guild_id)
+        if was_cancelled:
+            await self.scheduler.reschedule(guild_id)
+            self.board.request_update(guild_id)
+            await self.outbox.send(ctx.message.channel, "The upcoming session has been cancelled!")
+        else:
+            await self.outbox.reply(ctx.message, "Ran into an error cancelling the session. Please try again")
+
+    # Support rsvp [accept|decline]
+    @commands.group()
+    async def rsvp(self, ctx: Context):
+        if ctx.invoked_subcommand is None:
+            prefix = self.settings.discord.bot_prefix
+            await self.outbox.reply(ctx.message, f"Please use either `{prefix}rsvp accept` or `{prefix}rsvp decline`.")
+
+    @rsvp.command(name="accept")
+    async def _accept(self, ctx: Context):
+        guild_id = ctx.guild.id
+        if await self.db_client.is_session_cancelled(guild_id):
+            await self.outbox.reply(ctx.message, "The upcoming session has been cancelled, so no need to RSVP")
+            return
+
+        if not await self.db_client.is_registered_player(ctx.guild.id, ctx.author):
+            await self.outbox.reply(
+                ctx.message, "You are not a registered player in this campaign, so you can not rsvp"
+            )
+        else:
+            await self.db_client.accept_for_guild(ctx.guild.id, ctx.author)
+            await self.outbox.react(ctx.message, "✅")
+            self.board.request_update(guild_id)
+
+        if await self.db_client.is_full_group(ctx.guild.id):
+            sess_event = await self._create_session_event(ctx)
+            await self.outbox.send(
+                ctx.message.channel,
+                f"All players have confirmed attendance, so I've automatically created an event: {sess_event.url}",
+            )
+
+    @rsvp.command(name="decline")
+    async def _decline(self, ctx: Context):
+        guild_id = ctx.guild.id
+        if await self.db_client.is_session_cancelled(guild_id):
+            await self.outbox.reply(ctx.message, "The upcoming session has been cancelled, so no need to RSVP")
+            return
+
+        if not await self.db_client.is_registered_player(ctx.guild.id, ctx.author):
+            await self.outbox.reply(ctx.message, "You are not a registered player in this campaign so you can not rsvp")
+        else:
+            await self.db_client.decline_for_guild(ctx.guild.id, ctx.author)
+            await self.outbox.react(ctx.message, "👋")
+            self.board.request_update(guild_id)
+
+    # Support vote [cancel]
+    @commands.group()
+    async def vote(self, ctx: Context):
+        if ctx.invoked_subcommand is None:
+            await self.outbox.send(ctx.message.channel, f"Please `{self.settings.discord.bot_prefix}vote cancel`")
+
+    @vote.command(name="cancel")
+    async def _vote_cancel(self, ctx: Context):
+        await self.db_client.add_canceller_for_guild(ctx.guild.id, ctx.author)
+        await self.outbox.react(ctx.message, "✅")
+        self.board.request_update(ctx.guild.id)
+
+    # Support inv [add|remove|update]
+    @commands.group(invoke_without_command=True)
+    async def inv(self, ctx: Context):
+        guild_id, player_id = ctx.guild.id, ctx.author.id
+        total = await self.db_client.count_inventory(guild_id, player_id)
+        if not total:
+            await self.outbox.reply(ctx.message, "Your inventory is empty!")
+            return
+
+        # Each page is its own skip/limit query, so a large inventory is never loaded all at once
+        async def fetch(skip: int, limit: int):
+            return await self.db_client.get_inventory(guild_id, player_id, skip=skip, limit=limit)
+
+        pages = Paginator(
+            ctx.author,
+            f"{ctx.author.name}'s Inventory",
+            fetch,
+            lambda items: [{"name": item.name, "value": f"x{item.qty}", "inline": True} for item in items],
+            total=total,
+        )
+        await self._send_pages(ctx, pages)
+
+    @inv.command(name="add")
+    async def _inv_add(self, ctx: Context, *, items: str):
+        await self._change_inventory(ctx, self.db_client.add_items, items, min_qty=1)
+
+    @inv.command(name="update")
+    async def _inv_update(self, ctx: Context, *, items: str):
+        await self._change_inventory(ctx, self.db_client.update_items, items, min_qty=0)
+
+    @inv.command(name="remove")
+    async def _inv_remove(self, ctx: Context, *, items: str):
+        names = [name for name in items.split(",") if name.strip()]
+        if not await self.db_client.remove_items(ctx.guild.id, ctx.author.id, names):
+            await self.outbox.reply(ctx.message, "None of those items are in your inventory")
+            return
+        await self.outbox.react(ctx.message, "✅")
+
+    async def _change_inventory(self, ctx: Context, change, items: str, min_qty: int):
+        try:
+            parsed = parse_items(items, min_qty=min_qty)
+        except InventoryError as e:
+            await self.outbox.reply(ctx.message, str(e))
+            return
+        # All the items go out as one bulk write, however many were given
+        await change(ctx.guild.id, ctx.author.id, parsed)
+        await self.outbox.react(ctx.message, "✅")
+
+    async def _send_pages(self, ctx: Context, pages: Paginator):
+        embed = await pages.embed()
+        if pages.pages == 1:
+            # Nothing to turn, so no buttons
+            await self.outbox.send(ctx.message.channel, embed=embed)
+            return
+        pages.message = await self.outbox.send(ctx.message.channel, embed=embed, view=pages)
+
+    @app_commands.checks.bot_has_permissions(manage_events=True)
+    async def _create_session_event(self, ctx: Context) -> ScheduledEvent:
+        server_id = ctx.guild.id
+        session_vc_id = await self.db_client.get_voice_channel_id(server_id)
+        session_vc = self.bot.get_channel(session_vc_id)
+        # Get details about session in order to create a discord event
+        sess_day, sess_time = await self.db_client.get_campaign_session_dt(server_id)
+        next_sess = helpers.get_next_session_day(sess_day, sess_time)
+        return await ctx.guild.create_scheduled_event(
+            name=f"{self.settings.dnd.campaign_name} Session!",
+            description=f"Regular {self.settings.dnd.campaign_alias} session",
+            start_time=next_sess,
+            channel=session_vc,
+            entity_type=discord.EntityType.voice,
+            reason="D&D Session",
+        )
@@ -1,15 +1,24 @@
+from __future__ import annotations
+
 import urllib.parse
+from contextlib import contextmanager
 from dataclasses import dataclass, field
 from enum import Enum, unique
 from io import StringIO
+from typing import TYPE_CHECKING, Iterator
 
 from decouple import config
-from discord import Intents
 from pytz import timezone
 
+if TYPE_CHECKING:
+    from discord import Intents
+
 
 # ======== Discord ========
-def declare_intents():
+def declare_intents() -> Intents:
+    # discord is only imported once the intents are needed, since it's slow to import
+    from discord import Intents
+
     intents = Intents.all()
     intents.members = True
     intents.message_content = True
@@ -23,18 +32,23 @@ class DiscordConfig:
     bot_desc: str
     alert_time: int
     voice_channel: str
+    alert_concurrency: int = 10
+    alert_timeout: float = 30.0
     bot_intents: Intents = field(default_factory=declare_intents)
 
 
-# Read in env vars to make sure they exist
-__token = config("discordToken")
-__bot_prefix = config("botPrefix", default="!")
-__bot_descr = config("botDescr", default="A bot to assist with hearding players for D&D sessions.")
-__alert_time = config("alertTime", default="12", cast=int)
-__discord_vc = config("discordVC")
+def load_discord_config() -> DiscordConfig:
+    # Read in env vars to make sure they exist
+    token = config("discordToken")
+    bot_prefix = config("botPrefix", default="!")
+    bot_descr = config("botDescr", default="A bot to assist with hearding players for D&D sessions.")
+    alert_time = config("alertTime", default="12", cast=int)
+    discord_vc = config("discordVC")
+    alert_concurrency = config("alertConcurrency", default="10", cast=int)
+    alert_timeout = config("alertTimeout", default="30", cast=float)
 
-# Create discord config dataclass
-discord_config = DiscordConfig(__token, __bot_prefix, __bot_descr, __alert_time, __discord_vc)
+    # Create discord config dataclass
+    return DiscordConfig(token, bot_prefix, bot_descr, alert_time, discord_vc, alert_concurrency, alert_timeout)
 
 
 # ======== Database ========
@@ -87,6 +101,7 @@ class Collections(str, Enum):
     CONFIG = "config"
     PLAYERS = "players"
     CANCEL_SESSION = "cancel-session"
+    GUILD_STATE = "guild-state"
 
 
 @dataclass
@@ -96,31 +111,64 @@ class DatabaseConfig:
     user: str
     password: str
     db_name: str
+    backend: str = "mongoengine"
+    cache_size: int = 1024
+    cache_ttl: float = 300.0
+    max_pool_size: int = 50
+    min_pool_size: int = 2
+    server_selection_timeout: float = 5.0
+    connect_timeout: float = 10.0
+    socket_timeout: float = 20.0
+    compressors: str = "zstd,snappy,zlib"
+    read_preference: str = "primary"
     connection_str: str = ""
-
-
-# Connection vars
-__db_host = config("dbHost")
-__db_port = config("dbPort", cast=int)
-__db_user = config("dbUser")
-__db_password = config("dbPassword")
-__db_name = config("dbName", default="dnd-bot")
-__db_dialect = "mongodb+srv"
-__db_options = {"retrywrites": "true", "w": "majority"}
-
-# Create db config dataclass
-db_config = DatabaseConfig(__db_host, __db_port, __db_user, __db_password, __db_name)
-
-# give db config a connection str attribute
-db_config.connection_str = __create_connect_str(
-    username=__db_user,
-    password=__db_password,
-    host=__db_host,
-    port=__db_port,
-    database=__db_name,
-    dialect=__db_dialect,
-    **__db_options,
-)
+    # Log the storage calls of each command (see `app.db.tracing`), and any call slower than the threshold (seconds)
+    trace: bool = False
+    slow_call_threshold: float = 0.1
+
+
+def load_db_config() -> DatabaseConfig:
+    # Connection vars
+    db_host = config("dbHost")
+    db_port = config("dbPort", cast=int)
+    db_user = config("dbUser")
+    db_password = config("dbPassword")
+    db_name = config("dbName", default="dnd-bot")
+    db_dialect = "mongodb+srv"
+    db_options = {"retrywrites": "true", "w": "majority"}
+
+    # Create db config dataclass
+    db_config = DatabaseConfig(
+        db_host,
+        db_port,
+        db_user,
+        db_password,
+        db_name,
+        backend=config("dbBackend", default="mongoengine"),
+        cache_size=config("dbCacheSize", default="1024", cast=int),
+        cache_ttl=config("dbCacheTTL", default="300", cast=float),
+        max_pool_size=config("dbMaxPoolSize", default="50", cast=int),
+        min_pool_size=config("dbMinPoolSize", default="2", cast=int),
+        server_selection_timeout=config("dbServerSelectionTimeout", default="5", cast=float),
+        connect_timeout=config("dbConnectTimeout", default="10", cast=float),
+        socket_timeout=config("dbSocketTimeout", default="20", cast=float),
+        compressors=config("dbCompressors", default="zstd,snappy,zlib"),
+        read_preference=config("dbReadPreference", default="primary"),
+        trace=config("dbTrace", default="false", cast=bool),
+        slow_call_threshold=config("dbSlowCallMs", default="100", cast=float) / 1000,
+    )
+
+    # give db config a connection str attribute
+    db_config.connection_str = __create_connect_str(
+        username=db_user,
+        password=db_password,
+        host=db_host,
+        port=db_port,
+        database=db_name,
+        dialect=db_dialect,
+        **db_options,
+    )
+    return db_config
 
 
 # ======== D&D ========
@@ -130,11 +178,76 @@ class DndConfig:
     campaign_alias: str
 
 
-__campaign_name = config("campaignName", default="D&D")
-__campaign_alias = config("campaignAlias", default=__campaign_name)
+def load_dnd_config() -> DndConfig:
+    campaign_name = config("campaignName", default="D&D")
+    campaign_alias = config("campaignAlias", default=campaign_name)
+
+    # Create d&d config dataclass
+    return DndConfig(campaign_name, campaign_alias)
+
+
+# ======== Metrics ========
+@dataclass
+class MetricsConfig:
+    host: str = "127.0.0.1"
+    # 0 turns the metrics endpoint off
+    port: int = 9464
+
+
+def load_metrics_config() -> MetricsConfig:
+    return MetricsConfig(
+        host=config("metricsHost", default="127.0.0.1"),
+        port=config("metricsPort", default="9464", cast=int),
+    )
+
+
+# ======== Settings ========
+@dataclass
+class Settings:
+    discord: DiscordConfig
+    db: DatabaseConfig
+    dnd: DndConfig
+    metrics: MetricsConfig = field(default_factory=MetricsConfig)
+
+
+def load_settings() -> Settings:
+    """Reads every setting from the environment (or `.env`)"""
+    return Settings(load_discord_config(), load_db_config(), load_dnd_config(), load_metrics_config())
+
+
+_settings: Settings | None = None
+
+
+def get_settings() -> Settings:
+    """The app's settings, read from the environment the first time they're needed rather than at import"""
+    global _settings
+    if _settings is None:
+        _settings = load_settings()
+    return _settings
+
+
+@contextmanager
+def override_settings(settings: Settings) -> Iterator[Settings]:
+    """Swaps in `settings` (e.g. for a test) until the block exits"""
+    global _settings
+    previous, _settings = _settings, settings
+    try:
+        yield settings
+    finally:
+        _settings = previous
+
+
+def __getattr__(name: str):
+    # `discord_config`, `db_config`, and `dnd_config` are read lazily from the settings
+    match name:
+        case "discord_config":
+            return get_settings().discord
+        case "db_config":
+            return get_settings().db
+        case "dnd_config":
+            return get_settings().dnd
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-# Create d&d config dataclass
-dnd_config = DndConfig(__campaign_name, __campaign_alias)
 
 # ======== Common ========
 eastern_tz = timezone("US/Eastern")
@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from app.db.base_db import BaseDB
+
+if TYPE_CHECKING:
+    from app.db.connection import ConnectionManager
+
+
+def create_db(backend: str, connections: ConnectionManager = None) -> BaseDB:
+    """Creates the BaseDB implementation picked by the `dbBackend` setting
+
+    :param backend: (str) One of `async` (pymongo asyncio client), `mongoengine` (one collection per list), or
+        `guild-state` (one document per guild)
+    :param connections: (ConnectionManager) Creates the backend's connection. Defaults to one built from `db_config`
+    :return: (BaseDB) The storage backend, not yet connected
+    """
+    match backend:
+        case "async":
+            from app.db.mongo_async import AsyncMongo
+
+            return AsyncMongo(connections=connections)
+        case "mongoengine":
+            from app.db.mongo_odm import MongoEngine
+
+            return MongoEngine(connections)
+        case "guild-state":
+            from app.db.guild_state import GuildStateEngine
+
+            return GuildStateEngine(connections)
+        case _:
+            raise ValueError(f"Unknown database backend: {backend}")
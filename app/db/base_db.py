@@ -8,6 +8,25 @@ class BaseDB(metaclass=abc.ABCMeta):
     def connect(self, conn_str: str = None):
         pass
 
+    @abstractmethod
+    def close(self):
+        """Closes the backend's connection, along with its pooled connections"""
+        pass
+
+    @abstractmethod
+    def ping(self):
+        """Round-trips a ping to the database over the backend's existing connection, raising if it can't be reached"""
+        pass
+
+    @abstractmethod
+    def ensure_indexes(self):
+        pass
+
+    @abstractmethod
+    def index_report(self) -> dict[str, dict]:
+        """Lists the missing and unused indexes of each collection the backend uses"""
+        pass
+
     @abstractmethod
     def _get_user(self, user):
         pass
@@ -29,6 +48,16 @@ class BaseDB(metaclass=abc.ABCMeta):
     def rm_attendee_for_guild(self, guild_id: int, attendee):
         pass
 
+    @abstractmethod
+    def accept_for_guild(self, guild_id: int, attendee) -> list[dict]:
+        """Moves a user into the attendee list (and out of the decliner list), returning the updated attendees"""
+        pass
+
+    @abstractmethod
+    def decline_for_guild(self, guild_id: int, decliner) -> list[dict]:
+        """Moves a user into the decliner list (and out of the attendee list), returning the updated decliners"""
+        pass
+
     @abstractmethod
     def get_decliners_for_guild(self, guild_id: int) -> list[dict]:
         pass
@@ -41,10 +70,22 @@ class BaseDB(metaclass=abc.ABCMeta):
     def get_config_for_guild(self, guild_id: int):
         pass
 
+    @abstractmethod
+    def get_config_fields(self, guild_id: int, *fields: str) -> dict:
+        """Reads only the given settings of a guild's config (by their stored names, e.g. "vc-id"), rather than the
+        whole document. Returns the settings that are set, or {} if the guild has no config"""
+        pass
+
     @abstractmethod
     def get_players_for_guild(self, guild_id: int) -> list[dict]:
         pass
 
+    @abstractmethod
+    def get_rsvp_state_for_guilds(self, guild_ids: list[int]) -> dict[int, dict]:
+        """Fetches the players, attendees, decliners and config of many guilds at once (see `helpers.rsvp_states`),
+        with a fixed number of queries however many guilds there are"""
+        pass
+
     @abstractmethod
     def get_gm_for_guild(self, guild_id: int):
         pass
@@ -55,14 +96,23 @@ class BaseDB(metaclass=abc.ABCMeta):
 
     @abstractmethod
     def reset(self, guild_id: int):
+        """Clears the RSVP lists, the cancel flag, and the session board message, ready for the next session"""
+        pass
+
+    @abstractmethod
+    def reset_guilds(self, guild_ids: list[int]) -> int:
+        """Resets many guilds at once (see `reset`), with a fixed number of writes however many guilds there are.
+        Returns the number of guilds that were found and reset"""
         pass
 
     @abstractmethod
     def cancel_session(self, guild_id: int) -> bool:
+        """Sets the cancel flag, returning the flag as written (from the same round-trip as the write)"""
         pass
 
     @abstractmethod
     def reset_cancel_flag(self, guild_id: int) -> bool:
+        """Clears the cancel flag, returning the flag as written (from the same round-trip as the write)"""
         pass
 
     @abstractmethod
@@ -91,17 +141,17 @@ class BaseDB(metaclass=abc.ABCMeta):
 
     @abstractmethod
     def create_guild_config(
-            self,
-            guild_id: int,
-            voice_channel_id: int,
-            dm_username: str,
-            dm_id: int,
-            session_day: str,
-            session_time: str,
-            meeting_room: int,
-            first_alert: str,
-            second_alert: str,
-            cancel_session: bool = False
+        self,
+        guild_id: int,
+        voice_channel_id: int,
+        dm_username: str,
+        dm_id: int,
+        session_day: str,
+        session_time: str,
+        meeting_room: int,
+        first_alert: str,
+        second_alert: str,
+        cancel_session: bool = False,
     ):
         pass
 
@@ -109,6 +159,11 @@ class BaseDB(metaclass=abc.ABCMeta):
     def rm_guild_config(self, guild_id: int):
         pass
 
+    @abstractmethod
+    def set_board_message(self, guild_id: int, message_id: int | None):
+        """Stores the ID of the guild's session board message in its config, or removes it if `message_id` is None"""
+        pass
+
     @abstractmethod
     def get_first_alert_configs(self, day_of_the_week: int):
         pass
@@ -138,8 +193,7 @@ class BaseDB(metaclass=abc.ABCMeta):
         pass
 
     @abstractmethod
-    def \
-            is_full_group(self, guild_id: int) -> bool:
+    def is_full_group(self, guild_id: int) -> bool:
         pass
 
     @abstractmethod
@@ -157,3 +211,27 @@ class BaseDB(metaclass=abc.ABCMeta):
     @abstractmethod
     def get_unanswered_players(self, guild_id: int):
         pass
+
+    # Inventories: one document per (guild, player, item), so changes only touch the items they name
+    @abstractmethod
+    def get_inventory(self, guild_id: int, player_id: int, skip: int = 0, limit: int = 0) -> list[dict]:
+        """A page of a player's inventory, sorted by item, as `{"name", "qty"}` dicts. A `limit` of 0 means no limit"""
+        pass
+
+    @abstractmethod
+    def count_inventory(self, guild_id: int, player_id: int) -> int:
+        pass
+
+    @abstractmethod
+    def add_items(self, guild_id: int, player_id: int, items: list) -> int:
+        """Adds the `InventoryItem` quantities in one bulk write, returning how many items were added or changed"""
+        pass
+
+    @abstractmethod
+    def update_items(self, guild_id: int, player_id: int, items: list) -> int:
+        """Sets the `InventoryItem` quantities (0 removes the item) in one bulk write, returning how many changed"""
+        pass
+
+    @abstractmethod
+    def remove_items(self, guild_id: int, player_id: int, names: list[str]) -> int:
+        pass
@@ -0,0 +1,117 @@
+import importlib.util
+import logging
+from collections import Counter
+
+import mongoengine
+from pymongo import AsyncMongoClient, MongoClient
+from pymongo.monitoring import ConnectionPoolListener
+
+from app import constants
+from app.constants import DatabaseConfig
+
+# Compressors that need an optional package, and the module that provides each one
+_COMPRESSOR_MODULES = {"zstd": "zstandard", "snappy": "snappy"}
+
+
+def available_compressors(compressors: str) -> list[str]:
+    """Filters a comma separated list of wire compressors down to the ones that can be used in this environment"""
+    available = []
+    for compressor in filter(None, (c.strip() for c in compressors.split(","))):
+        module = _COMPRESSOR_MODULES.get(compressor)
+        if module is None or importlib.util.find_spec(module) is not None:
+            available.append(compressor)
+        else:
+            logging.debug(f"Skipping {compressor} compression, since {module} isn't installed")
+    return available
+
+
+class PoolStats(ConnectionPoolListener):
+    """Counts connection pool events, since pymongo doesn't expose its pools' state directly"""
+
+    def __init__(self):
+        self.events: Counter[str] = Counter()
+
+    @property
+    def open(self) -> int:
+        return self.events["created"] - self.events["closed"]
+
+    @property
+    def in_use(self) -> int:
+        return self.events["checked_out"] - self.events["checked_in"]
+
+    def stats(self) -> dict:
+        return {"open": self.open, "in_use": self.in_use, **self.events}
+
+    def pool_created(self, event):
+        self.events["pools"] += 1
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self.events["cleared"] += 1
+
+    def pool_closed(self, event):
+        self.events["pools"] -= 1
+
+    def connection_created(self, event):
+        self.events["created"] += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self.events["closed"] += 1
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self.events["check_out_failed"] += 1
+
+    def connection_checked_out(self, event):
+        self.events["checked_out"] += 1
+
+    def connection_checked_in(self, event):
+        self.events["checked_in"] += 1
+
+
+class ConnectionManager:
+    """Creates the backends' connections to mongo, and keeps track of their pools
+
+    Pool size, timeouts, compression, and read preference come from `DatabaseConfig` (see `app.constants`), and are
+    applied the same way whether the connection is mongoengine's default connection or an `AsyncMongoClient`.
+    """
+
+    def __init__(self, config: DatabaseConfig = None, listeners: list = ()):
+        self.config = config if config is not None else constants.db_config
+        self.pool = PoolStats()
+        # Extra pymongo event listeners (e.g. `tracing.CommandCounter`), added to every client
+        self.listeners = list(listeners)
+
+    def client_options(self) -> dict:
+        """The keyword arguments every MongoClient (sync or async) is created with"""
+        options = {
+            "maxPoolSize": self.config.max_pool_size,
+            "minPoolSize": self.config.min_pool_size,
+            "serverSelectionTimeoutMS": int(self.config.server_selection_timeout * 1000),
+            "connectTimeoutMS": int(self.config.connect_timeout * 1000),
+            "socketTimeoutMS": int(self.config.socket_timeout * 1000),
+            "readPreference": self.config.read_preference,
+            "retryReads": True,
+            "event_listeners": [self.pool, *self.listeners],
+        }
+        if compressors := available_compressors(self.config.compressors):
+            options["compressors"] = ",".join(compressors)
+        return options
+
+    def connect_mongoengine(self, conn_str: str = None, **kwargs) -> MongoClient:
+        """Registers mongoengine's default connection"""
+        return mongoengine.connect(host=conn_str or self.config.connection_str, **self.client_options(), **kwargs)
+
+    def async_client(self, conn_str: str = None, **kwargs) -> AsyncMongoClient:
+        """Creates the asyncio client. It doesn't do any I/O until the first command"""
+        return AsyncMongoClient(conn_str or self.config.connection_str, **self.client_options(), **kwargs)
+
+    def pool_stats(self) -> dict:
+        return self.pool.stats()
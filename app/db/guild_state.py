@@ -0,0 +1,271 @@
+import mongoengine
+from pymongo import ReturnDocument
+
+from app import helpers
+from app.db import indexes, inventory
+from app.db.base_db import BaseDB
+from app.db.connection import ConnectionManager
+from app.model.dao import GuildState, Inventory, User, _Config
+
+
+class GuildStateEngine(BaseDB):
+    """BaseDB implementation that keeps each guild's roster, RSVP lists, cancel votes, and config in one `GuildState`
+    document, so every RSVP-path query is a single read
+
+    Existing data in the per-list collections can be moved over with `python -m app.db.migrate_guild_state`.
+    """
+
+    def __init__(self, connections: ConnectionManager = None):
+        self.connections = connections if connections is not None else ConnectionManager()
+
+    def connect(self, conn_str: str = None):
+        self.connections.connect_mongoengine(conn_str)
+
+    def close(self):
+        mongoengine.disconnect()
+
+    def ping(self):
+        mongoengine.get_connection().admin.command("ping")
+
+    def ensure_indexes(self):
+        indexes.ensure_document_indexes(indexes.GUILD_STATE_DOCUMENTS)
+
+    def index_report(self) -> dict[str, dict]:
+        return indexes.document_index_report(indexes.GUILD_STATE_DOCUMENTS)
+
+    def _get_state_by_guild_id(self, guild_id: int, *fields: str) -> GuildState:
+        res = GuildState.objects(guild=guild_id)
+        if fields:
+            res = res.only(*fields)
+        return res.first() or GuildState(guild=guild_id)
+
+    def _get_raw_state(self, guild_id: int, *fields: str) -> dict:
+        # Only `fields`, as the dict pymongo returns, for reads that just pass the lists on (no Document is built)
+        return GuildState.objects(guild=guild_id).only(*fields).exclude("id").as_pymongo().first() or {}
+
+    def _update_state(self, guild_id: int, **update):
+        GuildState.objects(guild=guild_id).update_one(upsert=True, **update)
+
+    def _move_user(self, guild_id: int, user, to_field: str, from_field: str) -> list[dict]:
+        # Returns the post-image of `to_field`, as the dicts pymongo returns, from the same round-trip as the write
+        res = GuildState._get_collection().find_one_and_update(
+            {"guild": guild_id},
+            {"$addToSet": {to_field: {"name": user.name, "id": user.id}}, "$pull": {from_field: {"id": user.id}}},
+            projection={"_id": 0, to_field: 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        return res.get(to_field, [])
+
+    def get_all(self, guild_id: int) -> tuple:
+        state = self._get_raw_state(guild_id, "attendees", "decliners", "cancellers")
+        return state.get("attendees", []), state.get("decliners", []), state.get("cancellers", [])
+
+    def _get_user(self, user: User):
+        return helpers.doc_to_dict(user)
+
+    # ============ Players ============
+    def get_players_for_guild(self, guild_id: int) -> list[dict]:
+        return self._get_raw_state(guild_id, "players").get("players", [])
+
+    def get_rsvp_state_for_guilds(self, guild_ids: list[int]) -> dict[int, dict]:
+        # Everything is in the one document, so this is a single $in query
+        guild_ids = list(guild_ids)
+        states = list(GuildState.objects(guild__in=guild_ids).only("guild", *helpers.RSVP_LISTS, "config").as_pymongo())
+        configs = [
+            {"_id": state["_id"], "guild": state["guild"], "config": state["config"]}
+            for state in states
+            if state.get("config")
+        ]
+        return helpers.rsvp_states(guild_ids, {field: states for field in helpers.RSVP_LISTS}, configs)
+
+    def add_player_for_guild(self, guild_id: int, player):
+        self._update_state(guild_id, add_to_set__players=User(name=player.name, id=player.id))
+
+    def rm_player_for_guild(self, guild_id: int, player):
+        self._update_state(guild_id, pull__players__id=player.id)
+
+    def register_player(self, guild_id: int, player_username: str, player_id: int):
+        self._update_state(guild_id, add_to_set__players=User(name=player_username, id=player_id))
+
+    def unregister_player(self, guild_id: int, player):
+        pass
+
+    def is_full_group(self, guild_id: int) -> bool:
+        state = self._get_raw_state(guild_id, "players", "attendees")
+        players = state.get("players", [])
+        attendees = state.get("attendees", [])
+        return helpers.all_players_attending(players, attendees)
+
+    def is_registered_player(self, guild_id: int, player) -> bool:
+        return GuildState.objects(guild=guild_id, players__id=player.id).count(with_limit_and_skip=True) > 0
+
+    def is_player_dm(self, guild_id: int, player_id: int) -> bool:
+        session_dm = self.get_config_fields(guild_id, "session-dm").get("session-dm")
+        if not session_dm:
+            return False
+        return session_dm["id"] == player_id
+
+    def get_unanswered_players(self, guild_id: int):
+        state = self._get_raw_state(guild_id, *helpers.RSVP_LISTS)
+        players = state.get("players", [])
+        attendees = state.get("attendees", [])
+        decliners = state.get("decliners", [])
+        return helpers.unanswered_players(players, attendees, decliners)
+
+    # ============ Attendees ============
+    def get_attendees_for_guild(self, guild_id: int) -> list[dict]:
+        return self._get_raw_state(guild_id, "attendees").get("attendees", [])
+
+    def add_attendee_for_guild(self, guild_id: int, attendee):
+        self._update_state(guild_id, add_to_set__attendees=User(name=attendee.name, id=attendee.id))
+
+    def rm_attendee_for_guild(self, guild_id: int, attendee):
+        self._update_state(guild_id, pull__attendees__id=attendee.id)
+
+    def accept_for_guild(self, guild_id: int, attendee) -> list[dict]:
+        # Both lists live on the same document, so the move is a single atomic write
+        return self._move_user(guild_id, attendee, to_field="attendees", from_field="decliners")
+
+    # ============ Decliners ============
+    def get_decliners_for_guild(self, guild_id: int) -> list[dict]:
+        return self._get_raw_state(guild_id, "decliners").get("decliners", [])
+
+    def add_decliner_for_guild(self, guild_id: int, decliner):
+        self._update_state(guild_id, add_to_set__decliners=User(name=decliner.name, id=decliner.id))
+
+    def rm_decliner_for_guild(self, guild_id: int, decliner):
+        self._update_state(guild_id, pull__decliners__id=decliner.id)
+
+    def decline_for_guild(self, guild_id: int, decliner) -> list[dict]:
+        return self._move_user(guild_id, decliner, to_field="decliners", from_field="attendees")
+
+    # ============ Cancellers ============
+    def get_cancellers_for_guild(self, guild_id: int) -> list[dict]:
+        return self._get_raw_state(guild_id, "cancellers").get("cancellers", [])
+
+    def add_canceller_for_guild(self, guild_id: int, canceller):
+        self._update_state(guild_id, add_to_set__cancellers=User(name=canceller.name, id=canceller.id))
+
+    def rm_canceller_for_guild(self, guild_id: int, canceller):
+        self._update_state(guild_id, pull__cancellers__id=canceller.id)
+
+    # ============ Config ============
+    def _get_config_by_guild_id(self, guild_id: int) -> _Config:
+        return self._get_state_by_guild_id(guild_id, "config").config
+
+    def get_config_for_guild(self, guild_id: int) -> dict:
+        res = GuildState.objects(guild=guild_id, config__exists=True).only("guild", "config").as_pymongo().first()
+        return res or {}
+
+    def get_config_fields(self, guild_id: int, *fields: str) -> dict:
+        res = GuildState._get_collection().find_one({"guild": guild_id}, helpers.config_projection(fields))
+        return (res or {}).get("config", {})
+
+    def get_gm_for_guild(self, guild_id: int):
+        pass
+
+    def _get_session_cancel_flag(self, guild_id: int):
+        pass
+
+    def reset(self, guild_id: int):
+        self.reset_guilds([guild_id])
+
+    def reset_guilds(self, guild_ids: list[int]) -> int:
+        # Clears the RSVP lists of every guild in one update_many
+        guilds = GuildState.objects(guild__in=list(guild_ids))
+        reset = guilds.update(set__attendees=[], set__decliners=[], set__cancellers=[])
+        # Then the cancel flag and the board message, only of the guilds that are configured. Setting the flag on one
+        # that isn't would leave it with a partial config
+        guilds.filter(config__exists=True).update(set__config__cancel_session=False, unset__config__board_message=True)
+        return reset
+
+    def _set_cancel_flag(self, guild_id: int, cancelled: bool) -> bool:
+        res = GuildState._get_collection().find_one_and_update(
+            {"guild": guild_id},
+            {"$set": {"config.cancel-session": cancelled}},
+            projection=helpers.config_projection(["cancel-session"]),
+            return_document=ReturnDocument.AFTER,
+        )
+        return res["config"]["cancel-session"]
+
+    def cancel_session(self, guild_id: int) -> bool:
+        return self._set_cancel_flag(guild_id, True)
+
+    def reset_cancel_flag(self, guild_id: int) -> bool:
+        return self._set_cancel_flag(guild_id, False)
+
+    def create_guild_config(
+        self,
+        guild_id: int,
+        voice_channel_id: int,
+        dm_username: str,
+        dm_id: int,
+        session_day: str,
+        session_time: str,
+        meeting_room: int,
+        first_alert: str,
+        second_alert: str,
+        cancel_session: bool = False,
+    ):
+        config_settings = _Config(
+            session_dm=User(name=dm_username, id=dm_id),
+            vc_id=voice_channel_id,
+            session_day=session_day,
+            session_time=session_time,
+            meeting_room=meeting_room,
+            first_alert=first_alert,
+            second_alert=second_alert,
+            cancel_session=cancel_session,
+        )
+        config_settings.validate()
+        self._update_state(guild_id, set__config=config_settings)
+
+    def rm_guild_config(self, guild_id: int):
+        GuildState.objects(guild=guild_id).update_one(unset__config=True)
+
+    def set_board_message(self, guild_id: int, message_id: int | None):
+        if message_id is None:
+            GuildState.objects(guild=guild_id).update_one(unset__config__board_message=True)
+        else:
+            GuildState.objects(guild=guild_id).update_one(set__config__board_message=message_id)
+
+    def _get_alert_configs(self, **query) -> list[dict]:
+        return list(GuildState.objects(config__alerts=True, **query).only("guild", "config").as_pymongo())
+
+    def get_first_alert_configs(self, day_of_the_week: int) -> list[dict]:
+        return self._get_alert_configs(config__first_alert=day_of_the_week)
+
+    def get_second_alert_configs(self, day_of_the_week: int) -> list[dict]:
+        return self._get_alert_configs(config__second_alert=day_of_the_week)
+
+    def get_session_day_configs(self, day_of_the_week: int) -> list[dict]:
+        return self._get_alert_configs(config__session_day=day_of_the_week)
+
+    def get_voice_channel_id(self, guild_id: int) -> int:
+        return self.get_config_fields(guild_id, "vc-id")["vc-id"]
+
+    def get_campaign_session_dt(self, guild_id: int) -> tuple[int, str]:
+        res = self.get_config_fields(guild_id, "session-day", "session-time")
+        return res["session-day"], res["session-time"]
+
+    def is_session_cancelled(self, guild_id: int) -> bool:
+        return self.get_config_fields(guild_id, "cancel-session").get("cancel-session", False)
+
+    # ============ Inventories ============
+    def get_inventory(self, guild_id: int, player_id: int, skip: int = 0, limit: int = 0) -> list[dict]:
+        return inventory.get_inventory(Inventory._get_collection(), guild_id, player_id, skip, limit)
+
+    def count_inventory(self, guild_id: int, player_id: int) -> int:
+        return inventory.count_inventory(Inventory._get_collection(), guild_id, player_id)
+
+    def add_items(self, guild_id: int, player_id: int, items: list) -> int:
+        writes = inventory.add_writes(guild_id, player_id, items)
+        return inventory.bulk_write(Inventory._get_collection(), writes)
+
+    def update_items(self, guild_id: int, player_id: int, items: list) -> int:
+        writes = inventory.update_writes(guild_id, player_id, items)
+        return inventory.bulk_write(Inventory._get_collection(), writes)
+
+    def remove_items(self, guild_id: int, player_id: int, names: list[str]) -> int:
+        return inventory.remove_items(Inventory._get_collection(), guild_id, player_id, names)
@@ -0,0 +1,81 @@
+"""Index management shared by the storage backends
+
+The indexes themselves are declared on the documents in `app.model.dao`. Run `python -m app.db.indexes` to create them
+and print which ones are missing or unused.
+"""
+
+import logging
+import pprint
+
+import mongoengine
+from pymongo.errors import OperationFailure
+
+from app import constants
+from app.model.dao import Attendees, Cancellers, Config, Decliners, GuildState, Inventory, Players
+
+# Documents used by the one-collection-per-list backends (`MongoEngine`, `AsyncMongo`)
+PER_LIST_DOCUMENTS = (Players, Attendees, Decliners, Cancellers, Config, Inventory)
+
+# Documents used by `GuildStateEngine`
+GUILD_STATE_DOCUMENTS = (GuildState, Inventory)
+
+
+def index_specs(document) -> list[dict]:
+    """The index specs mongoengine built for a document, with field names already mapped to their db names"""
+    return document._meta["index_specs"]
+
+
+def index_usage(index_stats: list[dict]) -> dict[str, int]:
+    """Maps each index name to how many times it has been used, from the output of a `$indexStats` stage"""
+    return {stat["name"]: stat["accesses"]["ops"] for stat in index_stats}
+
+
+def index_report(specs: list[dict], index_information: dict, usage: dict[str, int] = None) -> dict:
+    """Compares the declared indexes of a collection against the ones that actually exist
+
+    :param specs: (list[dict]) The declared index specs (see `index_specs`)
+    :param index_information: (dict) The existing indexes, as returned by `Collection.index_information()`
+    :param usage: (dict[str, int]) Optional per-index usage counts (see `index_usage`)
+    :return: (dict) `missing`: the keys of declared indexes that don't exist, `unused`: the names of existing indexes
+        that haven't been used since the server started
+    """
+    existing = [[tuple(key) for key in info["key"]] for info in index_information.values()]
+    missing = [spec["fields"] for spec in specs if [tuple(key) for key in spec["fields"]] not in existing]
+    unused = [name for name, ops in (usage or {}).items() if ops == 0 and name != "_id_"]
+    return {"missing": missing, "unused": unused}
+
+
+def ensure_document_indexes(documents) -> None:
+    """Creates the declared indexes of each document. Indexes that already exist are left alone."""
+    for document in documents:
+        collection = document._get_collection()
+        # One at a time, so an index that can't be created doesn't keep the document's other indexes from being created
+        for spec in index_specs(document):
+            options = {k: v for k, v in spec.items() if k != "fields"}
+            try:
+                collection.create_index(spec["fields"], **options)
+            except OperationFailure:
+                # e.g. duplicate guild records blocking a unique index. `index_report` will list it as missing
+                logging.exception(f"Couldn't create index {spec} on {collection.name}")
+
+
+def document_index_report(documents) -> dict[str, dict]:
+    """Runs `index_report` for the collection of each document"""
+    report = {}
+    for document in documents:
+        collection = document._get_collection()
+        try:
+            usage = index_usage(list(collection.aggregate([{"$indexStats": {}}])))
+        except (OperationFailure, NotImplementedError):
+            # $indexStats needs the clusterMonitor role (and isn't supported everywhere), so usage is best-effort
+            usage = None
+        report[collection.name] = index_report(index_specs(document), collection.index_information(), usage)
+    return report
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    mongoengine.connect(host=constants.db_config.connection_str)
+    documents = GUILD_STATE_DOCUMENTS if constants.db_config.backend == "guild-state" else PER_LIST_DOCUMENTS
+    ensure_document_indexes(documents)
+    pprint.pprint(document_index_report(documents))
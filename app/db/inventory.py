@@ -0,0 +1,83 @@
+"""Queries and bulk writes on the inventory collection, shared by the storage backends
+
+Every item is its own document, keyed by (guild, player, normalized item name), so adding to or updating a few items of
+a large inventory only touches those items' documents. All the items of one command go out as one unordered
+`bulk_write`, where each item's write is atomic on its own. Sync and async pymongo collections take the same operations.
+"""
+
+from pymongo import DeleteOne, UpdateOne
+
+from app.inventory import InventoryItem, normalize_item
+
+# What's read back for each item
+PROJECTION = {"_id": 0, "name": 1, "qty": 1}
+
+SORT = [("item", 1)]
+
+
+def inventory_filter(guild_id: int, player_id: int) -> dict:
+    return {"guild": guild_id, "player": player_id}
+
+
+def _item_filter(guild_id: int, player_id: int, key: str) -> dict:
+    return {**inventory_filter(guild_id, player_id), "item": key}
+
+
+def add_writes(guild_id: int, player_id: int, items: list[InventoryItem]) -> list[UpdateOne]:
+    """Increments the quantity of each item, creating the ones the player doesn't have yet"""
+    totals: dict[str, list] = {}
+    for item in items:
+        # The same item given twice is added up, rather than being two writes to one document
+        totals.setdefault(item.key, [item.name, 0])[1] += item.qty
+    return [
+        UpdateOne(
+            _item_filter(guild_id, player_id, key),
+            {"$inc": {"qty": qty}, "$setOnInsert": {"name": name}},
+            upsert=True,
+        )
+        for key, (name, qty) in totals.items()
+    ]
+
+
+def update_writes(guild_id: int, player_id: int, items: list[InventoryItem]) -> list[UpdateOne | DeleteOne]:
+    """Sets the quantity of each item (the last one wins if an item is given twice), removing those set to 0"""
+    latest = {item.key: item for item in items}
+    return [
+        (
+            DeleteOne(_item_filter(guild_id, player_id, key))
+            if item.qty == 0
+            else UpdateOne(
+                _item_filter(guild_id, player_id, key),
+                {"$set": {"qty": item.qty}, "$setOnInsert": {"name": item.name}},
+                upsert=True,
+            )
+        )
+        for key, item in latest.items()
+    ]
+
+
+def remove_filter(guild_id: int, player_id: int, names: list[str]) -> dict:
+    return {**inventory_filter(guild_id, player_id), "item": {"$in": [normalize_item(name) for name in names]}}
+
+
+def changed(result) -> int:
+    """The number of items a `BulkWriteResult` added, changed, or removed"""
+    return result.upserted_count + result.modified_count + result.deleted_count
+
+
+# ============ Sync backends ============
+def get_inventory(collection, guild_id: int, player_id: int, skip: int = 0, limit: int = 0) -> list[dict]:
+    cursor = collection.find(inventory_filter(guild_id, player_id), PROJECTION).sort(SORT).skip(skip).limit(limit)
+    return list(cursor)
+
+
+def count_inventory(collection, guild_id: int, player_id: int) -> int:
+    return collection.count_documents(inventory_filter(guild_id, player_id))
+
+
+def bulk_write(collection, writes: list) -> int:
+    return changed(collection.bulk_write(writes, ordered=False)) if writes else 0
+
+
+def remove_items(collection, guild_id: int, player_id: int, names: list[str]) -> int:
+    return collection.delete_many(remove_filter(guild_id, player_id, names)).deleted_count
@@ -0,0 +1,62 @@
+"""One-shot migration of the per-list collections (players, attendees, decliners, cancellers, config) into the
+consolidated `guild-state` collection used by `GuildStateEngine`
+
+Usage: `python -m app.db.migrate_guild_state [--drop-old]`
+
+Safe to re-run: each guild's `GuildState` document is overwritten with whatever is in the old collections.
+"""
+
+import argparse
+import logging
+
+import mongoengine
+
+from app import constants
+from app.model.dao import Attendees, Cancellers, Config, Decliners, GuildState, Players
+
+# Old collection document -> name of the list field it holds (same name on GuildState)
+_LIST_DOCUMENTS = {
+    Players: "players",
+    Attendees: "attendees",
+    Decliners: "decliners",
+    Cancellers: "cancellers",
+}
+
+
+def migrate(drop_old: bool = False) -> int:
+    """Copies every guild's state from the old collections into a single `GuildState` document per guild
+
+    :param drop_old: (bool) Drop the old collections once everything has been copied over
+    :return: (int) The number of guilds migrated
+    """
+    states: dict[int, dict] = {}
+
+    for document, field in _LIST_DOCUMENTS.items():
+        for row in document.objects:
+            states.setdefault(row.guild, {})[field] = list(getattr(row, field))
+
+    for row in Config.objects:
+        # Only keep the first config for a guild, same as `MongoEngine._get_config_by_guild_id`
+        states.setdefault(row.guild, {}).setdefault("config", row.config)
+
+    for guild_id, state in states.items():
+        update = {f"set__{field}": value for field, value in state.items()}
+        GuildState.objects(guild=guild_id).update_one(upsert=True, **update)
+        logging.debug(f"Migrated guild {guild_id}: {sorted(state)}")
+
+    if drop_old:
+        for document in [*_LIST_DOCUMENTS, Config]:
+            document.drop_collection()
+
+    return len(states)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate guild data into the consolidated guild-state collection")
+    parser.add_argument("--drop-old", action="store_true", help="drop the old collections after migrating")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG)
+    mongoengine.connect(host=constants.db_config.connection_str)
+    migrated = migrate(drop_old=args.drop_old)
+    logging.info(f"Migrated {migrated} guild(s) to the {GuildState._get_collection_name()} collection")
@@ -0,0 +1,348 @@
+import asyncio
+import logging
+
+from pymongo import AsyncMongoClient, ReturnDocument
+from pymongo.errors import OperationFailure
+
+from app import helpers
+from app.constants import Collections
+from app.db import indexes, inventory
+from app.db.base_db import BaseDB
+from app.db.connection import ConnectionManager
+
+
+class AsyncMongo(BaseDB):
+    """BaseDB implementation on top of pymongo's asyncio client, so every call can be awaited from the event loop
+
+    Reads and writes the same collections and document shapes as the mongoengine models in `app.model.dao`, so both
+    backends can be pointed at the same database.
+    """
+
+    def __init__(self, client: AsyncMongoClient = None, connections: ConnectionManager = None):
+        self.client = client
+        self.connections = connections if connections is not None else ConnectionManager()
+        self.database = None
+
+    def connect(self, conn_str: str = None):
+        # The async client doesn't do any I/O until the first command, so this is safe to call outside the event loop
+        if self.client is None:
+            self.client = self.connections.async_client(conn_str)
+        self.database = self.client.get_default_database(default=self.connections.config.db_name)
+
+    async def close(self):
+        await self.client.close()
+
+    def _collection(self, collection: Collections):
+        return self.database[collection.value]
+
+    async def ping(self):
+        await self.database.command("ping")
+
+    async def ensure_indexes(self):
+        # Same indexes as the mongoengine backend, taken from the index specs on the documents in `app.model.dao`
+        for document in indexes.PER_LIST_DOCUMENTS:
+            collection = self.database[document._get_collection_name()]
+            for spec in indexes.index_specs(document):
+                options = {k: v for k, v in spec.items() if k != "fields"}
+                try:
+                    await collection.create_index(spec["fields"], **options)
+                except OperationFailure:
+                    logging.exception(f"Couldn't create index {spec} on {document._get_collection_name()}")
+
+    async def index_report(self) -> dict[str, dict]:
+        report = {}
+        for document in indexes.PER_LIST_DOCUMENTS:
+            name = document._get_collection_name()
+            collection = self.database[name]
+            try:
+                cursor = await collection.aggregate([{"$indexStats": {}}])
+                usage = indexes.index_usage(await cursor.to_list(length=None))
+            except (OperationFailure, NotImplementedError):
+                usage = None
+            information = await collection.index_information()
+            report[name] = indexes.index_report(indexes.index_specs(document), information, usage)
+        return report
+
+    async def _get_users(self, collection: Collections, guild_id: int) -> list[dict]:
+        res = await self._collection(collection).find_one({"guild": guild_id}, {collection.value: 1})
+        if not res:
+            return []
+        return res.get(collection.value, [])
+
+    async def _add_user(self, collection: Collections, guild_id: int, user):
+        # Single server-side write: $addToSet skips users already in the list, upsert creates the guild's record
+        await self._collection(collection).update_one(
+            {"guild": guild_id}, {"$addToSet": {collection.value: self._get_user(user)}}, upsert=True
+        )
+
+    async def _move_user(self, to_collection: Collections, from_collection: Collections, guild_id: int, user):
+        # The lists are separate collections, so the add and the remove are sent together rather than one after another
+        res, _ = await asyncio.gather(
+            self._collection(to_collection).find_one_and_update(
+                {"guild": guild_id},
+                {"$addToSet": {to_collection.value: self._get_user(user)}},
+                projection={to_collection.value: 1},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            ),
+            self._rm_user(from_collection, guild_id, user),
+        )
+        return res.get(to_collection.value, [])
+
+    async def _rm_user(self, collection: Collections, guild_id: int, user):
+        await self._collection(collection).update_one(
+            {"guild": guild_id}, {"$pull": {collection.value: {"id": user.id}}}
+        )
+
+    async def get_all(self, guild_id: int) -> tuple:
+        attendees = await self.get_attendees_for_guild(guild_id)
+        decliners = await self.get_decliners_for_guild(guild_id)
+        cancellers = await self.get_cancellers_for_guild(guild_id)
+        return attendees, decliners, cancellers
+
+    def _get_user(self, user) -> dict:
+        return {"name": user.name, "id": user.id}
+
+    # ============ Players ============
+    async def get_players_for_guild(self, guild_id: int) -> list[dict]:
+        return await self._get_users(Collections.PLAYERS, guild_id)
+
+    async def _find_for_guilds(self, collection: Collections, guild_ids: list[int], projection: dict = None):
+        cursor = self._collection(collection).find({"guild": {"$in": guild_ids}}, projection)
+        return await cursor.to_list(length=None)
+
+    async def get_rsvp_state_for_guilds(self, guild_ids: list[int]) -> dict[int, dict]:
+        # One $in query per collection, all in flight at once
+        guild_ids = list(guild_ids)
+        lists = [Collections.PLAYERS, Collections.ATTENDEES, Collections.DECLINERS]
+        *list_documents, configs = await asyncio.gather(
+            *(self._find_for_guilds(collection, guild_ids, {"guild": 1, collection.value: 1}) for collection in lists),
+            self._find_for_guilds(Collections.CONFIG, guild_ids),
+        )
+        return helpers.rsvp_states(
+            guild_ids, {collection.value: docs for collection, docs in zip(lists, list_documents)}, configs
+        )
+
+    async def add_player_for_guild(self, guild_id: int, player):
+        await self._add_user(Collections.PLAYERS, guild_id, player)
+
+    async def rm_player_for_guild(self, guild_id: int, player):
+        await self._rm_user(Collections.PLAYERS, guild_id, player)
+
+    async def register_player(self, guild_id: int, player_username: str, player_id: int):
+        await self._collection(Collections.PLAYERS).update_one(
+            {"guild": guild_id},
+            {"$addToSet": {Collections.PLAYERS.value: {"name": player_username, "id": player_id}}},
+            upsert=True,
+        )
+
+    async def unregister_player(self, guild_id: int, player):
+        pass
+
+    async def is_full_group(self, guild_id: int) -> bool:
+        players = await self.get_players_for_guild(guild_id)
+        attendees = await self.get_attendees_for_guild(guild_id)
+
+        # Check if all the players are registered as attendees
+        return helpers.all_players_attending(players, attendees)
+
+    async def is_registered_player(self, guild_id: int, player) -> bool:
+        res = await self._collection(Collections.PLAYERS).count_documents(
+            {"guild": guild_id, "players.id": player.id}, limit=1
+        )
+        return res > 0
+
+    async def is_player_dm(self, guild_id: int, player_id: int) -> bool:
+        res = await self.get_config_fields(guild_id, "session-dm")
+        session_dm = res.get("session-dm")
+        if not session_dm:
+            return False
+        return session_dm["id"] == player_id
+
+    async def get_unanswered_players(self, guild_id: int):
+        players = await self.get_players_for_guild(guild_id)
+        attendees = await self.get_attendees_for_guild(guild_id)
+        decliners = await self.get_decliners_for_guild(guild_id)
+        return helpers.unanswered_players(players, attendees, decliners)
+
+    # ============ Attendees ============
+    async def get_attendees_for_guild(self, guild_id: int) -> list[dict]:
+        return await self._get_users(Collections.ATTENDEES, guild_id)
+
+    async def add_attendee_for_guild(self, guild_id: int, attendee):
+        await self._add_user(Collections.ATTENDEES, guild_id, attendee)
+
+    async def rm_attendee_for_guild(self, guild_id: int, attendee):
+        await self._rm_user(Collections.ATTENDEES, guild_id, attendee)
+
+    async def accept_for_guild(self, guild_id: int, attendee) -> list[dict]:
+        return await self._move_user(Collections.ATTENDEES, Collections.DECLINERS, guild_id, attendee)
+
+    # ============ Decliners ============
+    async def get_decliners_for_guild(self, guild_id: int) -> list[dict]:
+        return await self._get_users(Collections.DECLINERS, guild_id)
+
+    async def add_decliner_for_guild(self, guild_id: int, decliner):
+        await self._add_user(Collections.DECLINERS, guild_id, decliner)
+
+    async def rm_decliner_for_guild(self, guild_id: int, decliner):
+        await self._rm_user(Collections.DECLINERS, guild_id, decliner)
+
+    async def decline_for_guild(self, guild_id: int, decliner) -> list[dict]:
+        return await self._move_user(Collections.DECLINERS, Collections.ATTENDEES, guild_id, decliner)
+
+    # ============ Cancellers ============
+    async def get_cancellers_for_guild(self, guild_id: int) -> list[dict]:
+        return await self._get_users(Collections.CANCELLERS, guild_id)
+
+    async def add_canceller_for_guild(self, guild_id: int, canceller):
+        await self._add_user(Collections.CANCELLERS, guild_id, canceller)
+
+    async def rm_canceller_for_guild(self, guild_id: int, canceller):
+        await self._rm_user(Collections.CANCELLERS, guild_id, canceller)
+
+    # ============ Config ============
+    async def _get_config_by_guild_id(self, guild_id: int, projection: dict = None) -> dict:
+        res = await self._collection(Collections.CONFIG).find_one({"guild": guild_id}, projection)
+        return res or {}
+
+    async def get_config_for_guild(self, guild_id: int) -> dict:
+        return await self._get_config_by_guild_id(guild_id)
+
+    async def get_config_fields(self, guild_id: int, *fields: str) -> dict:
+        res = await self._get_config_by_guild_id(guild_id, helpers.config_projection(fields))
+        return res.get("config", {})
+
+    async def get_gm_for_guild(self, guild_id: int):
+        pass
+
+    async def _get_session_cancel_flag(self, guild_id: int):
+        pass
+
+    async def _set_cancel_flag(self, guild_id: int, cancelled: bool) -> bool:
+        res = await self._collection(Collections.CONFIG).find_one_and_update(
+            {"guild": guild_id},
+            {"$set": {"config.cancel-session": cancelled}},
+            projection=helpers.config_projection(["cancel-session"]),
+            return_document=ReturnDocument.AFTER,
+        )
+        return res["config"]["cancel-session"]
+
+    async def reset(self, guild_id: int):
+        await self.reset_guilds([guild_id])
+
+    async def reset_guilds(self, guild_ids: list[int]) -> int:
+        # One delete_many per RSVP list and one update_many for the configs, all in flight at once
+        query = {"guild": {"$in": list(guild_ids)}}
+        *_, res = await asyncio.gather(
+            *(
+                self._collection(collection).delete_many(query)
+                for collection in (Collections.ATTENDEES, Collections.DECLINERS, Collections.CANCELLERS)
+            ),
+            self._collection(Collections.CONFIG).update_many(
+                query, {"$set": {"config.cancel-session": False}, "$unset": {"config.board-message": ""}}
+            ),
+        )
+        return res.matched_count
+
+    async def cancel_session(self, guild_id: int) -> bool:
+        return await self._set_cancel_flag(guild_id, True)
+
+    async def reset_cancel_flag(self, guild_id: int) -> bool:
+        return await self._set_cancel_flag(guild_id, False)
+
+    async def create_guild_config(
+        self,
+        guild_id: int,
+        voice_channel_id: int,
+        dm_username: str,
+        dm_id: int,
+        session_day: str,
+        session_time: str,
+        meeting_room: int,
+        first_alert: str,
+        second_alert: str,
+        cancel_session: bool = False,
+    ):
+        # Mirror the field names and casting of the `_Config` embedded document
+        config_settings = {
+            "session-dm": {"name": dm_username, "id": int(dm_id)},
+            "vc-id": int(voice_channel_id),
+            "session-day": int(session_day),
+            "session-time": session_time,
+            "meeting-room": int(meeting_room),
+            "first-alert": int(first_alert),
+            "second-alert": int(second_alert),
+            "alerts": True,
+            "cancel-session": cancel_session,
+        }
+        # Upsert, so re-running config replaces the guild's config rather than adding a second one
+        await self._collection(Collections.CONFIG).update_one(
+            {"guild": guild_id}, {"$set": {"config": config_settings}}, upsert=True
+        )
+
+    async def rm_guild_config(self, guild_id: int):
+        await self._collection(Collections.CONFIG).delete_one({"guild": guild_id})
+
+    async def set_board_message(self, guild_id: int, message_id: int | None):
+        if message_id is None:
+            update = {"$unset": {"config.board-message": ""}}
+        else:
+            update = {"$set": {"config.board-message": message_id}}
+        await self._collection(Collections.CONFIG).update_one({"guild": guild_id}, update)
+
+    async def _get_alert_configs(self, alert_field: str, day_of_the_week: int) -> list[dict]:
+        cursor = self._collection(Collections.CONFIG).find(
+            {f"config.{alert_field}": day_of_the_week, "config.alerts": True}
+        )
+        return await cursor.to_list(length=None)
+
+    async def get_first_alert_configs(self, day_of_the_week: int) -> list[dict]:
+        return await self._get_alert_configs("first-alert", day_of_the_week)
+
+    async def get_second_alert_configs(self, day_of_the_week: int) -> list[dict]:
+        return await self._get_alert_configs("second-alert", day_of_the_week)
+
+    async def get_session_day_configs(self, day_of_the_week: int) -> list[dict]:
+        return await self._get_alert_configs("session-day", day_of_the_week)
+
+    async def get_voice_channel_id(self, guild_id: int) -> int:
+        res = await self.get_config_fields(guild_id, "vc-id")
+        return res["vc-id"]
+
+    async def get_campaign_session_dt(self, guild_id: int) -> tuple[int, str]:
+        res = await self.get_config_fields(guild_id, "session-day", "session-time")
+        return res["session-day"], res["session-time"]
+
+    async def is_session_cancelled(self, guild_id: int) -> bool:
+        res = await self.get_config_fields(guild_id, "cancel-session")
+        return res["cancel-session"]
+
+    # ============ Inventories ============
+    async def get_inventory(self, guild_id: int, player_id: int, skip: int = 0, limit: int = 0) -> list[dict]:
+        cursor = self._collection(Collections.INVENTORIES).find(
+            inventory.inventory_filter(guild_id, player_id), inventory.PROJECTION
+        )
+        return await cursor.sort(inventory.SORT).skip(skip).limit(limit).to_list()
+
+    async def count_inventory(self, guild_id: int, player_id: int) -> int:
+        return await self._collection(Collections.INVENTORIES).count_documents(
+            inventory.inventory_filter(guild_id, player_id)
+        )
+
+    async def _bulk_write(self, writes: list) -> int:
+        if not writes:
+            return 0
+        return inventory.changed(await self._collection(Collections.INVENTORIES).bulk_write(writes, ordered=False))
+
+    async def add_items(self, guild_id: int, player_id: int, items: list) -> int:
+        return await self._bulk_write(inventory.add_writes(guild_id, player_id, items))
+
+    async def update_items(self, guild_id: int, player_id: int, items: list) -> int:
+        return await self._bulk_write(inventory.update_writes(guild_id, player_id, items))
+
+    async def remove_items(self, guild_id: int, player_id: int, names: list[str]) -> int:
+        res = await self._collection(Collections.INVENTORIES).delete_many(
+            inventory.remove_filter(guild_id, player_id, names)
+        )
+        return res.deleted_count
@@ -1,17 +1,64 @@
 import mongoengine
+from pymongo import ReturnDocument
 
-from app import constants, helpers
+from app import helpers
 from app.constants import Collections
+from app.db import indexes, inventory
 from app.db.base_db import BaseDB
+from app.db.connection import ConnectionManager
 from app.model.dao import *  # noqa: F403
 from app.model.dao import _Config
 
 
 class MongoEngine(BaseDB):
+    def __init__(self, connections: ConnectionManager = None):
+        self.connections = connections if connections is not None else ConnectionManager()
+
     def connect(self, conn_str: str = None):
-        if not conn_str:
-            conn_str = constants.db_config.connection_str
-        mongoengine.connect(host=conn_str)
+        self.connections.connect_mongoengine(conn_str)
+
+    def close(self):
+        mongoengine.disconnect()
+
+    def ping(self):
+        mongoengine.get_connection().admin.command("ping")
+
+    def ensure_indexes(self):
+        indexes.ensure_document_indexes(indexes.PER_LIST_DOCUMENTS)
+
+    def index_report(self) -> dict[str, dict]:
+        return indexes.document_index_report(indexes.PER_LIST_DOCUMENTS)
+
+    @staticmethod
+    def _add_user(document, field: str, guild_id: int, user):
+        # Single server-side write: $addToSet skips users already in the list, upsert creates the guild's record
+        document.objects(guild=guild_id).update_one(
+            upsert=True, **{f"add_to_set__{field}": User(name=user.name, id=user.id)}  # noqa: F405
+        )
+
+    @staticmethod
+    def _add_user_returning(document, field: str, guild_id: int, user) -> list[dict]:
+        # Like `_add_user`, but the updated list comes back from the same round-trip (the post-image of the write), as
+        # the dicts pymongo returns
+        res = document._get_collection().find_one_and_update(
+            {"guild": guild_id},
+            {"$addToSet": {field: {"name": user.name, "id": user.id}}},
+            projection={"_id": 0, field: 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        return res.get(field, [])
+
+    @staticmethod
+    def _rm_user(document, field: str, guild_id: int, user):
+        document.objects(guild=guild_id).update_one(**{f"pull__{field}__id": user.id})
+
+    @staticmethod
+    def _get_users(document, field: str, guild_id: int) -> list[dict]:
+        # Only the list itself, as the dicts pymongo returns, so no Document is built (and converted back) per read.
+        # A guild without a record has an empty list, like in the other backends
+        res = document.objects(guild=guild_id).only(field).exclude("id").as_pymongo().first()
+        return (res or {}).get(field, [])
 
     def get_all(self, guild_id: int) -> tuple:
         attendees = self.get_attendees_for_guild(guild_id)
@@ -25,19 +72,25 @@ class MongoEngine(BaseDB):
         return res
 
     def get_players_for_guild(self, guild_id: int):
-        res = self._get_players_by_guild_id(guild_id)
-        res = helpers.doc_to_dict(res)
-        return res.get(Collections.PLAYERS, [])
+        return self._get_users(Players, Collections.PLAYERS.value, guild_id)  # noqa: F405
+
+    def get_rsvp_state_for_guilds(self, guild_ids: list[int]) -> dict[int, dict]:
+        # One $in query per collection
+        guild_ids = list(guild_ids)
+        list_documents = {
+            document._get_collection_name(): document.objects(guild__in=guild_ids)
+            .only("guild", document._get_collection_name())
+            .as_pymongo()
+            for document in (Players, Attendees, Decliners)  # noqa: F405
+        }
+        configs = Config.objects(guild__in=guild_ids).as_pymongo()  # noqa: F405
+        return helpers.rsvp_states(guild_ids, list_documents, configs)
 
     def add_player_for_guild(self, guild_id: int, player: User):  # noqa: F405
-        res: Players = self._get_players_by_guild_id(guild_id)  # noqa: F405
-        res.players.create(name=player.name, id=player.id)
-        res.save()
+        self._add_user(Players, Collections.PLAYERS.value, guild_id, player)  # noqa: F405
 
     def rm_player_for_guild(self, guild_id: int, player: User):  # noqa: F405
-        res = self._get_players_by_guild_id(guild_id)
-        res.players.filter(id=player.id).delete()
-        res.save()
+        self._rm_user(Players, Collections.PLAYERS.value, guild_id, player)  # noqa: F405
 
     def register_player(self, guild_id: int, player_username: str, player_id: int):
         new_player = User(name=player_username, id=player_id)  # noqa: F405
@@ -47,55 +100,27 @@ class MongoEngine(BaseDB):
         pass
 
     def is_full_group(self, guild_id: int) -> bool:
-        players = helpers.doc_to_dict(self._get_players_by_guild_id(guild_id).players)
-        attendees = helpers.doc_to_dict(self._get_attendees_by_guild_id(guild_id).attendees)
-        # players = self._get_players_by_guild_id(guild_id).players.only(f"{Collections.PLAYERS}.id")
-        # attendees = self.__get_attendees_by_guild_id(guild_id).attendees.only(f"{Collections.ATTENDEES}.id")
+        players = self.get_players_for_guild(guild_id)
+        attendees = self.get_attendees_for_guild(guild_id)
 
         # Check if all the players are registered as attendees
-        res = all(elem in attendees for elem in players)
-        return res
+        return helpers.all_players_attending(players, attendees)
 
     def is_registered_player(self, guild_id: int, player) -> bool:
-        user_id: int = player.id
-        res = self._get_players_by_guild_id(guild_id).players.filter(id=user_id).count()
+        res = Players.objects(guild=guild_id, players__id=player.id).count(with_limit_and_skip=True)  # noqa: F405
         return res > 0
 
     def is_player_dm(self, guild_id: int, player_id: int) -> bool:
-        res = self._get_config_by_guild_id(guild_id).config
-        if not res.session_dm:
+        session_dm = self.get_config_fields(guild_id, "session-dm").get("session-dm")
+        if not session_dm:
             return False
-        return res.session_dm.id == player_id
+        return session_dm["id"] == player_id
 
     def get_unanswered_players(self, guild_id: int):
-        def transform_user(user_lst: list[dict]):
-            ret = {}
-            for user in user_lst:
-                ret[user["id"]] = user["name"]
-            return ret
-
-        players = helpers.doc_to_dict(self._get_players_by_guild_id(guild_id).players)
-        attendees = helpers.doc_to_dict(self._get_attendees_by_guild_id(guild_id).attendees)
-        decliners = helpers.doc_to_dict(self._get_decliners_by_guild_id(guild_id).decliners)
-
-        # Transform list of users into a dictionary of id: name
-        players = transform_user(players)
-        attendees = transform_user(attendees)
-        decliners = transform_user(decliners)
-
-        # Players: {'a', 'b', 'c', 'd'} | Attendees: {'b', 'd'} | Rejections: {'c'}
-        # set_players - set_attendees - set_rejections =
-        # Result: {'a'}
-        # Return the difference of two or more sets as a new set. (i.e. all elements that are in this set but not the others.)
-        unanswered = set(players.keys()) - set(attendees.keys()) - set(decliners.keys())
-
-        # Convert set into a list to make it easier to operate with
-        unanswered = list(unanswered)
-
-        # If NO ONE has confirmed or declined, then we @ everyone (prompt for response)
-        if len(unanswered) == len(players):
-            unanswered = ["dnd-players"]
-        return unanswered
+        players = self.get_players_for_guild(guild_id)
+        attendees = self.get_attendees_for_guild(guild_id)
+        decliners = self.get_decliners_for_guild(guild_id)
+        return helpers.unanswered_players(players, attendees, decliners)
 
     def _get_user(self, user: User):  # noqa: F405
         return helpers.doc_to_dict(user)
@@ -107,21 +132,19 @@ class MongoEngine(BaseDB):
         return res
 
     def get_attendees_for_guild(self, guild_id: int) -> list[dict]:
-        res = self._get_attendees_by_guild_id(guild_id)
-        res = helpers.doc_to_dict(res)
-        return res.get(Collections.ATTENDEES, [])
+        return self._get_users(Attendees, Collections.ATTENDEES.value, guild_id)  # noqa: F405
 
     def add_attendee_for_guild(self, guild_id: int, attendee: User):  # noqa: F405
-        # retrieve attendees record
-        res: Attendees = self._get_attendees_by_guild_id(guild_id)  # noqa: F405
-        curr_attendees = res.attendees
-        curr_attendees.create(name=attendee.name, id=attendee.id)
-        res.save()
+        self._add_user(Attendees, Collections.ATTENDEES.value, guild_id, attendee)  # noqa: F405
 
     def rm_attendee_for_guild(self, guild_id: int, attendee: User):  # noqa: F405
-        res = self._get_attendees_by_guild_id(guild_id)
-        res.attendees.filter(id=attendee.id).delete()
-        res.save()
+        self._rm_user(Attendees, Collections.ATTENDEES.value, guild_id, attendee)  # noqa: F405
+
+    def accept_for_guild(self, guild_id: int, attendee) -> list[dict]:
+        # Attendees and decliners are separate collections, so this is two atomic writes with no reads in between
+        attendees = self._add_user_returning(Attendees, Collections.ATTENDEES.value, guild_id, attendee)  # noqa: F405
+        self._rm_user(Decliners, Collections.DECLINERS.value, guild_id, attendee)  # noqa: F405
+        return attendees
 
     # ============ Decliners ============
 
@@ -130,19 +153,18 @@ class MongoEngine(BaseDB):
         return res
 
     def get_decliners_for_guild(self, guild_id: int) -> list[dict]:
-        res = self._get_decliners_by_guild_id(guild_id)
-        res = helpers.doc_to_dict(res)
-        return res.get(Collections.DECLINERS, [])
+        return self._get_users(Decliners, Collections.DECLINERS.value, guild_id)  # noqa: F405
 
     def add_decliner_for_guild(self, guild_id: int, decliner):
-        res = self._get_decliners_by_guild_id(guild_id)
-        res.decliners.create(name=decliner.name, id=decliner.id)
-        res.save()
+        self._add_user(Decliners, Collections.DECLINERS.value, guild_id, decliner)  # noqa: F405
 
     def rm_decliner_for_guild(self, guild_id: int, decliner):
-        res = self._get_decliners_by_guild_id(guild_id)
-        res.decliners.filter(id=decliner.id).delete()
-        res.save()
+        self._rm_user(Decliners, Collections.DECLINERS.value, guild_id, decliner)  # noqa: F405
+
+    def decline_for_guild(self, guild_id: int, decliner) -> list[dict]:
+        decliners = self._add_user_returning(Decliners, Collections.DECLINERS.value, guild_id, decliner)  # noqa: F405
+        self._rm_user(Attendees, Collections.ATTENDEES.value, guild_id, decliner)  # noqa: F405
+        return decliners
 
     # ============ Cancellers ============
 
@@ -151,19 +173,13 @@ class MongoEngine(BaseDB):
         return res
 
     def get_cancellers_for_guild(self, guild_id: int) -> list[dict]:
-        res = self._get_cancellers_by_guild_id(guild_id)
-        res = helpers.doc_to_dict(res)
-        return res.get(Collections.CANCELLERS, [])
+        return self._get_users(Cancellers, Collections.CANCELLERS.value, guild_id)  # noqa: F405
 
     def add_canceller_for_guild(self, guild_id: int, canceller):
-        res = self._get_cancellers_by_guild_id(guild_id)
-        res.cancellers.create(name=canceller.name, id=canceller.id)
-        res.save()
+        self._add_user(Cancellers, Collections.CANCELLERS.value, guild_id, canceller)  # noqa: F405
 
     def rm_canceller_for_guild(self, guild_id: int, canceller):
-        res = self._get_cancellers_by_guild_id(guild_id)
-        res.cancellers.filter(id=canceller.id).delete()
-        res.save()
+        self._rm_user(Cancellers, Collections.CANCELLERS.value, guild_id, canceller)  # noqa: F405
 
     # ============ Config ============
 
@@ -172,9 +188,21 @@ class MongoEngine(BaseDB):
         return res
 
     def get_config_for_guild(self, guild_id: int):
-        res = self._get_config_by_guild_id(guild_id)
-        res = helpers.doc_to_dict(res)
-        return res
+        return Config.objects(guild=guild_id).as_pymongo().first() or {}  # noqa: F405
+
+    def get_config_fields(self, guild_id: int, *fields: str) -> dict:
+        res = Config._get_collection().find_one({"guild": guild_id}, helpers.config_projection(fields))  # noqa: F405
+        return (res or {}).get("config", {})
+
+    def _set_cancel_flag(self, guild_id: int, cancelled: bool) -> bool:
+        # One write that returns the flag as written, rather than a read, a save, and a read to check the save
+        res = Config._get_collection().find_one_and_update(  # noqa: F405
+            {"guild": guild_id},
+            {"$set": {"config.cancel-session": cancelled}},
+            projection=helpers.config_projection(["cancel-session"]),
+            return_document=ReturnDocument.AFTER,
+        )
+        return res["config"]["cancel-session"]
 
     def get_gm_for_guild(self, guild_id: int):
         pass
@@ -183,24 +211,22 @@ class MongoEngine(BaseDB):
         pass
 
     def reset(self, guild_id: int):
-        self._get_attendees_by_guild_id(guild_id).delete()
-        self._get_decliners_by_guild_id(guild_id).delete()
-        self._get_cancellers_by_guild_id(guild_id).delete()
-        self.reset_cancel_flag(guild_id)
+        self.reset_guilds([guild_id])
+
+    def reset_guilds(self, guild_ids: list[int]) -> int:
+        # One delete_many per RSVP list, and one update_many for the configs, rather than a few round-trips per guild
+        guild_ids = list(guild_ids)
+        for document in (Attendees, Decliners, Cancellers):  # noqa: F405
+            document.objects(guild__in=guild_ids).delete()
+        return Config.objects(guild__in=guild_ids).update(  # noqa: F405
+            set__config__cancel_session=False, unset__config__board_message=True
+        )
 
     def cancel_session(self, guild_id: int) -> bool:
-        res = self._get_config_by_guild_id(guild_id)
-        res.config.cancel_session = True
-        res.save()
-        is_cancelled = self._get_config_by_guild_id(guild_id)
-        return is_cancelled.config.cancel_session
+        return self._set_cancel_flag(guild_id, True)
 
     def reset_cancel_flag(self, guild_id: int) -> bool:
-        guild_config = self._get_config_by_guild_id(guild_id)
-        guild_config.config.cancel_session = False
-        guild_config.save()
-        is_uncancelled = self._get_config_by_guild_id(guild_id)
-        return is_uncancelled.config.cancel_session
+        return self._set_cancel_flag(guild_id, False)
 
     def create_guild_config(
         self,
@@ -225,36 +251,56 @@ class MongoEngine(BaseDB):
             first_alert=first_alert,
             second_alert=second_alert,
         )
-        new_config = Config(guild=guild_id, config=config_settings)  # noqa: F405
-        new_config.save(cascade=True)
+        config_settings.validate()
+        # Upsert, so re-running config replaces the guild's config rather than adding a second one
+        Config.objects(guild=guild_id).update_one(upsert=True, set__config=config_settings)  # noqa: F405
 
     def rm_guild_config(self, guild_id: int):
         res = self._get_config_by_guild_id(guild_id)
         res.delete()
 
+    def set_board_message(self, guild_id: int, message_id: int | None):
+        if message_id is None:
+            Config.objects(guild=guild_id).update_one(unset__config__board_message=True)  # noqa: F405
+        else:
+            Config.objects(guild=guild_id).update_one(set__config__board_message=message_id)  # noqa: F405
+
     def get_first_alert_configs(self, day_of_the_week: int):
         res_configs = Config.objects(config__first_alert=day_of_the_week, config__alerts=True)  # noqa: F405
-        res = helpers.doc_to_dict(res_configs)
-        return res
+        return list(res_configs.as_pymongo())
 
     def get_second_alert_configs(self, day_of_the_week: int):
         res_configs = Config.objects(config__second_alert=day_of_the_week, config__alerts=True).filter()  # noqa: F405
-        res = helpers.doc_to_dict(res_configs)
-        return res
+        return list(res_configs.as_pymongo())
 
     def get_session_day_configs(self, day_of_the_week: int):
         res_configs = Config.objects(config__session_day=day_of_the_week, config__alerts=True).filter()  # noqa: F405
-        res = helpers.doc_to_dict(res_configs)
-        return res
+        return list(res_configs.as_pymongo())
 
     def get_voice_channel_id(self, guild_id: int) -> int:
-        res = self._get_config_by_guild_id(guild_id)
-        return res.config.vc_id
+        return self.get_config_fields(guild_id, "vc-id")["vc-id"]
 
     def get_campaign_session_dt(self, guild_id: int) -> tuple[int, str]:
-        res = self._get_config_by_guild_id(guild_id)
-        return res.config.session_day, res.config.session_time
+        res = self.get_config_fields(guild_id, "session-day", "session-time")
+        return res["session-day"], res["session-time"]
 
     def is_session_cancelled(self, guild_id: int) -> bool:
-        res = self._get_config_by_guild_id(guild_id)
-        return res.config.cancel_session
+        return self.get_config_fields(guild_id, "cancel-session")["cancel-session"]
+
+    # ============ Inventories ============
+    def get_inventory(self, guild_id: int, player_id: int, skip: int = 0, limit: int = 0) -> list[dict]:
+        return inventory.get_inventory(Inventory._get_collection(), guild_id, player_id, skip, limit)  # noqa: F405
+
+    def count_inventory(self, guild_id: int, player_id: int) -> int:
+        return inventory.count_inventory(Inventory._get_collection(), guild_id, player_id)  # noqa: F405
+
+    def add_items(self, guild_id: int, player_id: int, items: list) -> int:
+        writes = inventory.add_writes(guild_id, player_id, items)
+        return inventory.bulk_write(Inventory._get_collection(), writes)  # noqa: F405
+
+    def update_items(self, guild_id: int, player_id: int, items: list) -> int:
+        writes = inventory.update_writes(guild_id, player_id, items)
+        return inventory.bulk_write(Inventory._get_collection(), writes)  # noqa: F405
+
+    def remove_items(self, guild_id: int, player_id: int, names: list[str]) -> int:
+        return inventory.remove_items(Inventory._get_collection(), guild_id, player_id, names)  # noqa: F405
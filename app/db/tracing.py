@@ -0,0 +1,175 @@
+"""Opt-in tracing of the storage calls made on behalf of each command (`dbTrace=true`)
+
+`TracingDB` wraps a backend and times every call to it, along with the guild it was for and how many mongo commands it
+issued (counted by `CommandCounter`, a pymongo command listener). The calls are collected into the `Trace` of the
+command that made them, which is logged once the command finishes, so a command that makes more round-trips than it
+should stands out. Any single call slower than the threshold is logged as it happens.
+
+The current trace and call are context variables, so concurrent commands each get their own, and they follow the calls
+of blocking backends into their worker threads (`asyncio.to_thread` copies the context).
+"""
+
+import functools
+import inspect
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterator
+
+from pymongo.monitoring import CommandListener
+
+from app.db.base_db import BaseDB
+
+
+@dataclass(slots=True)
+class DBCall:
+    method: str
+    guild_id: int | list[int] | None = None
+    elapsed: float = 0.0
+    # Commands sent to mongo during the call (finds, updates, bulk writes, ...)
+    mongo_ops: int = 0
+
+    def __str__(self):
+        guild = f"guild {self.guild_id}" if self.guild_id is not None else ""
+        return f"{self.method}({guild}) {self.elapsed * 1000:.1f}ms/{self.mongo_ops} ops"
+
+
+@dataclass
+class Trace:
+    name: str
+    calls: list[DBCall] = field(default_factory=list)
+
+    @property
+    def elapsed(self) -> float:
+        return sum(call.elapsed for call in self.calls)
+
+    @property
+    def mongo_ops(self) -> int:
+        return sum(call.mongo_ops for call in self.calls)
+
+    def methods(self) -> list[str]:
+        return [call.method for call in self.calls]
+
+    def __str__(self):
+        return (
+            f"{self.name}: {len(self.calls)} db calls ({self.mongo_ops} mongo ops) in {self.elapsed * 1000:.1f}ms"
+            f" - {', '.join(map(str, self.calls))}"
+        )
+
+
+_trace: ContextVar[Trace | None] = ContextVar("db_trace", default=None)
+_call: ContextVar[DBCall | None] = ContextVar("db_call", default=None)
+
+
+@contextmanager
+def trace(name: str) -> Iterator[Trace]:
+    """Collects the storage calls made inside the block (e.g. by a test) into a `Trace`"""
+    current = Trace(name)
+    token = _trace.set(current)
+    try:
+        yield current
+    finally:
+        _trace.reset(token)
+
+
+class CommandCounter(CommandListener):
+    """Counts the mongo commands each traced call issues. Passed to the clients by `ConnectionManager`"""
+
+    def started(self, event):
+        call = _call.get()
+        if call is not None:
+            call.mongo_ops += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def _guild_of(signature: inspect.Signature, args: tuple, kwargs: dict):
+    try:
+        arguments = signature.bind_partial(*args, **kwargs).arguments
+    except TypeError:
+        return None
+    return arguments.get("guild_id", arguments.get("guild_ids"))
+
+
+class TracingDB:
+    """Wraps a `BaseDB`, timing each call to it (see the module docstring). Everything else is passed straight through
+
+    Sync methods stay sync and async methods stay async, so `Tracker` still runs blocking backends in a worker thread.
+    """
+
+    def __init__(self, db: BaseDB, slow_threshold: float = 0.1):
+        self.db = db
+        self.slow_threshold = slow_threshold
+        self._wrapped: dict[str, object] = {}
+
+    def __getattr__(self, name: str):
+        attr = getattr(self.db, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+        # Wrapped once per method, rather than on every call
+        if name not in self._wrapped:
+            self._wrapped[name] = self._wrap(name, attr)
+        return self._wrapped[name]
+
+    def _wrap(self, name: str, method):
+        signature = inspect.signature(method)
+
+        if inspect.iscoroutinefunction(method):
+
+            @functools.wraps(method)
+            async def traced(*args, **kwargs):
+                call, token, start = self._start(name, signature, args, kwargs)
+                try:
+                    return await method(*args, **kwargs)
+                finally:
+                    self._finish(call, token, start)
+
+        else:
+
+            @functools.wraps(method)
+            def traced(*args, **kwargs):
+                call, token, start = self._start(name, signature, args, kwargs)
+                try:
+                    return method(*args, **kwargs)
+                finally:
+                    self._finish(call, token, start)
+
+        return traced
+
+    def _start(self, name: str, signature: inspect.Signature, args: tuple, kwargs: dict):
+        call = DBCall(name, _guild_of(signature, args, kwargs))
+        return call, _call.set(call), time.perf_counter()
+
+    def _finish(self, call: DBCall, token, start: float) -> None:
+        call.elapsed = time.perf_counter() - start
+        _call.reset(token)
+        if (current := _trace.get()) is not None:
+            current.calls.append(call)
+        if call.elapsed > self.slow_threshold:
+            logging.warning(f"[db] Slow call: {call}")
+
+    # ============ Command hooks ============
+    async def command_started(self, ctx) -> None:
+        """`bot.before_invoke` hook: starts collecting the command's calls"""
+        # A group's hooks run first, so its calls and its subcommand's end up in the same trace
+        if getattr(ctx, "db_trace", None) is None:
+            ctx.db_trace = Trace(ctx.command.qualified_name)
+            ctx.db_trace_token = _trace.set(ctx.db_trace)
+
+    async def command_finished(self, ctx) -> None:
+        """`bot.after_invoke` hook: logs the command's calls"""
+        if ctx.invoked_subcommand is not None and ctx.command is not ctx.invoked_subcommand:
+            return
+        current = getattr(ctx, "db_trace", None)
+        if current is None:
+            return
+        _trace.reset(ctx.db_trace_token)
+        ctx.db_trace = None
+        current.name = ctx.command.qualified_name
+        logging.info(f"[db] {current}")
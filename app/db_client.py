@@ -1,102 +1,360 @@
+import asyncio
+import inspect
+import time
+from collections import defaultdict
+from dataclasses import replace
+
+from app import helpers
+from app.cache import TTLCache
 from app.db.base_db import BaseDB
+from app.inventory import InventoryItem
+from app.metrics import Metrics
+from app.model.values import GuildConfig, PlayerRef, RsvpSnapshot, players_from_docs
+from app.roster import RsvpBits
+
+_MISSING = object()
+
+
+def _with_user(users: tuple[PlayerRef, ...], user: PlayerRef) -> tuple[PlayerRef, ...]:
+    return users if user in users else (*users, user)
+
+
+def _without_user(users: tuple[PlayerRef, ...], user_id: int) -> tuple[PlayerRef, ...]:
+    return tuple(user for user in users if user.id != user_id)
+
+
+def _configs(docs: list[dict]) -> list[GuildConfig]:
+    return [config for config in map(GuildConfig.from_doc, docs) if config is not None]
 
 
 class Tracker:
-    def __init__(self, db: BaseDB):
+    """Awaitable facade over a BaseDB implementation
+
+    Async backends are awaited directly. Blocking backends (e.g. mongoengine) are run in a worker thread, so that a slow
+    database round-trip never stalls the discord.py event loop.
+
+    The backends' documents are converted into the value types of `app.model.values` on the way out, so callers get
+    `PlayerRef`s and `GuildConfig`s rather than nested dicts. Each guild's config, roster, and RSVP lists are kept in a
+    TTL/LRU cache. Mutations go to the database first and are then written through to the cache, so read-only commands
+    (and the checks in front of every RSVP) are served from memory.
+
+    Every call to the backend is timed, per method, in `metrics`.
+    """
+
+    def __init__(self, db: BaseDB, cache: TTLCache = None, connect: bool = True, metrics: Metrics = None):
         self.db = db
-        self.db.connect()
+        if connect:
+            self.db.connect()
+        self.cache = cache if cache is not None else TTLCache()
+        self.metrics = metrics if metrics is not None else Metrics()
+        # Bumped on every write to a key, so a read that raced with a write doesn't cache what it read
+        self._generations: defaultdict[tuple, int] = defaultdict(int)
+
+    async def _call(self, method, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            if inspect.iscoroutinefunction(method):
+                return await method(*args, **kwargs)
+            return await asyncio.to_thread(method, *args, **kwargs)
+        except Exception:
+            self.metrics.db_errors.inc(method.__name__)
+            raise
+        finally:
+            self.metrics.db_calls.observe(time.perf_counter() - start, method.__name__)
+
+    # ============ Cache ============
+    async def _cached(self, kind: str, guild_id: int, loader, convert=players_from_docs):
+        key = (kind, guild_id)
+        value = self.cache.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        generation = self._generations[key]
+        value = convert(await self._call(loader, guild_id=guild_id))
+        if self._generations[key] == generation:
+            self.cache.set(key, value)
+        return value
+
+    def _write_through(self, kind: str, guild_id: int, update=None):
+        """Applies `update` to the cached value (if there is one), or drops the cached value if there's no `update`"""
+        key = (kind, guild_id)
+        self._generations[key] += 1
+        current = self.cache.peek(key, _MISSING)
+        if update is None or current is _MISSING:
+            self.cache.pop(key)
+        else:
+            self.cache.set(key, update(current))
+
+    async def connect(self):
+        """Connects the backend, for a tracker created with `connect=False`"""
+        return await self._call(self.db.connect)
+
+    async def ping(self):
+        return await self._call(self.db.ping)
+
+    async def warmup(self, connections: int = 1) -> None:
+        """Opens up to `connections` pooled connections ahead of the first command, by pinging concurrently"""
+        await asyncio.gather(*(self.ping() for _ in range(max(connections, 1))))
+
+    async def close(self):
+        return await self._call(self.db.close)
+
+    async def ensure_indexes(self):
+        return await self._call(self.db.ensure_indexes)
+
+    async def index_report(self) -> dict[str, dict]:
+        return await self._call(self.db.index_report)
+
+    def cache_stats(self) -> dict:
+        return self.cache.stats()
 
     # ============ Players ============
-    def get_players_for_guild(self, guild_id: int):
-        return self.db.get_players_for_guild(guild_id)
+    async def get_players_for_guild(self, guild_id: int) -> tuple[PlayerRef, ...]:
+        return await self._cached("players", guild_id, self.db.get_players_for_guild)
+
+    async def get_rsvp_state_for_guilds(self, guild_ids: list[int]) -> dict[int, RsvpSnapshot]:
+        """The players, attendees, decliners and config of many guilds (see `helpers.rsvp_states`)
+
+        Guilds that are fully cached are served from memory, and all the others are fetched with one bulk read.
+        """
+        kinds = (*helpers.RSVP_LISTS, "config")
+        states, missing = {}, []
+        for guild_id in guild_ids:
+            state = {kind: self.cache.get((kind, guild_id), _MISSING) for kind in kinds}
+            if any(value is _MISSING for value in state.values()):
+                missing.append(guild_id)
+            else:
+                states[guild_id] = RsvpSnapshot(guild_id, **state)
+
+        if missing:
+            keys = [(kind, guild_id) for kind in kinds for guild_id in missing]
+            generations = {key: self._generations[key] for key in keys}
+            fetched = await self._call(self.db.get_rsvp_state_for_guilds, missing)
+            snapshots = {guild_id: RsvpSnapshot.from_state(guild_id, fetched[guild_id]) for guild_id in missing}
+            for key, generation in generations.items():
+                kind, guild_id = key
+                if self._generations[key] == generation:
+                    self.cache.set(key, getattr(snapshots[guild_id], kind))
+            states.update(snapshots)
+        return states
 
     # ============ Attendees ============
-    def get_attendees_for_guild(self, guild_id: int):
-        return self.db.get_attendees_for_guild(guild_id)
+    async def get_attendees_for_guild(self, guild_id: int) -> tuple[PlayerRef, ...]:
+        return await self._cached("attendees", guild_id, self.db.get_attendees_for_guild)
 
     # ============ Config ============
-    def create_guild_config(self,
-                            guild_id: int,
-                            voice_channel_id: int,
-                            dm_username: str,
-                            dm_id: int,
-                            session_day: str,
-                            session_time: str,
-                            meeting_room: int,
-                            first_alert: str,
-                            second_alert: str):
-        self.db.create_guild_config(guild_id=guild_id,
-                                    voice_channel_id=voice_channel_id,
-                                    dm_username=dm_username,
-                                    dm_id=dm_id,
-                                    session_day=session_day,
-                                    session_time=session_time,
-                                    meeting_room=meeting_room,
-                                    first_alert=first_alert,
-                                    second_alert=second_alert)
+    async def get_config_for_guild(self, guild_id: int) -> GuildConfig | None:
+        """The guild's config, or None if it hasn't been configured"""
+        return await self._cached("config", guild_id, self.db.get_config_for_guild, GuildConfig.from_doc)
+
+    async def create_guild_config(
+        self,
+        guild_id: int,
+        voice_channel_id: int,
+        dm_username: str,
+        dm_id: int,
+        session_day: str,
+        session_time: str,
+        meeting_room: int,
+        first_alert: str,
+        second_alert: str,
+    ):
+        await self._call(
+            self.db.create_guild_config,
+            guild_id=guild_id,
+            voice_channel_id=voice_channel_id,
+            dm_username=dm_username,
+            dm_id=dm_id,
+            session_day=session_day,
+            session_time=session_time,
+            meeting_room=meeting_room,
+            first_alert=first_alert,
+            second_alert=second_alert,
+        )
+        self._write_through("config", guild_id)
+
+    async def get_first_alert_configs(self, day_of_week: int) -> list[GuildConfig]:
+        return _configs(await self._call(self.db.get_first_alert_configs, day_of_week))
+
+    async def get_second_alert_configs(self, day_of_week: int) -> list[GuildConfig]:
+        return _configs(await self._call(self.db.get_second_alert_configs, day_of_week))
+
+    async def _config_fields(self, guild_id: int, *fields: str) -> GuildConfig | dict | None:
+        """The guild's cached config if there is one, or else just `fields` read from the database (by their stored
+        names, e.g. "vc-id"). A single field doesn't need the whole config loaded, so that isn't cached here
+        """
+        config = self.cache.get(("config", guild_id), _MISSING)
+        if config is not _MISSING:
+            return config
+        return await self._call(self.db.get_config_fields, guild_id, *fields)
+
+    async def is_session_cancelled(self, guild_id: int) -> bool:
+        config = await self._config_fields(guild_id, "cancel-session")
+        if isinstance(config, dict):
+            return config.get("cancel-session", False)
+        return config is not None and config.cancel_session
+
+    async def get_rsvp_bits(self, guild_id: int) -> RsvpBits:
+        """The guild's RSVP state as bitmasks over its roster, kept up to date by every RSVP written through here"""
+        key = ("rsvp-bits", guild_id)
+        bits = self.cache.get(key, _MISSING)
+        if bits is not _MISSING:
+            return bits
+
+        generation = self._generations[key]
+        # Served from the cached lists if there are any, or else one bulk read
+        bits = (await self.get_rsvp_state_for_guilds([guild_id]))[guild_id].bits()
+        if self._generations[key] == generation:
+            self.cache.set(key, bits)
+        return bits
+
+    async def is_full_group(self, guild_id: int) -> bool:
+        return (await self.get_rsvp_bits(guild_id)).full
+
+    async def get_unanswered_players(self, guild_id: int) -> list:
+        return (await self.get_rsvp_bits(guild_id)).unanswered_ids()
+
+    async def get_session_day_configs(self, day_of_week: int) -> list[GuildConfig]:
+        return _configs(await self._call(self.db.get_session_day_configs, day_of_week))
+
+    async def register_player(self, guild_id: int, player_username: str, player_id: int):
+        res = await self._call(
+            self.db.register_player, guild_id=guild_id, player_username=player_username, player_id=player_id
+        )
+        self._write_through("players", guild_id, lambda users: _with_user(users, PlayerRef(player_id, player_username)))
+        self._write_through("rsvp-bits", guild_id, lambda bits: bits.with_player(player_id))
+        return res
+
+    async def rm_guild_config(self, guild_id: int):
+        res = await self._call(self.db.rm_guild_config, guild_id=guild_id)
+        self._write_through("config", guild_id)
+        return res
+
+    async def set_board_message(self, guild_id: int, message_id: int | None):
+        res = await self._call(self.db.set_board_message, guild_id=guild_id, message_id=message_id)
+
+        self._write_through("config", guild_id, lambda config: config and replace(config, board_message=message_id))
+        return res
+
+    def _drop_rsvp_state(self, guild_id: int):
+        for kind in ("attendees", "decliners", "cancellers", "config", "rsvp-bits"):
+            self._write_through(kind, guild_id)
 
-    def get_first_alert_configs(self, day_of_week: int) -> list:
-        return self.db.get_first_alert_configs(day_of_week)
+    async def reset(self, guild_id: int):
+        res = await self._call(self.db.reset, guild_id=guild_id)
+        self._drop_rsvp_state(guild_id)
+        return res
 
-    def get_second_alert_configs(self, day_of_week: int) -> list:
-        return self.db.get_second_alert_configs(day_of_week)
+    async def reset_guilds(self, guild_ids: list[int]) -> int:
+        """Resets many guilds with one batch of writes (see `BaseDB.reset_guilds`), returning how many were reset"""
+        guild_ids = list(guild_ids)
+        count = await self._call(self.db.reset_guilds, guild_ids)
+        for guild_id in guild_ids:
+            self._drop_rsvp_state(guild_id)
+        return count
 
-    def is_session_cancelled(self, guild_id: int) -> bool:
-        return self.db.is_session_cancelled(guild_id)
+    async def get_all(self, guild_id: int):
+        res = await asyncio.gather(
+            self.get_attendees_for_guild(guild_id),
+            self.get_decliners_for_guild(guild_id),
+            self.get_cancellers_for_guild(guild_id),
+        )
+        return tuple(res)
 
-    def is_full_group(self, guild_id: int) -> bool:
-        return self.db.is_full_group(guild_id)
+    async def add_canceller_for_guild(self, guild_id: int, canceller):
+        res = await self._call(self.db.add_canceller_for_guild, guild_id=guild_id, canceller=canceller)
+        self._write_through("cancellers", guild_id, lambda users: _with_user(users, PlayerRef.from_user(canceller)))
+        return res
 
-    def get_unanswered_players(self, guild_id: int) -> list:
-        return self.db.get_unanswered_players(guild_id)
+    async def get_cancellers_for_guild(self, guild_id: int) -> tuple[PlayerRef, ...]:
+        return await self._cached("cancellers", guild_id, self.db.get_cancellers_for_guild)
 
-    def get_session_day_configs(self, day_of_week: int):
-        return self.db.get_session_day_configs(day_of_week)
+    async def is_registered_player(self, guild_id: int, user):
+        players = await self.get_players_for_guild(guild_id)
+        return PlayerRef(user.id) in players
 
-    def register_player(self, guild_id: int, player_username: str, player_id: int):
-        return self.db.register_player(guild_id=guild_id, player_username=player_username, player_id=player_id)
+    async def add_decliner_for_guild(self, guild_id: int, user):
+        res = await self._call(self.db.add_decliner_for_guild, guild_id=guild_id, decliner=user)
+        self._write_through("decliners", guild_id, lambda users: _with_user(users, PlayerRef.from_user(user)))
+        self._write_through("rsvp-bits", guild_id, lambda bits: bits.set("decliners", user.id, True))
+        return res
 
-    def rm_guild_config(self, guild_id: int):
-        return self.db.rm_guild_config(guild_id=guild_id)
+    async def get_decliners_for_guild(self, guild_id: int) -> tuple[PlayerRef, ...]:
+        return await self._cached("decliners", guild_id, self.db.get_decliners_for_guild)
 
-    def reset(self, guild_id: int):
-        return self.db.reset(guild_id=guild_id)
+    async def rm_attendee_for_guild(self, guild_id: int, user):
+        res = await self._call(self.db.rm_attendee_for_guild, guild_id=guild_id, attendee=user)
+        self._write_through("attendees", guild_id, lambda users: _without_user(users, user.id))
+        self._write_through("rsvp-bits", guild_id, lambda bits: bits.set("attendees", user.id, False))
+        return res
 
-    def get_all(self, guild_id: int):
-        return self.db.get_all(guild_id=guild_id)
+    async def add_attendee_for_guild(self, guild_id: int, user):
+        res = await self._call(self.db.add_attendee_for_guild, guild_id=guild_id, attendee=user)
+        self._write_through("attendees", guild_id, lambda users: _with_user(users, PlayerRef.from_user(user)))
+        self._write_through("rsvp-bits", guild_id, lambda bits: bits.set("attendees", user.id, True))
+        return res
 
-    def add_canceller_for_guild(self, guild_id: int, canceller):
-        return self.db.add_canceller_for_guild(guild_id=guild_id, canceller=canceller)
+    async def rm_decliner_for_guild(self, guild_id: int, user):
+        res = await self._call(self.db.rm_decliner_for_guild, guild_id=guild_id, decliner=user)
+        self._write_through("decliners", guild_id, lambda users: _without_user(users, user.id))
+        self._write_through("rsvp-bits", guild_id, lambda bits: bits.set("decliners", user.id, False))
+        return res
 
-    def get_cancellers_for_guild(self, guild_id: int):
-        return self.db.get_cancellers_for_guild(guild_id=guild_id)
+    async def accept_for_guild(self, guild_id: int, user):
+        attendees = await self._call(self.db.accept_for_guild, guild_id=guild_id, attendee=user)
+        attendees = players_from_docs(attendees)
+        self._write_through("attendees", guild_id, lambda _: attendees)
+        self._write_through("decliners", guild_id, lambda users: _without_user(users, user.id))
+        self._write_through("rsvp-bits", guild_id, lambda bits: bits.accept(user.id))
+        return attendees
 
-    def is_registered_player(self, guild_id: int, user):
-        return self.db.is_registered_player(guild_id=guild_id, player=user)
+    async def decline_for_guild(self, guild_id: int, user):
+        decliners = await self._call(self.db.decline_for_guild, guild_id=guild_id, decliner=user)
+        decliners = players_from_docs(decliners)
+        self._write_through("decliners", guild_id, lambda _: decliners)
+        self._write_through("attendees", guild_id, lambda users: _without_user(users, user.id))
+        self._write_through("rsvp-bits", guild_id, lambda bits: bits.decline(user.id))
+        return decliners
 
-    def add_decliner_for_guild(self, guild_id: int, user):
-        return self.db.add_decliner_for_guild(guild_id=guild_id, decliner=user)
+    async def is_player_dm(self, guild_id: int, player_id: int):
+        config = await self._config_fields(guild_id, "session-dm")
+        if isinstance(config, dict):
+            return (config.get("session-dm") or {}).get("id") == player_id
+        if config is None or config.session_dm is None:
+            return False
+        return config.session_dm.id == player_id
 
-    def get_decliners_for_guild(self, guild_id: int):
-        return self.db.get_decliners_for_guild(guild_id=guild_id)
+    async def cancel_session(self, guild_id: int):
+        res = await self._call(self.db.cancel_session, guild_id=guild_id)
+        self._write_through("config", guild_id, lambda config: config and replace(config, cancel_session=res))
+        return res
 
-    def rm_attendee_for_guild(self, guild_id: int, user):
-        return self.db.rm_attendee_for_guild(guild_id=guild_id, attendee=user)
+    async def get_voice_channel_id(self, server_id: int):
+        config = await self._config_fields(server_id, "vc-id")
+        if isinstance(config, dict):
+            return config["vc-id"]
+        return config.vc_id
 
-    def add_attendee_for_guild(self, guild_id: int, user):
-        return self.db.add_attendee_for_guild(guild_id=guild_id, attendee=user)
+    async def get_campaign_session_dt(self, server_id: int):
+        config = await self._config_fields(server_id, "session-day", "session-time")
+        if isinstance(config, dict):
+            return config["session-day"], config["session-time"]
+        return config.session_day, config.session_time
 
-    def rm_decliner_for_guild(self, guild_id: int, user):
-        return self.db.rm_decliner_for_guild(guild_id=guild_id, decliner=user)
+    # ============ Inventories ============
+    # Not cached: an inventory can hold thousands of items, and is only ever read a page at a time
+    async def get_inventory(self, guild_id: int, player_id: int, skip: int = 0, limit: int = 0) -> list[InventoryItem]:
+        docs = await self._call(self.db.get_inventory, guild_id, player_id, skip=skip, limit=limit)
+        return [InventoryItem.from_doc(doc) for doc in docs]
 
-    def is_player_dm(self, guild_id: int, player_id: int):
-        return self.db.is_player_dm(guild_id=guild_id, player_id=player_id)
+    async def count_inventory(self, guild_id: int, player_id: int) -> int:
+        return await self._call(self.db.count_inventory, guild_id, player_id)
 
-    def cancel_session(self, guild_id: int):
-        return self.db.cancel_session(guild_id=guild_id)
+    async def add_items(self, guild_id: int, player_id: int, items: list[InventoryItem]) -> int:
+        return await self._call(self.db.add_items, guild_id, player_id, items)
 
-    def get_voice_channel_id(self, server_id: int):
-        return self.db.get_voice_channel_id(guild_id=server_id)
+    async def update_items(self, guild_id: int, player_id: int, items: list[InventoryItem]) -> int:
+        return await self._call(self.db.update_items, guild_id, player_id, items)
 
-    def get_campaign_session_dt(self, server_id: int):
-        return self.db.get_campaign_session_dt(guild_id=server_id)
+    async def remove_items(self, guild_id: int, player_id: int, names: list[str]) -> int:
+        return await self._call(self.db.remove_items, guild_id, player_id, names)
@@ -0,0 +1,164 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+
+from app import helpers
+from app.metrics import Metrics
+from app.model.values import GuildConfig, RsvpSnapshot
+
+# The phases of an alert run, in the order they're run in
+PHASES = ("first-alert", "second-alert", "session-dm", "reset")
+
+# The phases that need each guild's RSVP state
+RSVP_PHASES = ("first-alert", "second-alert", "session-dm")
+
+
+@dataclass
+class PhaseSummary:
+    name: str
+    guilds: int = 0
+    failed: list[int] = field(default_factory=list)
+    timed_out: list[int] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    def __str__(self):
+        return (
+            f"{self.name}: {self.guilds} guilds in {self.elapsed:.2f}s "
+            f"({len(self.failed)} failed, {len(self.timed_out)} timed out)"
+        )
+
+
+class AlertDispatcher:
+    """Sends the hourly alerts for every guild that is due one
+
+    The guilds in each phase (first alert, second alert, DM summary) are handled concurrently, with at most
+    `concurrency` guilds in flight at a time. A guild that raises or takes longer than `timeout` seconds is logged and
+    skipped, without holding up or cancelling any of the others. The reset phase is one bulk write for all its guilds.
+    """
+
+    def __init__(self, tracker, bot_tasks, concurrency: int = 10, timeout: float = 30.0, metrics: Metrics = None):
+        self.tracker = tracker
+        self.bot_tasks = bot_tasks
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.metrics = metrics if metrics is not None else Metrics()
+        self._handlers = {
+            "first-alert": self._first_alert,
+            "second-alert": self._second_alert,
+            "session-dm": self._send_dm,
+        }
+
+    async def dispatch(self, today: int) -> list[PhaseSummary]:
+        """Runs every phase for the given day of the week, and logs how long each one took
+
+        :param today: (int) Day of the week, where Monday is 0
+        :return: (list[PhaseSummary]) One summary per phase, in the order they ran
+        """
+        day_before, _ = helpers.adjacent_days(today)
+        phases = [
+            ("first-alert", self.tracker.get_first_alert_configs, today),
+            ("second-alert", self.tracker.get_second_alert_configs, today),
+            ("session-dm", self.tracker.get_session_day_configs, today),
+            ("reset", self.tracker.get_session_day_configs, day_before),
+        ]
+
+        summaries = []
+        for name, get_configs, day in phases:
+            start = time.perf_counter()
+            summary = await self.dispatch_guilds(name, await get_configs(day))
+            # Include the time it took to look up the configs
+            summary.elapsed = time.perf_counter() - start
+            summaries.append(summary)
+
+        logging.info(f"Alert dispatch finished - {'; '.join(map(str, summaries))}")
+        return summaries
+
+    async def dispatch_guilds(self, phase: str, configs: list[GuildConfig]) -> PhaseSummary:
+        """Runs a single phase for the given guild configs
+
+        :param phase: (str) One of `PHASES`
+        :param configs: (list[GuildConfig]) The config of each guild to run the phase for
+        :return: (PhaseSummary) How the phase went
+        """
+        summary = await self._run_phase(phase, configs)
+        self.metrics.phase_finished(summary)
+        return summary
+
+    async def _run_phase(self, phase: str, configs: list[GuildConfig]) -> PhaseSummary:
+        start = time.perf_counter()
+        summary = PhaseSummary(name=phase, guilds=len(configs))
+        if phase == "reset":
+            # Every guild is reset in one batch of writes, rather than a few writes per guild
+            if configs:
+                await self._reset_guilds(configs, summary)
+            summary.elapsed = time.perf_counter() - start
+            return summary
+
+        handler = self._handlers[phase]
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        # Read the RSVP state of all the guilds up front, in one bulk read, rather than a few reads per guild
+        states = {}
+        if phase in RSVP_PHASES and configs:
+            try:
+                states = await self.tracker.get_rsvp_state_for_guilds([config.guild for config in configs])
+            except Exception:
+                logging.exception(f"[{phase}] Couldn't read the RSVP state of {len(configs)} guilds")
+                summary.failed = [config.guild for config in configs]
+                summary.elapsed = time.perf_counter() - start
+                return summary
+
+        async def run(config):
+            guild_id = config.guild
+            async with semaphore:
+                try:
+                    await asyncio.wait_for(handler(config, states.get(guild_id)), timeout=self.timeout)
+                except asyncio.TimeoutError:
+                    logging.warning(f"[{phase}] Guild {guild_id} timed out after {self.timeout}s")
+                    summary.timed_out.append(guild_id)
+                except Exception:
+                    logging.exception(f"[{phase}] Guild {guild_id} failed")
+                    summary.failed.append(guild_id)
+
+        await asyncio.gather(*(run(config) for config in configs))
+        summary.elapsed = time.perf_counter() - start
+        return summary
+
+    # ============ Per-guild handlers ============
+    async def _alert(self, config: GuildConfig, state: RsvpSnapshot, send_alert) -> None:
+        if state.cancelled:
+            logging.debug(f"Next session was cancelled for guild {config.guild}! Won't alert")
+            await self.bot_tasks.cancel_alert_msg(config)
+            return
+
+        bits = state.bits()
+        if bits.full:
+            return
+
+        unanswered = bits.unanswered_ids()
+        # Everyone left has already declined, so there's nobody to remind
+        if unanswered:
+            await send_alert(config, unanswered)
+
+    async def _first_alert(self, config, state) -> None:
+        await self._alert(config, state, self.bot_tasks.first_alert)
+
+    async def _second_alert(self, config, state) -> None:
+        await self._alert(config, state, self.bot_tasks.second_alert)
+
+    async def _send_dm(self, config: GuildConfig, state: RsvpSnapshot) -> None:
+        if not state.cancelled:
+            await self.bot_tasks.send_dm(config, state.attendees, state.decliners)
+
+    # ============ Reset ============
+    async def _reset_guilds(self, configs: list[GuildConfig], summary: PhaseSummary) -> None:
+        start = time.perf_counter()
+        guild_ids = [config.guild for config in configs]
+        try:
+            count = await self.tracker.reset_guilds(guild_ids)
+        except Exception:
+            logging.exception(f"[reset] Couldn't reset {len(guild_ids)} guilds")
+            summary.failed = guild_ids
+        else:
+            logging.info(f"[reset] Reset {count} of {len(guild_ids)} guilds in {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,128 @@
+import logging
+
+from discord.ext import commands
+
+from app import helpers
+from app.board import SessionBoard
+from app.cache import TTLCache
+from app.cog import SessionCog
+from app.constants import Settings, get_settings
+from app.db import create_db
+from app.db.connection import ConnectionManager
+from app.db.tracing import CommandCounter, TracingDB
+from app.db_client import Tracker
+from app.dispatcher import AlertDispatcher
+from app.health import HealthMonitor
+from app.metrics import Metrics, MetricsServer
+from app.outbox import Outbox
+from app.scheduler import AlertScheduler
+from app.tasks import BotTasks
+
+
+class App:
+    """The bot along with the services it runs on, wired together
+
+    Creating an App doesn't connect to anything: the database is connected in `setup` (discord.py's setup hook, which
+    runs once the event loop is up), and discord in `run`.
+    """
+
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        self.start_time = helpers.current_time()
+        self.bot = commands.Bot(
+            command_prefix=settings.discord.bot_prefix,
+            description=settings.discord.bot_desc,
+            intents=settings.discord.bot_intents,
+        )
+        self.bot.setup_hook = self.setup
+        self.metrics = Metrics()
+        self.bot.before_invoke(self._before_command)
+        self.bot.after_invoke(self._after_command)
+
+        db_config = settings.db
+        self.connections = ConnectionManager(db_config, listeners=[CommandCounter()] if db_config.trace else [])
+        db = create_db(db_config.backend, self.connections)
+        # Opt-in, since it logs a line per command
+        self.tracing = TracingDB(db, db_config.slow_call_threshold) if db_config.trace else None
+        self.db_client = Tracker(
+            self.tracing or db,
+            TTLCache(db_config.cache_size, db_config.cache_ttl),
+            connect=False,
+            metrics=self.metrics,
+        )
+        # Every message the bot sends goes through here, so bursts are queued per channel instead of hitting rate limits
+        self.outbox = Outbox()
+        # Pings the database in the background for `status`
+        self.health = HealthMonitor(self.db_client)
+        self.tasks = BotTasks(self.bot, outbox=self.outbox)
+        self.board = SessionBoard(self.db_client, self.tasks.resolver, self.outbox)
+        self.dispatcher = AlertDispatcher(
+            self.db_client,
+            self.tasks,
+            concurrency=settings.discord.alert_concurrency,
+            timeout=settings.discord.alert_timeout,
+            metrics=self.metrics,
+        )
+        self.scheduler = AlertScheduler(self.db_client, self.dispatcher, alert_hour=settings.discord.alert_time)
+        self._register_gauges()
+        # Served on localhost for a local Prometheus (or `curl`) to scrape, unless its port is set to 0
+        self.metrics_server = MetricsServer(self.metrics, settings.metrics.host, settings.metrics.port)
+
+    # discord.py takes a single before/after hook
+    async def _before_command(self, ctx):
+        await self.metrics.command_started(ctx)
+        if self.tracing is not None:
+            await self.tracing.command_started(ctx)
+
+    async def _after_command(self, ctx):
+        await self.metrics.command_finished(ctx)
+        if self.tracing is not None:
+            await self.tracing.command_finished(ctx)
+
+    def _register_gauges(self):
+        cache = self.db_client.cache
+        gauge = self.metrics.gauge
+        gauge("dndbot_cache_hits_total", "Tracker cache hits", lambda: cache.hits, kind="counter")
+        gauge("dndbot_cache_misses_total", "Tracker cache misses", lambda: cache.misses, kind="counter")
+        gauge("dndbot_cache_hit_ratio", "Share of tracker cache reads that were hits", lambda: cache.hit_ratio)
+        gauge("dndbot_cache_size", "Entries in the tracker cache", lambda: len(cache))
+        # discord.py reports an infinite latency until the first heartbeat, which the gauge skips
+        gauge("dndbot_gateway_latency_seconds", "Discord gateway heartbeat latency", lambda: self.bot.latency)
+        gauge("dndbot_outbox_depth", "Messages waiting in the outbox", lambda: self.outbox.depth)
+
+    async def setup(self):
+        # Runs once, before connecting to discord
+        await self.db_client.connect()
+        await self.db_client.warmup(self.settings.db.min_pool_size)
+        logging.debug(f"Database connections warmed up: {self.connections.pool_stats()}")
+        await self.db_client.ensure_indexes()
+        for collection, report in (await self.db_client.index_report()).items():
+            if report["missing"] or report["unused"]:
+                logging.warning(f"Indexes on {collection}: {report}")
+        self.health.start()
+        if self.settings.metrics.port:
+            await self.metrics_server.start()
+        await self.bot.add_cog(SessionCog(self))
+
+    async def run(self):
+        async with self.bot:
+            try:
+                await self.bot.start(self.settings.discord.token)
+            finally:
+                await self.close()
+
+    async def close(self):
+        self.health.stop()
+        await self.metrics_server.stop()
+        await self.scheduler.stop()
+        await self.db_client.close()
+        logging.debug(f"Closed the database connection: {self.connections.pool_stats()}")
+
+
+def create_app(settings: Settings = None) -> App:
+    """Builds the bot and its services, without connecting to discord or the database
+
+    :param settings: (Settings) Defaults to the settings read from the environment
+    :return: (App) The app, ready to `run`
+    """
+    return App(settings if settings is not None else get_settings())
@@ -0,0 +1,112 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from subprocess import CalledProcessError, check_output
+from typing import Callable
+
+from app.helpers import percentile
+
+
+@dataclass(frozen=True)
+class BuildInfo:
+    commit: str
+
+
+def resolve_build_info() -> BuildInfo:
+    """Looks up what version of the bot is running. Meant to be called once at startup, not per command"""
+    try:
+        commit = check_output(["git", "rev-parse", "--short", "HEAD"]).decode("ascii").strip()
+    except (CalledProcessError, OSError):
+        logging.warning("Couldn't resolve the git commit of this build")
+        commit = "unknown"
+    return BuildInfo(commit)
+
+
+class HealthMonitor:
+    """Pings the database in the background, so `status` can report on it without waiting on a round-trip
+
+    The ping goes through the tracker's backend, reusing the application's pooled connection rather than opening a new
+    client per check. The outcome of the latest ping and the latencies of recent successful ones are kept in memory.
+    """
+
+    def __init__(
+        self,
+        tracker,
+        build: BuildInfo = None,
+        interval: float = 30.0,
+        timeout: float = 5.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.tracker = tracker
+        self._build = build
+        self.interval = interval
+        self.timeout = timeout
+        self.clock = clock
+        self.online: bool | None = None
+        self.last_checked: float | None = None
+        self.last_error: str | None = None
+        self.failures = 0
+        self._latencies: deque[float] = deque(maxlen=256)
+        self._task: asyncio.Task | None = None
+
+    @property
+    def build(self) -> BuildInfo:
+        # Resolved on first use (at the latest when the pings start), so creating the monitor stays side effect free
+        if self._build is None:
+            self._build = resolve_build_info()
+        return self._build
+
+    async def check(self) -> bool:
+        """Pings the database once and records the outcome"""
+        start = self.clock()
+        try:
+            await asyncio.wait_for(self.tracker.ping(), timeout=self.timeout)
+        except Exception as e:
+            if self.online is not False:
+                logging.exception("Database ping failed")
+            self.online = False
+            self.last_error = repr(e)
+            self.failures += 1
+        else:
+            self.online = True
+            self.last_error = None
+            self._latencies.append(self.clock() - start)
+        self.last_checked = self.clock()
+        return self.online
+
+    async def run(self) -> None:
+        while True:
+            await self.check()
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        """Starts the background pings, unless they're already running"""
+        if self._task is None or self._task.done():
+            self.build  # Looked up now rather than on the first `status`
+            self._task = asyncio.create_task(self.run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    @property
+    def db_status(self) -> str:
+        if self.online is None:
+            return "unknown"
+        return "online" if self.online else "offline"
+
+    def stats(self) -> dict:
+        latencies = list(self._latencies)
+        return {
+            "db_status": self.db_status,
+            "checked_ago": None if self.last_checked is None else self.clock() - self.last_checked,
+            "last_error": self.last_error,
+            "failures": self.failures,
+            "latency_p50": percentile(latencies, 50),
+            "latency_p95": percentile(latencies, 95),
+            "latency_p99": percentile(latencies, 99),
+            "commit": self.build.commit,
+        }
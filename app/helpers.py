@@ -1,23 +1,32 @@
 from __future__ import annotations
 
 from datetime import datetime, timedelta
-from typing import List, Tuple
+from typing import Iterable, List, Tuple
 
 from mongoengine import QuerySet
 from mongoengine.base import BaseDocument, EmbeddedDocumentList
 from mongoengine.queryset.base import BaseQuerySet
 
 from app import constants
-from app.constants import Emojis, Weekdays
+from app.constants import Weekdays
+from app.roster import RsvpBits
 
 
 def plist(inlist: List) -> str:
     if len(inlist) > 0:
-        return ", ".join([u["name"] for u in inlist])
+        return ", ".join([u.name for u in inlist])
     else:
         return "None"
 
 
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of `values` (0 if there are none)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+
 def adjacent_days(dotw: int) -> Tuple[int, int]:
     if dotw < 0 or dotw > 6:
         raise ValueError
@@ -45,6 +54,30 @@ def get_next_session_day(session_day, session_time) -> datetime:
         return ret_sess_day
 
 
+def parse_session_time(text: str) -> str | None:
+    """Normalizes a 24h "HH:MM" time (e.g. "7:30" to "07:30"), or returns None if it isn't one"""
+    try:
+        return datetime.strptime(text.strip(), "%H:%M").strftime("%H:%M")
+    except ValueError:
+        return None
+
+
+def next_weekday_at(weekday: int, hour: int, now: datetime) -> datetime:
+    """The first time strictly after `now` that falls on `weekday` at `hour` o'clock, in the timezone of `now`
+
+    :param weekday: (int) Day of the week, where Monday is 0
+    :param hour: (int) Hour of the day (24h)
+    :param now: (datetime) A timezone-aware datetime to count from
+    :return: (datetime) The next matching time, localized (so DST changes are accounted for)
+    """
+    days_ahead = (weekday - now.weekday()) % 7
+    for days in (days_ahead, days_ahead + 7):
+        naive = datetime.combine(now.date() + timedelta(days=days), datetime.min.time()).replace(hour=hour)
+        candidate = now.tzinfo.localize(naive) if hasattr(now.tzinfo, "localize") else naive.replace(tzinfo=now.tzinfo)
+        if candidate > now:
+            return candidate
+
+
 def callable_username(username: str):
     return f"<@{username}>".strip()
 
@@ -85,10 +118,55 @@ def doc_to_dict(result: [BaseDocument | QuerySet]) -> dict | list[dict]:
     return res
 
 
-def emoji_to_day(emoji: str) -> str:
-    # Default value will be monday
-    ret = Emojis.MONDAY.value
-    for e in Emojis:
-        if e.value == emoji:
-            ret = Weekdays[e.name].value
-    return ret
+# The lists making up a guild's RSVP state (see `rsvp_states`)
+RSVP_LISTS = ("players", "attendees", "decliners")
+
+
+def rsvp_states(guild_ids: Iterable[int], list_documents: dict[str, Iterable[dict]], configs: Iterable[dict]) -> dict:
+    """Groups documents fetched for many guilds at once into one RSVP state per guild
+
+    :param guild_ids: (Iterable[int]) The guilds that were fetched
+    :param list_documents: (dict[str, Iterable[dict]]) For each of `RSVP_LISTS`, the guild documents holding that list
+    :param configs: (Iterable[dict]) The config documents of the guilds
+    :return: (dict[int, dict]) For each guild, its `players`, `attendees`, `decliners` (empty if it has none) and
+        `config` document (same as `get_config_for_guild`, so {} if it has none)
+    """
+    states = {guild_id: {**{field: [] for field in RSVP_LISTS}, "config": {}} for guild_id in guild_ids}
+    for field, documents in list_documents.items():
+        for document in documents:
+            states[document["guild"]][field] = document.get(field, [])
+    for config in configs:
+        states[config["guild"]]["config"] = config
+    return states
+
+
+def config_projection(fields: Iterable[str]) -> dict:
+    """A projection of only the given settings of a config document
+
+    :param fields: (Iterable[str]) Config settings, by the names they're stored under (e.g. "vc-id")
+    :return: (dict) The projection, to pass to `find_one`/`find_one_and_update`
+    """
+    return {"_id": 0, **{f"config.{field}": 1 for field in fields}}
+
+
+def all_players_attending(players: list[dict], attendees: list[dict]) -> bool:
+    """Checks if every registered player is also in the attendee list
+
+    :param players: (list[dict]) The registered players of a guild
+    :param attendees: (list[dict]) The players that accepted the upcoming session
+    :return: (bool) True if all the players are attending
+    """
+    return RsvpBits.from_lists(players, attendees, []).full
+
+
+def unanswered_players(players: list[dict], attendees: list[dict], decliners: list[dict]) -> list:
+    """Figures out which players have neither accepted nor declined the upcoming session
+
+    :param players: (list[dict]) The registered players of a guild
+    :param attendees: (list[dict]) The players that accepted the upcoming session
+    :param decliners: (list[dict]) The players that declined the upcoming session
+    :return: (list) IDs of the players that haven't answered, or ["dnd-players"] if no one has answered yet
+    """
+    # Players: 0b1111 | Attendees: 0b0101 | Rejections: 0b0010
+    # players & ~(attendees | rejections) = 0b1000
+    return RsvpBits.from_lists(players, attendees, decliners).unanswered_ids()
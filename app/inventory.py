@@ -0,0 +1,66 @@
+"""Player inventories: how item names are matched, and the `QTY:ITEM` lists the `inv` commands take"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+
+# Long enough for any sensible item name, while keeping the (guild, player, item) index keys small
+MAX_NAME_LENGTH = 100
+# The most of one item a player can be given at once. Far below mongo's 64-bit integers, so adding to a stack can't
+# overflow either
+MAX_QTY = 1_000_000
+
+_ITEM = re.compile(r"\s*(\d+)\s*:\s*(\S.*?)\s*", re.ASCII | re.DOTALL)
+
+
+class InventoryError(ValueError):
+    """An `inv` argument that couldn't be parsed. The message is meant to be shown to the player"""
+
+
+def normalize_item(name: str) -> str:
+    """The name an item is indexed under, so "Healing  potion" and "healing Potion" are the same item"""
+    return " ".join(name.split()).casefold()
+
+
+@dataclass(frozen=True, slots=True)
+class InventoryItem:
+    name: str
+    qty: int = 1
+
+    @property
+    def key(self) -> str:
+        return normalize_item(self.name)
+
+    @classmethod
+    def from_doc(cls, doc: dict) -> InventoryItem:
+        return cls(doc["name"], doc["qty"])
+
+
+def parse_items(text: str, min_qty: int = 1) -> list[InventoryItem]:
+    """Parses a comma separated list of `QTY:ITEM` pairs, e.g. "3:Healing Potion, 50:Arrow"
+
+    :param text: (str) The list, as the player typed it
+    :param min_qty: (int) The smallest quantity allowed (0 for `inv update`, where it removes the item)
+    :return: (list[InventoryItem]) The items, in the order they were given
+    :raises InventoryError: If any pair isn't `QTY:ITEM` (or its quantity is out of range), or no items were given
+    """
+    items = []
+    for part in filter(str.strip, text.split(",")):
+        match = _ITEM.fullmatch(part)
+        if match is None:
+            raise InventoryError(f"`{part.strip()}` isn't a QTY:ITEM pair (e.g. `3:Healing Potion`)")
+        digits, name = match[1].lstrip("0") or "0", " ".join(match[2].split())
+        # Compared by length first, so a very long number isn't converted at all
+        if len(digits) > len(str(MAX_QTY)) or int(digits) > MAX_QTY:
+            raise InventoryError(f"The quantity of {name} can be at most {MAX_QTY:,}")
+        qty = int(digits)
+        if qty < min_qty:
+            raise InventoryError(f"The quantity of {name} has to be at least {min_qty}")
+        if len(name) > MAX_NAME_LENGTH:
+            raise InventoryError(f"Item names can be at most {MAX_NAME_LENGTH} characters long")
+        items.append(InventoryItem(name, qty))
+
+    if not items:
+        raise InventoryError("No items given, use `QTY:ITEM, QTY:ITEM, ...`")
+    return items
@@ -0,0 +1,202 @@
+"""The bot's metrics, and the HTTP endpoint a Prometheus server scrapes them from
+
+Components record into a shared `Metrics` (see `app.factory`): command latencies, database backend calls, and alert
+runs. Values that already live somewhere else (cache hits, gateway latency, ...) are gauges that are read at scrape
+time. The text exposition format is simple enough to render here, so there's no client library to depend on, and
+aiohttp (which discord.py already runs on) serves it.
+"""
+
+import logging
+import math
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Callable, Iterator
+
+from aiohttp import web
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Upper bounds (in seconds) of the latency histograms' buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+Sample = tuple[str, str, float]
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n")
+
+
+def _labels(names: tuple[str, ...], values: tuple) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+def _number(value: float) -> str:
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values: defaultdict[tuple, float] = defaultdict(float)
+
+    def inc(self, *labels, amount: float = 1.0) -> None:
+        self._values[labels] += amount
+
+    def value(self, *labels) -> float:
+        return self._values.get(labels, 0.0)
+
+    def samples(self) -> Iterator[Sample]:
+        for labels, value in sorted(self._values.items()):
+            yield self.name, _labels(self.labelnames, labels), value
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, help: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS
+    ):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: the count of each bucket (not yet cumulative), then the sum and the count of all observations
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, value: float, *labels) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * len(self.buckets) + [0.0, 0]
+        bucket = bisect_left(self.buckets, value)
+        if bucket < len(self.buckets):
+            series[bucket] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def count(self, *labels) -> int:
+        series = self._series.get(labels)
+        return series[-1] if series else 0
+
+    def samples(self) -> Iterator[Sample]:
+        names = (*self.labelnames, "le")
+        for labels, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                yield f"{self.name}_bucket", _labels(names, (*labels, _number(bound))), cumulative
+            # The +Inf bucket holds every observation, including those over the last bound
+            yield f"{self.name}_bucket", _labels(names, (*labels, "+Inf")), series[-1]
+            yield f"{self.name}_sum", _labels(self.labelnames, labels), series[-2]
+            yield f"{self.name}_count", _labels(self.labelnames, labels), series[-1]
+
+
+class Gauge:
+    """A value that's read when the metrics are scraped, e.g. the size of a cache. `read` returns None when unknown"""
+
+    def __init__(self, name: str, help: str, read: Callable[[], float | None], kind: str = "gauge"):
+        self.name = name
+        self.help = help
+        self.read = read
+        self.kind = kind
+
+    def samples(self) -> Iterator[Sample]:
+        try:
+            value = self.read()
+        except Exception:
+            logging.exception(f"Couldn't read {self.name}")
+            return
+        if value is not None and math.isfinite(value):
+            yield self.name, "", value
+
+
+class Metrics:
+    """Everything the bot measures, rendered in the Prometheus text format by `render`"""
+
+    def __init__(self):
+        self.commands = Histogram(
+            "dndbot_command_duration_seconds", "Time taken to run a command", ("command", "outcome")
+        )
+        self.db_calls = Histogram(
+            "dndbot_db_call_duration_seconds", "Time taken by database backend calls", ("method",)
+        )
+        self.db_errors = Counter("dndbot_db_call_errors_total", "Database backend calls that raised", ("method",))
+        self.alert_phases = Histogram(
+            "dndbot_alert_phase_duration_seconds", "Time taken to run an alert phase for all its guilds", ("phase",)
+        )
+        self.alert_guilds = Counter(
+            "dndbot_alert_guilds_total", "Guilds an alert phase ran for, by outcome", ("phase", "outcome")
+        )
+        self._metrics: list = [self.commands, self.db_calls, self.db_errors, self.alert_phases, self.alert_guilds]
+
+    def gauge(self, name: str, help: str, read: Callable[[], float | None], kind: str = "gauge") -> None:
+        """Adds a value that's read at scrape time (`kind="counter"` for running totals kept elsewhere)"""
+        self._metrics.append(Gauge(name, help, read, kind))
+
+    # ============ Recording ============
+    async def command_started(self, ctx) -> None:
+        """`bot.before_invoke` hook"""
+        ctx.metrics_started = time.perf_counter()
+
+    async def command_finished(self, ctx) -> None:
+        """`bot.after_invoke` hook"""
+        # A group's hooks run around its own callback too, before its subcommand's do. Only time the subcommand
+        if ctx.invoked_subcommand is not None and ctx.command is not ctx.invoked_subcommand:
+            return
+        started = getattr(ctx, "metrics_started", None)
+        if started is not None:
+            outcome = "error" if ctx.command_failed else "ok"
+            self.commands.observe(time.perf_counter() - started, ctx.command.qualified_name, outcome)
+
+    def phase_finished(self, summary) -> None:
+        """Records how a `PhaseSummary` went"""
+        self.alert_phases.observe(summary.elapsed, summary.name)
+        failed, timed_out = len(summary.failed), len(summary.timed_out)
+        self.alert_guilds.inc(summary.name, "ok", amount=summary.guilds - failed - timed_out)
+        self.alert_guilds.inc(summary.name, "failed", amount=failed)
+        self.alert_guilds.inc(summary.name, "timed_out", amount=timed_out)
+
+    # ============ Exposition ============
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(f"{name}{labels} {_number(value)}" for name, labels, value in metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """Serves `GET /metrics` over HTTP, bound to localhost by default so it's only reachable by a local scraper"""
+
+    def __init__(self, metrics: Metrics, host: str = "127.0.0.1", port: int = 9464):
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self._runner: web.AppRunner | None = None
+
+    async def handle(self, request: web.Request) -> web.Response:
+        return web.Response(body=self.metrics.render().encode(), headers={"Content-Type": CONTENT_TYPE})
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_get("/metrics", self.handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logging.info(f"Serving metrics on {self.addresses}")
+
+    @property
+    def addresses(self) -> list:
+        return self._runner.addresses if self._runner is not None else []
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
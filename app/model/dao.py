@@ -1,5 +1,13 @@
-from mongoengine import BooleanField, Document, EmbeddedDocument, EmbeddedDocumentField, EmbeddedDocumentListField, IntField, LongField, \
-    StringField
+from mongoengine import (
+    BooleanField,
+    Document,
+    EmbeddedDocument,
+    EmbeddedDocumentField,
+    EmbeddedDocumentListField,
+    IntField,
+    LongField,
+    StringField,
+)
 
 
 # +++++++++++++ Embedded Documents +++++++++++++
@@ -22,6 +30,20 @@ class _Config(EmbeddedDocument):
     second_alert = IntField(db_field="second-alert", required=True)
     alerts = BooleanField(required=True, default=True)
     cancel_session = BooleanField(db_field="cancel-session", required=True, default=False)
+    # The "session board" message in the meeting room, that is edited as players RSVP
+    board_message = LongField(db_field="board-message")
+
+
+# +++++++++++++ Indexes +++++++++++++
+# Every collection is looked up by guild, and holds (at most) one document per guild
+GUILD_INDEX = {"fields": ["guild"], "unique": True}
+
+# Lookups done by the alert dispatcher: configs that have alerts on, for a given day of the week
+ALERT_INDEXES = [
+    ("config.first_alert", "config.alerts"),
+    ("config.second_alert", "config.alerts"),
+    ("config.session_day", "config.alerts"),
+]
 
 
 # +++++++++++++ Collection Documents +++++++++++++
@@ -29,22 +51,59 @@ class Players(Document):
     guild = LongField(required=True)
     players = EmbeddedDocumentListField(User)
 
+    meta = {"indexes": [GUILD_INDEX]}
+
 
 class Config(Document):
     guild = LongField(required=True)
     config = EmbeddedDocumentField(_Config)
 
+    meta = {"indexes": [GUILD_INDEX, *ALERT_INDEXES]}
+
 
 class Attendees(Document):
     guild = LongField(required=True)
     attendees = EmbeddedDocumentListField(User)
 
+    meta = {"indexes": [GUILD_INDEX]}
+
 
 class Cancellers(Document):
     guild = LongField(required=True)
     cancellers = EmbeddedDocumentListField(User)
 
+    meta = {"indexes": [GUILD_INDEX]}
+
 
 class Decliners(Document):
     guild = LongField(required=True)
     decliners = EmbeddedDocumentListField(User)
+
+    meta = {"indexes": [GUILD_INDEX]}
+
+
+class GuildState(Document):
+    """All the state of a single guild (roster, RSVP lists, cancel votes, and config) kept in one document"""
+
+    guild = LongField(required=True)
+    players = EmbeddedDocumentListField(User)
+    attendees = EmbeddedDocumentListField(User)
+    decliners = EmbeddedDocumentListField(User)
+    cancellers = EmbeddedDocumentListField(User)
+    config = EmbeddedDocumentField(_Config)
+
+    meta = {"collection": "guild-state", "indexes": [GUILD_INDEX, *ALERT_INDEXES]}
+
+
+class Inventory(Document):
+    """One item of one player's inventory. An inventory can hold thousands of items, so each is its own document"""
+
+    guild = LongField(required=True)
+    player = LongField(required=True)
+    # The name the item is looked up by, see `app.inventory.normalize_item`
+    item = StringField(required=True)
+    # The name as it was first given, for display
+    name = StringField(required=True)
+    qty = IntField(required=True, min_value=1)
+
+    meta = {"collection": "inventories", "indexes": [{"fields": ["guild", "player", "item"], "unique": True}]}
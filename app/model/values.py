@@ -0,0 +1,114 @@
+"""Immutable value types for the data the bot passes around, in place of the dicts the database returns
+
+The storage backends return documents shaped like the mongo collections (`{"guild": ..., "config": {"meeting-room":
+...}}`). The `Tracker` converts them into these types once, on the way out, so everything above it reads attributes
+instead of nested dict keys, and its cache holds compact objects rather than dicts.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Iterable
+
+from app.roster import RsvpBits
+
+
+@dataclass(frozen=True, slots=True)
+class PlayerRef:
+    """A discord user, equal to (and hashed like) any other reference with the same ID, whatever its name"""
+
+    id: int
+    name: str = field(default="", compare=False)
+
+    @classmethod
+    def from_doc(cls, doc: dict) -> PlayerRef:
+        return cls(doc["id"], doc.get("name", ""))
+
+    @classmethod
+    def from_user(cls, user) -> PlayerRef:
+        """From a discord `User`/`Member` (or anything else with an `id` and a `name`)"""
+        return cls(user.id, user.name)
+
+    def to_doc(self) -> dict:
+        return {"name": self.name, "id": self.id}
+
+
+def players_from_docs(docs: Iterable[dict]) -> tuple[PlayerRef, ...]:
+    return tuple(PlayerRef.from_doc(doc) for doc in docs or ())
+
+
+@dataclass(frozen=True, slots=True)
+class GuildConfig:
+    """A guild's config, as saved by the `config` command. Hashed by guild ID"""
+
+    guild: int
+    session_day: int
+    session_time: str
+    first_alert: int
+    second_alert: int
+    meeting_room: int
+    vc_id: int | None = None
+    session_dm: PlayerRef | None = None
+    alerts: bool = True
+    cancel_session: bool = False
+    board_message: int | None = None
+
+    def __hash__(self) -> int:
+        return hash(self.guild)
+
+    @classmethod
+    def from_doc(cls, doc: dict) -> GuildConfig | None:
+        """From a config document (`{"guild": ..., "config": {...}}`), or None if the guild has no config"""
+        settings = (doc or {}).get("config")
+        if not settings:
+            return None
+        session_dm = settings.get("session-dm")
+        return cls(
+            guild=doc["guild"],
+            session_day=settings["session-day"],
+            session_time=settings["session-time"],
+            first_alert=settings["first-alert"],
+            second_alert=settings["second-alert"],
+            meeting_room=settings["meeting-room"],
+            vc_id=settings.get("vc-id"),
+            session_dm=PlayerRef.from_doc(session_dm) if session_dm else None,
+            alerts=settings.get("alerts", True),
+            cancel_session=settings.get("cancel-session", False),
+            board_message=settings.get("board-message"),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class RsvpSnapshot:
+    """A guild's roster, RSVP lists, and config at one point in time. Hashed by guild ID"""
+
+    guild: int
+    players: tuple[PlayerRef, ...] = ()
+    attendees: tuple[PlayerRef, ...] = ()
+    decliners: tuple[PlayerRef, ...] = ()
+    config: GuildConfig | None = None
+
+    def __hash__(self) -> int:
+        return hash(self.guild)
+
+    @classmethod
+    def from_state(cls, guild_id: int, state: dict) -> RsvpSnapshot:
+        """From one guild's entry of `BaseDB.get_rsvp_state_for_guilds`"""
+        return cls(
+            guild_id,
+            players_from_docs(state["players"]),
+            players_from_docs(state["attendees"]),
+            players_from_docs(state["decliners"]),
+            GuildConfig.from_doc(state["config"]),
+        )
+
+    @property
+    def cancelled(self) -> bool:
+        return self.config is not None and self.config.cancel_session
+
+    def bits(self) -> RsvpBits:
+        return RsvpBits.from_ids(
+            (player.id for player in self.players),
+            (player.id for player in self.attendees),
+            (player.id for player in self.decliners),
+        )
@@ -0,0 +1,208 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Hashable
+
+import discord
+
+from app.cache import TTLCache
+from app.helpers import percentile
+
+
+class TokenBucket:
+    """Allows `capacity` acquisitions per `per` seconds, refilling continuously"""
+
+    def __init__(self, capacity: int, per: float, clock: Callable[[], float] = time.monotonic):
+        self.capacity = capacity
+        self.rate = capacity / per
+        self.clock = clock
+        self.tokens = float(capacity)
+        self.updated = clock()
+
+    def delay(self) -> float:
+        """Seconds until a token is available (0 if one is available now)"""
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self) -> None:
+        self.tokens -= 1
+
+
+@dataclass
+class OutboundMessage:
+    send: Callable[..., Awaitable[Any]]
+    kwargs: dict
+    coalesce_key: Hashable = None
+    queued_at: float = field(default_factory=time.monotonic)
+    futures: list[asyncio.Future] = field(default_factory=list)
+
+
+class Outbox:
+    """Queues outbound messages per channel, and sends them without running into discord's rate limits
+
+    Each channel has its own queue and token bucket (5 messages per 5 seconds by default, like discord's per-channel
+    limit), and every send also takes a token from a bucket shared by all channels. Messages wait in the queue until
+    both buckets allow them through, instead of discord.py sleeping inline once a 429 comes back.
+
+    A message queued with a `coalesce_key` replaces any message with the same key that is still waiting in that
+    channel's queue, so a burst of updates to the same thing (e.g. the attendee list) goes out as one message.
+
+    Reactions have their own per-channel bucket (discord limits them separately, and more strictly), see `react`.
+    """
+
+    def __init__(
+        self,
+        channel_rate: tuple[int, float] = (5, 5.0),
+        global_rate: tuple[int, float] = (50, 1.0),
+        reaction_rate: tuple[int, float] = (4, 1.0),
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.channel_rate = channel_rate
+        self.reaction_rate = reaction_rate
+        self.clock = clock
+        self.global_bucket = TokenBucket(*global_rate, clock=clock)
+        # A bucket that has been idle for a whole period is full again, so it can be dropped
+        self._buckets = TTLCache(maxsize=4096, ttl=channel_rate[1], timer=clock)
+        self._queues: dict[Hashable, deque[OutboundMessage]] = {}
+        self._workers: dict[Hashable, asyncio.Task] = {}
+        self._latencies: deque[float] = deque(maxlen=1024)
+        self.sent = 0
+        self.coalesced = 0
+        self.failed = 0
+
+    # ============ Queueing ============
+    def send(self, channel, content: str = None, *, coalesce_key: Hashable = None, **kwargs) -> asyncio.Future:
+        """Queues `channel.send(content, **kwargs)`
+
+        :param channel: The channel (or user, for DMs) to send to
+        :param content: (str) The message text
+        :param coalesce_key: (Hashable) Optional key; a queued message in the same channel with the same key is replaced
+        :return: (asyncio.Future) Resolves to the sent message once it's been sent
+        """
+        if content is not None:
+            kwargs["content"] = content
+        return self._enqueue(channel.id, channel.send, kwargs, coalesce_key)
+
+    def reply(self, message, content: str = None, *, coalesce_key: Hashable = None, **kwargs) -> asyncio.Future:
+        """Queues `message.reply(content, **kwargs)` on the message's channel (see `send`)"""
+        if content is not None:
+            kwargs["content"] = content
+        return self._enqueue(message.channel.id, message.reply, kwargs, coalesce_key)
+
+    def edit(self, message, *, coalesce_key: Hashable = None, **kwargs) -> asyncio.Future:
+        """Queues `message.edit(**kwargs)` on the message's channel (see `send`)
+
+        Queued edits of the same message are always coalesced, since only the last one would be visible anyway.
+        """
+        coalesce_key = coalesce_key if coalesce_key is not None else ("edit", message.id)
+        return self._enqueue(message.channel.id, message.edit, kwargs, coalesce_key)
+
+    async def react(self, message, *emojis: str) -> None:
+        """Adds reactions to a message, all in flight at once as fast as the channel's reaction bucket allows
+
+        Rather than waiting for each reaction to be added before sending the next one, every reaction waits only for a
+        token, so reactions that fit in the bucket take a single round-trip between them.
+        """
+        key = ("reactions", message.channel.id)
+
+        async def add(emoji: str):
+            await self._acquire(key, self.reaction_rate)
+            await message.add_reaction(emoji)
+
+        await asyncio.gather(*map(add, emojis))
+
+    def _enqueue(self, key: Hashable, send, kwargs: dict, coalesce_key: Hashable) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        queue = self._queues.setdefault(key, deque())
+
+        pending = next((m for m in queue if coalesce_key is not None and m.coalesce_key == coalesce_key), None)
+        if pending is not None:
+            # Keep its place in the queue, but send the newer content (to the newer target)
+            pending.send, pending.kwargs = send, kwargs
+            pending.futures.append(future)
+            self.coalesced += 1
+        else:
+            queue.append(OutboundMessage(send, kwargs, coalesce_key, self.clock(), [future]))
+
+        if key not in self._workers:
+            self._workers[key] = asyncio.create_task(self._drain(key))
+        return future
+
+    # ============ Sending ============
+    def _bucket(self, key: Hashable, rate: tuple[int, float]) -> TokenBucket:
+        bucket = self._buckets.peek(key)
+        if bucket is None:
+            bucket = TokenBucket(*rate, clock=self.clock)
+        # Refresh its expiry on every use
+        self._buckets.set(key, bucket)
+        return bucket
+
+    async def _acquire(self, key: Hashable, rate: tuple[int, float] = None) -> None:
+        bucket = self._bucket(key, rate or self.channel_rate)
+        while (delay := max(bucket.delay(), self.global_bucket.delay())) > 0:
+            await asyncio.sleep(delay)
+        bucket.take()
+        self.global_bucket.take()
+
+    async def _drain(self, key: Hashable) -> None:
+        queue = self._queues[key]
+        try:
+            while queue:
+                await self._acquire(key)
+                # Only taken off the queue now, so it could still be coalesced with while it waited
+                await self._send(key, queue.popleft())
+        finally:
+            del self._workers[key]
+            if not queue:
+                del self._queues[key]
+
+    async def _send(self, key: Hashable, message: OutboundMessage) -> None:
+        """Sends a message, and settles the futures of everyone waiting on it with the result"""
+        try:
+            sent = await message.send(**message.kwargs)
+        except Exception as e:
+            if isinstance(e, discord.NotFound):
+                # e.g. editing a session board that was deleted, which the caller handles (by posting a new one)
+                logging.debug(f"Couldn't send a message to {key}, it or its channel no longer exists")
+            else:
+                logging.exception(f"Couldn't send a message to {key}")
+            self.failed += 1
+            for future in message.futures:
+                if not future.done():
+                    future.set_exception(e)
+                    # Already logged above, so don't warn again if nobody awaits it
+                    future.exception()
+        else:
+            self.sent += 1
+            self._latencies.append(self.clock() - message.queued_at)
+            for future in message.futures:
+                if not future.done():
+                    future.set_result(sent)
+
+    async def flush(self) -> None:
+        """Waits until every queued message has been sent"""
+        while self._workers:
+            await asyncio.gather(*self._workers.values(), return_exceptions=True)
+
+    # ============ Metrics ============
+    @property
+    def depth(self) -> int:
+        """Messages waiting to be sent, across all channels"""
+        return sum(map(len, self._queues.values()))
+
+    def stats(self) -> dict:
+        latencies = list(self._latencies)
+        return {
+            "depth": self.depth,
+            "channels": len(self._queues),
+            "max_channel_depth": max(map(len, self._queues.values()), default=0),
+            "sent": self.sent,
+            "coalesced": self.coalesced,
+            "failed": self.failed,
+            "latency_p50": percentile(latencies, 50),
+            "latency_p95": percentile(latencies, 95),
+        }
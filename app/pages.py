@@ -0,0 +1,89 @@
+from collections.abc import Awaitable, Callable, Sequence
+
+import discord
+from discord import Embed
+
+# Rows per page. An embed can hold at most 25 fields (and 6000 characters), so one row per field always fits
+PAGE_SIZE = 25
+
+# Fetches a page of rows: (skip, limit) -> rows
+Fetch = Callable[[int, int], Awaitable[Sequence]]
+
+
+def sliced(rows: Sequence) -> Fetch:
+    """A `Fetch` over rows that are already in memory (e.g. a roster out of the tracker's cache)"""
+
+    async def fetch(skip: int, limit: int) -> Sequence:
+        return rows[skip : skip + limit]
+
+    return fetch
+
+
+class Paginator(discord.ui.View):
+    """Shows rows one page at a time, with buttons to move between the pages
+
+    A page is only fetched (through `fetch(skip, limit)`, e.g. a skip/limit query) when it's first shown, and kept for
+    when it's shown again, so the rows of pages nobody looks at are never loaded. `render` turns a page of rows into
+    the fields of its embed. Only the member that ran the command can turn the pages.
+    """
+
+    def __init__(
+        self,
+        author,
+        title: str,
+        fetch: Fetch,
+        render: Callable[[Sequence], list[dict]],
+        total: int,
+        page_size: int = PAGE_SIZE,
+        timeout: float = 180.0,
+    ):
+        super().__init__(timeout=timeout)
+        self.author = author
+        self.title = title
+        self.fetch = fetch
+        self.render = render
+        self.page_size = page_size
+        self.pages = max(1, -(-total // page_size))
+        self.page = 0
+        self.message = None
+        self._fetched: dict[int, Sequence] = {}
+
+    async def embed(self) -> Embed:
+        """The embed of the current page, fetching the page if it hasn't been yet"""
+        if self.page not in self._fetched:
+            self._fetched[self.page] = await self.fetch(self.page * self.page_size, self.page_size)
+        self.previous.disabled = self.page == 0
+        self.next.disabled = self.page == self.pages - 1
+        page = {"title": self.title, "fields": self.render(self._fetched[self.page])}
+        if self.pages > 1:
+            page["footer"] = {"text": f"Page {self.page + 1} of {self.pages}"}
+        return Embed().from_dict(page)
+
+    async def _turn(self, interaction: discord.Interaction, page: int):
+        self.page = min(max(page, 0), self.pages - 1)
+        await interaction.response.edit_message(embed=await self.embed(), view=self)
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id == self.author.id:
+            return True
+        await interaction.response.send_message(
+            "Only the member that ran the command can turn the pages", ephemeral=True
+        )
+        return False
+
+    async def on_timeout(self):
+        # Drop the buttons, since they won't do anything anymore
+        if self.message is not None:
+            try:
+                await self.message.edit(view=None)
+            except discord.HTTPException:
+                # e.g. the message was deleted before the buttons timed out
+                pass
+
+    @discord.ui.button(label="Prev", emoji="◀️", style=discord.ButtonStyle.secondary)
+    async def previous(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._turn(interaction, self.page - 1)
+
+    @discord.ui.button(label="Next", emoji="▶️", style=discord.ButtonStyle.secondary)
+    async def next(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._turn(interaction, self.page + 1)
@@ -0,0 +1,93 @@
+import asyncio
+from collections import Counter
+from typing import Any, Awaitable, Callable
+
+from app.cache import TTLCache
+
+
+class DiscordResolver:
+    """Looks up discord channels and users, going to the REST API only when it has to
+
+    Objects are looked up in the gateway cache first (`get_channel`/`get_user`), then in a TTL cache of objects that
+    were fetched before, and only then fetched over REST. Concurrent lookups of the same object share one fetch, so an
+    alert fan-out across many guilds doesn't eat into the rate limits.
+    """
+
+    def __init__(self, bot, cache: TTLCache = None):
+        self.bot = bot
+        self.cache = cache if cache is not None else TTLCache(maxsize=1024, ttl=600.0)
+        self.gateway_hits: Counter[str] = Counter()
+        self.fetches: Counter[str] = Counter()
+        # Lookups that waited on a fetch another lookup had already started
+        self.shared_fetches: Counter[str] = Counter()
+        self._in_flight: dict[tuple[str, int], asyncio.Future] = {}
+
+    async def _resolve(
+        self, kind: str, object_id: int, get: Callable[[int], Any], fetch: Callable[[int], Awaitable[Any]]
+    ) -> Any:
+        resolved = get(object_id)
+        if resolved is not None:
+            self.gateway_hits[kind] += 1
+            return resolved
+
+        key = (kind, object_id)
+        resolved = self.cache.get(key)
+        if resolved is not None:
+            return resolved
+
+        if key in self._in_flight:
+            self.shared_fetches[kind] += 1
+            shared = self._in_flight[key]
+            try:
+                return await asyncio.shield(shared)
+            except asyncio.CancelledError:
+                # The lookup doing the fetch was cancelled (e.g. it timed out), not this one, so fetch it again
+                if shared.cancelled() and not asyncio.current_task().cancelling():
+                    return await self._resolve(kind, object_id, get, fetch)
+                raise
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            self.fetches[kind] += 1
+            resolved = await fetch(object_id)
+        except Exception as e:
+            future.set_exception(e)
+            # Nobody else may be waiting on it, so don't let it be reported as never retrieved
+            future.exception()
+            raise
+        else:
+            self.cache.set(key, resolved)
+            future.set_result(resolved)
+            return resolved
+        finally:
+            # Cancelled, which `except Exception` doesn't catch. Don't leave the lookups waiting on it hanging
+            if not future.done():
+                future.cancel()
+            del self._in_flight[key]
+
+    async def channel(self, channel_id: int) -> Any:
+        return await self._resolve("channel", channel_id, self.bot.get_channel, self.bot.fetch_channel)
+
+    async def user(self, user_id: int) -> Any:
+        return await self._resolve("user", user_id, self.bot.get_user, self.bot.fetch_user)
+
+    def invalidate(self, kind: str, object_id: int) -> None:
+        """Drops a fetched object, e.g. once the channel has been deleted"""
+        self.cache.pop((kind, object_id))
+
+    @property
+    def hit_ratio(self) -> float:
+        """The share of lookups that didn't need a REST call"""
+        hits = sum(self.gateway_hits.values()) + self.cache.hits + sum(self.shared_fetches.values())
+        lookups = hits + sum(self.fetches.values())
+        return hits / lookups if lookups else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "gateway_hits": dict(self.gateway_hits),
+            "cache_hits": self.cache.hits,
+            "shared_fetches": dict(self.shared_fetches),
+            "fetches": dict(self.fetches),
+            "hit_ratio": self.hit_ratio,
+        }
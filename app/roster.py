@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, replace
+from typing import Iterable
+
+
+class Roster:
+    """A guild's registered players, each given a slot (a bit position) by registration order
+
+    With slots, a set of players is just an int, so "has everyone accepted" and "who hasn't answered" are a couple of
+    bitwise operations instead of comparing lists of user dicts. Slots are stable: registering a player appends a new
+    slot, and never moves the existing ones.
+    """
+
+    __slots__ = ("ids", "slots", "everyone")
+
+    def __init__(self, player_ids: Iterable[int] = ()):
+        self.ids: tuple[int, ...] = tuple(dict.fromkeys(player_ids))
+        self.slots: dict[int, int] = {player_id: slot for slot, player_id in enumerate(self.ids)}
+        # Every player's bit set
+        self.everyone: int = (1 << len(self.ids)) - 1
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Roster) and self.ids == other.ids
+
+    def with_player(self, player_id: int) -> Roster:
+        return self if player_id in self.slots else Roster((*self.ids, player_id))
+
+    def bit(self, user_id: int) -> int:
+        """The user's bit, or 0 if they aren't on the roster"""
+        slot = self.slots.get(user_id)
+        return 0 if slot is None else 1 << slot
+
+    def mask(self, user_ids: Iterable[int]) -> int:
+        """The bits of every rostered player in `user_ids`"""
+        mask = 0
+        for user_id in user_ids:
+            mask |= self.bit(user_id)
+        return mask
+
+    def members(self, mask: int) -> list[int]:
+        """The IDs of the players whose bits are set in `mask`, in slot order"""
+        members = []
+        while mask:
+            low = mask & -mask
+            members.append(self.ids[low.bit_length() - 1])
+            mask ^= low
+        return members
+
+
+@dataclass(frozen=True, slots=True)
+class RsvpBits:
+    """A guild's RSVP state as bitmasks over its roster"""
+
+    roster: Roster
+    attendees: int = 0
+    decliners: int = 0
+
+    @classmethod
+    def from_ids(cls, players: Iterable[int], attendees: Iterable[int], decliners: Iterable[int]) -> RsvpBits:
+        roster = Roster(players)
+        return cls(roster, roster.mask(attendees), roster.mask(decliners))
+
+    @classmethod
+    def from_lists(cls, players: list[dict], attendees: list[dict], decliners: list[dict]) -> RsvpBits:
+        """From lists of user dicts, as the database returns them"""
+        return cls.from_ids(*([user["id"] for user in users] for users in (players, attendees, decliners)))
+
+    @property
+    def full(self) -> bool:
+        """True if every registered player has accepted"""
+        return self.attendees & self.roster.everyone == self.roster.everyone
+
+    @property
+    def unanswered(self) -> int:
+        """The players that have neither accepted nor declined"""
+        return self.roster.everyone & ~(self.attendees | self.decliners)
+
+    @property
+    def silent(self) -> bool:
+        """True if no player has answered yet"""
+        return self.unanswered == self.roster.everyone
+
+    def unanswered_ids(self) -> list:
+        """IDs of the players that haven't answered, or ["dnd-players"] if no one has answered yet"""
+        return ["dnd-players"] if self.silent else self.roster.members(self.unanswered)
+
+    # ============ Updates ============
+    def with_player(self, player_id: int) -> RsvpBits:
+        return replace(self, roster=self.roster.with_player(player_id))
+
+    def accept(self, user_id: int) -> RsvpBits:
+        bit = self.roster.bit(user_id)
+        return replace(self, attendees=self.attendees | bit, decliners=self.decliners & ~bit)
+
+    def decline(self, user_id: int) -> RsvpBits:
+        bit = self.roster.bit(user_id)
+        return replace(self, attendees=self.attendees & ~bit, decliners=self.decliners | bit)
+
+    def set(self, field: str, user_id: int, present: bool) -> RsvpBits:
+        """Sets (or clears) the user's bit in either `attendees` or `decliners`"""
+        bit = self.roster.bit(user_id)
+        mask = getattr(self, field)
+        return replace(self, **{field: mask | bit if present else mask & ~bit})
@@ -0,0 +1,222 @@
+import asyncio
+import contextvars
+import heapq
+import logging
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable
+
+from app import constants, helpers
+from app.dispatcher import PHASES, AlertDispatcher, PhaseSummary
+from app.model.values import GuildConfig
+
+# Seconds between attempts to load the configs on startup (e.g. while the database is down), doubling up to the max
+LOAD_RETRY_DELAY = 5.0
+MAX_LOAD_RETRY_DELAY = 300.0
+
+
+@dataclass(order=True)
+class ScheduledAlert:
+    when: datetime
+    guild_id: int = field(compare=False)
+    phase: str = field(compare=False)
+    generation: int = field(compare=False)
+
+
+def alert_days(config: GuildConfig) -> dict[str, int]:
+    """The day of the week each phase runs on for a guild, given its config"""
+    return {
+        "first-alert": config.first_alert,
+        "second-alert": config.second_alert,
+        "session-dm": config.session_day,
+        # The RSVP lists are reset the day after the session
+        "reset": (config.session_day + 1) % 7,
+    }
+
+
+def alert_hour(config: GuildConfig, day: int, default: int) -> int:
+    """The hour a phase on `day` runs at for a guild: `default`, unless that isn't before the guild's session"""
+    if day != config.session_day:
+        return default
+    hour, minute = map(int, config.session_time.split(":"))
+    # Alerts go out on the hour, so a session that starts on the hour gets them the hour before
+    return min(default, hour if minute else max(hour - 1, 0))
+
+
+class AlertScheduler:
+    """Keeps the next alert of every configured guild in a heap, and sleeps until the earliest one is due
+
+    Every phase fires at `alert_hour` on its guild's configured day, or earlier on the session day if the session starts
+    by then, so the session DM doesn't arrive after the session has started. Changing a guild's config (or removing it)
+    replaces the guild's scheduled alerts; the outdated entries are left in the heap and skipped once at the top.
+    """
+
+    def __init__(
+        self,
+        tracker,
+        dispatcher: AlertDispatcher,
+        alert_hour: int,
+        clock: Callable[[], datetime] = lambda: datetime.now(constants.eastern_tz),
+        load_retry_delay: float = LOAD_RETRY_DELAY,
+    ):
+        self.tracker = tracker
+        self.dispatcher = dispatcher
+        self.alert_hour = alert_hour
+        self.clock = clock
+        self.load_retry_delay = load_retry_delay
+        self._heap: list[ScheduledAlert] = []
+        # Bumped whenever a guild is (re|un)scheduled, so its older heap entries can be told apart
+        self._generations: defaultdict[int, int] = defaultdict(int)
+        self._configs: dict[int, GuildConfig] = {}
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    # ============ Scheduling ============
+    def schedule(self, guild_id: int, config: GuildConfig | None) -> list[ScheduledAlert]:
+        """Replaces the scheduled alerts of a guild with ones computed from its config
+
+        :param guild_id: (int) The guild to schedule
+        :param config: (GuildConfig) The guild's config. Guilds without one, or with alerts turned off, are unscheduled.
+        :return: (list[ScheduledAlert]) The alerts that were scheduled
+        """
+        self._generations[guild_id] += 1
+        if config is None or not config.alerts:
+            self._configs.pop(guild_id, None)
+            return []
+
+        self._configs[guild_id] = config
+        now = self.clock()
+        generation = self._generations[guild_id]
+        alerts = [
+            ScheduledAlert(
+                helpers.next_weekday_at(day, alert_hour(config, day, self.alert_hour), now), guild_id, phase, generation
+            )
+            for phase, day in alert_days(config).items()
+        ]
+        for alert in alerts:
+            heapq.heappush(self._heap, alert)
+
+        # The new alerts may be due before whatever the loop is currently sleeping until
+        self._wakeup.set()
+        return alerts
+
+    def unschedule(self, guild_id: int) -> None:
+        self._generations[guild_id] += 1
+        self._configs.pop(guild_id, None)
+
+    async def reschedule(self, guild_id: int) -> list[ScheduledAlert]:
+        """Re-reads a guild's config and schedules its alerts from it"""
+        return self.schedule(guild_id, await self.tracker.get_config_for_guild(guild_id))
+
+    async def load(self) -> int:
+        """Schedules every guild that has alerts turned on
+
+        :return: (int) The number of guilds that were scheduled
+        """
+        # Every config has a session day, so this covers all of them
+        by_day = await asyncio.gather(*(self.tracker.get_session_day_configs(day) for day in range(7)))
+        configs = [config for day_configs in by_day for config in day_configs]
+        for config in configs:
+            self.schedule(config.guild, config)
+        return len(configs)
+
+    def _is_current(self, alert: ScheduledAlert) -> bool:
+        return alert.generation == self._generations[alert.guild_id]
+
+    def pending(self) -> list[ScheduledAlert]:
+        """The alerts that are still scheduled, earliest first"""
+        return sorted(alert for alert in self._heap if self._is_current(alert))
+
+    def next_alert(self) -> ScheduledAlert | None:
+        # Drop any outdated alerts sitting at the top of the heap
+        while self._heap and not self._is_current(self._heap[0]):
+            heapq.heappop(self._heap)
+        return self._heap[0] if self._heap else None
+
+    def pop_due(self, now: datetime) -> list[ScheduledAlert]:
+        due = []
+        while (alert := self.next_alert()) is not None and alert.when <= now:
+            due.append(heapq.heappop(self._heap))
+        return due
+
+    # ============ Running ============
+    async def run_due(self) -> list[PhaseSummary]:
+        """Dispatches every alert that is due, then schedules the guilds' following alerts
+
+        :return: (list[PhaseSummary]) One summary per phase that had due alerts
+        """
+        due = self.pop_due(self.clock())
+        if not due:
+            return []
+
+        guild_ids = {alert.guild_id for alert in due}
+        results = await asyncio.gather(*map(self.tracker.get_config_for_guild, guild_ids), return_exceptions=True)
+        configs = {}
+        for guild_id, result in zip(guild_ids, results):
+            if isinstance(result, Exception):
+                logging.error(f"Couldn't read the config of guild {guild_id}, skipping its alerts", exc_info=result)
+                # Keep the guild on its old schedule, rather than dropping it until the next restart
+                self.schedule(guild_id, self._configs.get(guild_id))
+            else:
+                # No config means it was removed since the alert was scheduled
+                configs[guild_id] = result
+
+        summaries = []
+        for phase in PHASES:
+            phase_configs = [
+                configs[alert.guild_id] for alert in due if alert.phase == phase and configs.get(alert.guild_id)
+            ]
+            if phase_configs:
+                summaries.append(await self.dispatcher.dispatch_guilds(phase, phase_configs))
+
+        for guild_id, config in configs.items():
+            self.schedule(guild_id, config)
+
+        logging.info(f"Scheduled alerts sent - {'; '.join(map(str, summaries))}")
+        return summaries
+
+    async def _load_until_loaded(self) -> int:
+        # If this gave up, no alert would ever be sent again
+        delay = self.load_retry_delay
+        while True:
+            try:
+                return await self.load()
+            except Exception:
+                logging.exception(f"Couldn't load the alert schedule, retrying in {delay:.0f}s")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, MAX_LOAD_RETRY_DELAY)
+
+    async def run(self) -> None:
+        scheduled = await self._load_until_loaded()
+        logging.info(f"Scheduled alerts for {scheduled} guilds")
+        while True:
+            alert = self.next_alert()
+            delay = None if alert is None else max((alert.when - self.clock()).total_seconds(), 0)
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+            try:
+                await self.run_due()
+            except Exception:
+                logging.exception("Couldn't send the scheduled alerts")
+
+    def start(self) -> asyncio.Task:
+        """Starts the scheduler loop in the background, unless it's already running"""
+        if self._task is None or self._task.done():
+            # In a context of its own, so the alerts aren't traced as part of whatever started the scheduler
+            self._task = asyncio.create_task(self.run(), context=contextvars.Context())
+        return self._task
+
+    async def stop(self) -> None:
+        """Stops the scheduler loop and waits for it to finish, so it isn't part way through an alert run on shutdown"""
+        if self._task is not None:
+            task, self._task = self._task, None
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
@@ -2,55 +2,59 @@ from typing import Any
 
 from app import helpers
 from app.helpers import plist
+from app.outbox import Outbox
+from app.resolver import DiscordResolver
 
 
 class BotTasks:
-    def __init__(self, bot):
+    def __init__(self, bot, resolver: DiscordResolver = None, outbox: Outbox = None):
         self.bot = bot
+        self.resolver = resolver if resolver is not None else DiscordResolver(bot)
+        self.outbox = outbox if outbox is not None else Outbox()
 
     async def first_alert(self, config, unanswered) -> None:
-        channel: Any = await self.bot.fetch_channel(config["config"]["meeting-room"])
+        channel: Any = await self.resolver.channel(config.meeting_room)
         at_ids = list(map(helpers.callable_username, unanswered))
         if "@dnd-players" in at_ids[0]:
-            await channel.send(
-                f"@dnd-players Are we good for our D&D session? Please use either `{self.bot.command_prefix}rsvp accept` or `{self.bot.command_prefix}rsvp decline`."
+            await self.outbox.send(
+                channel,
+                f"@dnd-players Are we good for our D&D session? Please use either `{self.bot.command_prefix}rsvp accept` or `{self.bot.command_prefix}rsvp decline`.",
             )
         else:
-            await channel.send(
-                f"{', '.join(at_ids)} Are we good for our D&D session? Please use either `{self.bot.command_prefix}rsvp accept` or `{self.bot.command_prefix}rsvp decline`."
+            await self.outbox.send(
+                channel,
+                f"{', '.join(at_ids)} Are we good for our D&D session? Please use either `{self.bot.command_prefix}rsvp accept` or `{self.bot.command_prefix}rsvp decline`.",
             )
 
     async def second_alert(self, config, unanswered) -> None:
-        channel: Any = await self.bot.fetch_channel(config["config"]["meeting-room"])
+        channel: Any = await self.resolver.channel(config.meeting_room)
         at_ids = list(map(helpers.callable_username, unanswered))
 
         if "@dnd-players" in at_ids[0]:
-            await channel.send(
-                f"Please RSVP: @dnd-players `{self.bot.command_prefix}rsvp accept` or `{self.bot.command_prefix}rsvp decline`."
+            await self.outbox.send(
+                channel,
+                f"Please RSVP: @dnd-players `{self.bot.command_prefix}rsvp accept` or `{self.bot.command_prefix}rsvp decline`.",
             )
         else:
-            await channel.send(
-                f"Please RSVP: {','.join(at_ids)} `{self.bot.command_prefix}rsvp accept` or `{self.bot.command_prefix}rsvp decline`."
+            await self.outbox.send(
+                channel,
+                f"Please RSVP: {','.join(at_ids)} `{self.bot.command_prefix}rsvp accept` or `{self.bot.command_prefix}rsvp decline`.",
             )
 
     async def session_alert(self, config) -> None:
-        channel: Any = await self.bot.fetch_channel(config["config"]["meeting-room"])
-        await channel.send(
-            f"Game tonight! Please RSVP: `{self.bot.command_prefix}rsvp accept` or `{self.bot.command_prefix}rsvp decline`."
+        channel: Any = await self.resolver.channel(config.meeting_room)
+        await self.outbox.send(
+            channel,
+            f"Game tonight! Please RSVP: `{self.bot.command_prefix}rsvp accept` or `{self.bot.command_prefix}rsvp decline`.",
         )
 
     async def cancel_alert_msg(self, config) -> None:
-        channel: Any = await self.bot.fetch_channel(config["config"]["meeting-room"])
-        await channel.send("Reminder, the upcoming session was cancelled!")
+        channel: Any = await self.resolver.channel(config.meeting_room)
+        await self.outbox.send(channel, "Reminder, the upcoming session was cancelled!")
 
-    async def send_dm(self, config, tracker) -> None:
-        dm: Any = await self.bot.fetch_user(config["config"]["session-dm"]["id"])
+    async def send_dm(self, config, attendees, decliners) -> None:
+        dm: Any = await self.resolver.user(config.session_dm.id)
         if dm is None:
             print(f"We didn't get a user when using config: {config}")
         else:
-            await dm.send(
-                f"Confirm List: {plist(tracker.get_attendees_for_guild(config['guild']))}\nDecline list: {plist(tracker.get_decliners_for_guild(config['guild']))}"
-            )
-
-    def reset(self, config, tracker) -> None:
-        tracker.reset(config["guild"])
+            await self.outbox.send(dm, f"Confirm List: {plist(attendees)}\nDecline list: {plist(decliners)}")
@@ -0,0 +1,86 @@
+import discord
+
+from app import helpers
+from app.constants import Emojis, Weekdays
+
+# The day questions of the `config` command, in the order they're shown
+DAY_QUESTIONS = (
+    ("session-day", "What day of the week is the session typically had?"),
+    ("first-alert", "When would you like to send the first alert?"),
+    ("second-alert", "When would you like to send the second alert?"),
+)
+
+# Everything the wizard has to collect before it can be saved
+ANSWERS = (*(key for key, _ in DAY_QUESTIONS), "session-time")
+
+
+class DaySelect(discord.ui.Select):
+    """A select menu of the days of the week, that records the chosen day on its wizard"""
+
+    def __init__(self, key: str, question: str, row: int):
+        options = [
+            discord.SelectOption(label=day.name.title(), value=str(day.value), emoji=Emojis[day.name].value)
+            for day in Weekdays
+        ]
+        super().__init__(placeholder=question, options=options, row=row)
+        self.key = key
+
+    async def callback(self, interaction: discord.Interaction):
+        self.view.answers[self.key] = int(self.values[0])
+        await interaction.response.defer()
+
+
+class SessionTimeModal(discord.ui.Modal, title="Session time"):
+    session_time = discord.ui.TextInput(label="Session time ET (24h HH:MM)", placeholder="19:30", max_length=5)
+
+    def __init__(self, wizard: "ConfigWizard"):
+        super().__init__()
+        self.wizard = wizard
+
+    async def on_submit(self, interaction: discord.Interaction):
+        session_time = helpers.parse_session_time(self.session_time.value)
+        if session_time is None:
+            await interaction.response.send_message("That's not a time, use 24h HH:MM (e.g. 19:30)", ephemeral=True)
+            return
+        self.wizard.answers["session-time"] = session_time
+        await interaction.response.send_message(f"Session time set to {session_time}", ephemeral=True)
+
+
+class ConfigWizard(discord.ui.View):
+    """The whole `config` flow in one message: a select menu per day question, and buttons for the time and to save
+
+    Each answer is a single interaction, instead of a message whose reactions (one REST call per day) have to be added
+    before it can be answered. Only the member that ran the command can use it. Once `wait` returns, `saved` says
+    whether it was completed (rather than timing out), and `answers` holds the days (as `Weekdays` values) and the time.
+    """
+
+    def __init__(self, author, timeout: float = 180.0):
+        super().__init__(timeout=timeout)
+        self.author = author
+        self.answers: dict = {}
+        self.saved = False
+        for row, (key, question) in enumerate(DAY_QUESTIONS):
+            self.add_item(DaySelect(key, question, row))
+
+    @property
+    def missing(self) -> list[str]:
+        return [answer for answer in ANSWERS if answer not in self.answers]
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id == self.author.id:
+            return True
+        await interaction.response.send_message("Only the member configuring the bot can answer", ephemeral=True)
+        return False
+
+    @discord.ui.button(label="Set session time", style=discord.ButtonStyle.secondary, row=3)
+    async def set_time(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await interaction.response.send_modal(SessionTimeModal(self))
+
+    @discord.ui.button(label="Save", style=discord.ButtonStyle.success, row=3)
+    async def save(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if missing := self.missing:
+            await interaction.response.send_message(f"Still missing: {', '.join(missing)}", ephemeral=True)
+            return
+        self.saved = True
+        await interaction.response.defer()
+        self.stop()
@@ -0,0 +1,74 @@
+import mongomock
+import pytest
+
+
+class AsyncMockCursor:
+    """Awaitable stand-in for pymongo's AsyncCursor, backed by a mongomock cursor"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def __getattr__(self, name):
+        attr = getattr(self._cursor, name)
+
+        def chain(*args, **kwargs):
+            attr(*args, **kwargs)
+            return self
+
+        return chain
+
+    async def to_list(self, length=None):
+        return list(self._cursor)
+
+
+class AsyncMockCollection:
+    """Awaitable stand-in for pymongo's AsyncCollection, backed by a mongomock collection"""
+
+    def __init__(self, collection):
+        self._collection = collection
+
+    def find(self, *args, **kwargs):
+        return AsyncMockCursor(self._collection.find(*args, **kwargs))
+
+    async def aggregate(self, *args, **kwargs):
+        return AsyncMockCursor(self._collection.aggregate(*args, **kwargs))
+
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+
+        async def call(*args, **kwargs):
+            return attr(*args, **kwargs)
+
+        return call
+
+
+class AsyncMockDatabase:
+    def __init__(self, database):
+        self._database = database
+
+    def __getitem__(self, name):
+        return AsyncMockCollection(self._database[name])
+
+    async def command(self, *args, **kwargs):
+        return self._database.command(*args, **kwargs)
+
+
+class AsyncMockClient:
+    """Awaitable stand-in for pymongo's AsyncMongoClient, backed by a mongomock client"""
+
+    def __init__(self):
+        self._client = mongomock.MongoClient()
+
+    def get_default_database(self, default=None, **kwargs):
+        return AsyncMockDatabase(self._client[default])
+
+    def __getitem__(self, name):
+        return AsyncMockDatabase(self._client[name])
+
+    async def close(self):
+        self._client.close()
+
+
+@pytest.fixture
+def async_mongo_client():
+    return AsyncMockClient()
@@ -0,0 +1,112 @@
+import asyncio
+from dataclasses import replace
+from unittest.mock import AsyncMock, MagicMock
+
+import discord
+import pytest
+
+from app.board import SessionBoard, board_embed
+from app.model.values import GuildConfig, PlayerRef
+from app.outbox import Outbox
+
+
+class TestSessionBoard:
+    @pytest.fixture
+    def tracker(self):
+        tracker = MagicMock()
+        tracker.config = GuildConfig(1, 2, "19:00", 0, 1, meeting_room=42)
+        tracker.get_config_for_guild = AsyncMock(side_effect=lambda guild_id: tracker.config)
+        tracker.get_all = AsyncMock(return_value=((PlayerRef(123, "test"),), (), ()))
+
+        async def set_board_message(guild_id, message_id):
+            tracker.config = replace(tracker.config, board_message=message_id)
+
+        tracker.set_board_message = AsyncMock(side_effect=set_board_message)
+        return tracker
+
+    @pytest.fixture
+    def board_message(self):
+        return MagicMock(id=555, edit=AsyncMock(return_value="edited"))
+
+    @pytest.fixture
+    def channel(self, board_message):
+        channel = MagicMock(id=42)
+        channel.send = AsyncMock(return_value=MagicMock(id=555))
+        channel.get_partial_message.return_value = board_message
+        board_message.channel = channel
+        return channel
+
+    @pytest.fixture
+    def board(self, tracker, channel):
+        resolver = MagicMock(channel=AsyncMock(return_value=channel))
+        return SessionBoard(tracker, resolver, Outbox(), delay=0.01)
+
+    def test_board_embed(self):
+        embed = board_embed((PlayerRef(123, "test"),), (), (), cancelled=True)
+        assert [field.name for field in embed.fields] == ["Accepted", "Declined", "Voted to cancel"]
+        assert (embed.fields[0].value, embed.fields[1].value) == ("test", "None")
+        assert embed.description == "The upcoming session has been cancelled!"
+
+    def test_first_render_posts_a_board(self, tracker, channel, board):
+        asyncio.run(board.render(1))
+        channel.send.assert_awaited_once()
+        tracker.set_board_message.assert_awaited_once_with(1, 555)
+
+    def test_render_edits_the_board(self, tracker, channel, board, board_message):
+        tracker.config = replace(tracker.config, board_message=555)
+        assert asyncio.run(board.render(1)) == "edited"
+        channel.get_partial_message.assert_called_once_with(555)
+        channel.send.assert_not_awaited()
+
+    def test_deleted_board_is_reposted(self, tracker, channel, board, board_message):
+        tracker.config = replace(tracker.config, board_message=444)
+        board_message.edit.side_effect = discord.NotFound(MagicMock(status=404), "Unknown Message")
+        asyncio.run(board.render(1))
+        channel.send.assert_awaited_once()
+        tracker.set_board_message.assert_awaited_once_with(1, 555)
+
+    def test_unconfigured_guild(self, tracker, channel, board):
+        tracker.config = None
+        assert asyncio.run(board.render(1)) is None
+        channel.send.assert_not_awaited()
+
+    def test_updates_are_debounced(self, tracker, channel, board, board_message):
+        async def rsvp():
+            for _ in range(5):
+                board.request_update(1)
+            await board.flush()
+            # The board exists now, so later updates edit it
+            board.request_update(1)
+            board.request_update(1)
+            await board.flush()
+
+        asyncio.run(rsvp())
+        assert tracker.get_all.await_count == 2
+        channel.send.assert_awaited_once()
+        board_message.edit.assert_awaited_once()
+
+    def test_request_during_render_redraws(self, tracker, channel, board):
+        async def get_all(guild_id):
+            # Another RSVP comes in while the lists are being read
+            if tracker.get_all.await_count == 1:
+                board.request_update(1)
+            return [], [], []
+
+        tracker.get_all.side_effect = get_all
+
+        async def rsvp():
+            board.request_update(1)
+            await board.flush()
+
+        asyncio.run(rsvp())
+        assert tracker.get_all.await_count == 2
+
+    def test_failed_render_is_logged(self, tracker, board):
+        tracker.get_all.side_effect = RuntimeError("db down")
+
+        async def rsvp():
+            board.request_update(1)
+            await board.flush()
+
+        asyncio.run(rsvp())
+        assert board._pending == {}
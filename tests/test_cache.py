@@ -0,0 +1,63 @@
+import pytest
+
+from app.cache import TTLCache
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTTLCache:
+    @pytest.fixture
+    def timer(self):
+        return FakeTimer()
+
+    @pytest.fixture
+    def cache(self, timer):
+        return TTLCache(maxsize=2, ttl=10, timer=timer)
+
+    def test_get_counts_hits_and_misses(self, cache):
+        assert cache.get("a") is None
+        cache.set("a", 1)
+        assert cache.get("a") == 1
+        assert cache.stats() == {"size": 1, "maxsize": 2, "hits": 1, "misses": 1}
+        assert cache.hit_ratio == 0.5
+
+    def test_peek_does_not_count(self, cache):
+        cache.set("a", 1)
+        assert cache.peek("a") == 1
+        assert cache.peek("b", "default") == "default"
+        assert cache.hits == 0
+        assert cache.misses == 0
+
+    def test_entries_expire(self, cache, timer):
+        cache.set("a", 1)
+        timer.now = 9.9
+        assert "a" in cache
+        timer.now = 10
+        assert "a" not in cache
+        assert len(cache) == 0
+
+    def test_evicts_least_recently_used(self, cache):
+        cache.set("a", 1)
+        cache.set("b", 2)
+        # Touch "a", so "b" is the least recently used
+        cache.get("a")
+        cache.set("c", 3)
+        assert "a" in cache
+        assert "b" not in cache
+        assert "c" in cache
+
+    def test_pop(self, cache):
+        cache.set("a", 1)
+        assert cache.pop("a") == 1
+        assert cache.pop("a", "default") == "default"
+
+    def test_zero_maxsize_disables_caching(self, timer):
+        cache = TTLCache(maxsize=0, ttl=10, timer=timer)
+        cache.set("a", 1)
+        assert "a" not in cache
@@ -0,0 +1,96 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import mongoengine
+import mongomock
+import pytest
+
+from app.constants import DatabaseConfig
+from app.db import connection
+from app.db.connection import ConnectionManager, PoolStats, available_compressors
+from app.db.mongo_async import AsyncMongo
+from app.db.mongo_odm import MongoEngine
+from app.db_client import Tracker
+
+
+def test_available_compressors():
+    def find_spec(module):
+        return object() if module == "snappy" else None
+
+    with patch.object(connection.importlib.util, "find_spec", side_effect=find_spec):
+        assert available_compressors("zstd, snappy,zlib") == ["snappy", "zlib"]
+        assert available_compressors("") == []
+
+
+def test_pool_stats():
+    pool = PoolStats()
+    for _ in range(3):
+        pool.connection_created(None)
+    pool.connection_checked_out(None)
+    pool.connection_checked_out(None)
+    pool.connection_checked_in(None)
+    pool.connection_closed(None)
+    stats = pool.stats()
+    assert (stats["open"], stats["in_use"], stats["created"]) == (2, 1, 3)
+
+
+class TestConnectionManager:
+    @pytest.fixture
+    def manager(self):
+        config = DatabaseConfig(
+            "localhost",
+            27017,
+            "user",
+            "password",
+            "dnd-bot",
+            max_pool_size=7,
+            min_pool_size=3,
+            server_selection_timeout=1.5,
+            compressors="zlib",
+            read_preference="secondaryPreferred",
+            connection_str="mongodb://localhost:27017/dnd-bot",
+        )
+        return ConnectionManager(config)
+
+    def test_client_options(self, manager):
+        options = manager.client_options()
+        assert (options["maxPoolSize"], options["minPoolSize"]) == (7, 3)
+        assert options["serverSelectionTimeoutMS"] == 1500
+        assert (options["compressors"], options["readPreference"]) == ("zlib", "secondaryPreferred")
+        assert options["event_listeners"] == [manager.pool]
+
+    def test_async_client(self, manager):
+        client = manager.async_client()
+        assert client.options.pool_options.max_pool_size == 7
+        assert client.options.server_selection_timeout == 1.5
+        asyncio.run(client.close())
+
+    def test_mongoengine_backend(self, manager):
+        backend = MongoEngine(manager)
+        # Registers mongoengine's default connection, which the backend then goes through
+        backend.connections.connect_mongoengine(mongo_client_class=mongomock.MongoClient)
+        backend.ping()
+        backend.close()
+        with pytest.raises(mongoengine.ConnectionFailure):
+            mongoengine.get_connection()
+
+    def test_async_backend_uses_the_manager(self, manager):
+        backend = AsyncMongo(connections=manager)
+        backend.connect()
+        assert backend.client.options.pool_options.min_pool_size == 3
+        assert backend.database.name == "dnd-bot"
+        asyncio.run(backend.close())
+
+
+class TestTrackerLifecycle:
+    def test_warmup_pings_concurrently(self):
+        db = MagicMock(ping=AsyncMock(), close=AsyncMock())
+        tracker = Tracker(db)
+        asyncio.run(tracker.warmup(3))
+        assert db.ping.await_count == 3
+        asyncio.run(tracker.warmup(0))
+        assert db.ping.await_count == 4
+
+    def test_close(self, async_mongo_client):
+        tracker = Tracker(AsyncMongo(client=async_mongo_client))
+        asyncio.run(tracker.close())
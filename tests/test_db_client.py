@@ -0,0 +1,240 @@
+import asyncio
+
+import mongoengine
+import mongomock
+import pytest
+
+from app.db.guild_state import GuildStateEngine
+from app.db.mongo_async import AsyncMongo
+from app.db.mongo_odm import MongoEngine
+from app.db_client import Tracker
+from app.inventory import InventoryItem
+from app.model.dao import Attendees, Players, User
+from app.model.values import PlayerRef, RsvpSnapshot, players_from_docs
+
+
+class TestTracker:
+    @pytest.fixture
+    def test_player(self):
+        return User(name="test", id=123)
+
+    @pytest.fixture
+    def mongoengine_tracker(self):
+        mongoengine.connect(
+            db="mongoenginetest",
+            host="mongodb://localhost",
+            mongo_client_class=mongomock.MongoClient,
+        )
+        # Tracker connects on creation, so skip the real connection string for the mongomock one above
+        db = MongoEngine()
+        db.connect = lambda conn_str=None: None
+        yield Tracker(db)
+        mongoengine.disconnect()
+
+    @pytest.fixture
+    def async_tracker(self, async_mongo_client):
+        return Tracker(AsyncMongo(client=async_mongo_client))
+
+    def test_blocking_backend_is_awaitable(self, mongoengine_tracker, test_player):
+        Players(guild=1, players=[test_player]).save()
+        Attendees(guild=1, attendees=[]).save()
+
+        async def accept():
+            await mongoengine_tracker.add_attendee_for_guild(1, test_player)
+            return await mongoengine_tracker.is_full_group(1)
+
+        assert asyncio.run(accept()) is True
+
+    @pytest.fixture
+    def seeded_tracker(self, async_tracker, test_player):
+        async def seed():
+            await async_tracker.register_player(guild_id=1, player_username=test_player.name, player_id=test_player.id)
+            await async_tracker.db.create_guild_config(
+                guild_id=1,
+                voice_channel_id=1123,
+                dm_username=test_player.name,
+                dm_id=test_player.id,
+                session_day="2",
+                session_time="11:00",
+                meeting_room=1234567889,
+                first_alert="9",
+                second_alert="10",
+            )
+
+        asyncio.run(seed())
+        return async_tracker
+
+    def test_reads_are_served_from_cache(self, seeded_tracker):
+        async def read_twice():
+            first = await seeded_tracker.get_players_for_guild(1)
+            second = await seeded_tracker.get_players_for_guild(1)
+            return first, second
+
+        first, second = asyncio.run(read_twice())
+        assert first == second
+        assert seeded_tracker.cache_stats()["hits"] == 1
+        assert seeded_tracker.cache_stats()["misses"] == 1
+
+    @pytest.mark.parametrize("cached", [True, False])
+    def test_config_checks(self, seeded_tracker, test_player, cached):
+        async def checks():
+            if cached:
+                await seeded_tracker.get_config_for_guild(1)
+            return (
+                await seeded_tracker.is_session_cancelled(1),
+                await seeded_tracker.is_player_dm(1, test_player.id),
+                await seeded_tracker.is_player_dm(1, 456),
+                await seeded_tracker.get_voice_channel_id(1),
+                await seeded_tracker.get_campaign_session_dt(1),
+            )
+
+        assert asyncio.run(checks()) == (False, True, False, 1123, (2, "11:00"))
+        # Served from the cached config if there is one, or else by reading just the fields each check needs
+        assert seeded_tracker.metrics.db_calls.count("get_config_fields") == (0 if cached else 5)
+        assert seeded_tracker.metrics.db_calls.count("get_config_for_guild") == (1 if cached else 0)
+
+    def test_config_checks_of_unconfigured_guild(self, seeded_tracker, test_player):
+        async def checks():
+            return await seeded_tracker.is_session_cancelled(2), await seeded_tracker.is_player_dm(2, test_player.id)
+
+        assert asyncio.run(checks()) == (False, False)
+
+    def test_mutations_write_through(self, seeded_tracker, test_player):
+        player2 = User(name="test2", id=456)
+
+        async def rsvp():
+            await seeded_tracker.is_full_group(1)
+            await seeded_tracker.accept_for_guild(1, test_player)
+            full_group = await seeded_tracker.is_full_group(1)
+            await seeded_tracker.register_player(guild_id=1, player_username=player2.name, player_id=player2.id)
+            unanswered = await seeded_tracker.get_unanswered_players(1)
+            await seeded_tracker.decline_for_guild(1, player2)
+            return full_group, unanswered, await seeded_tracker.get_all(1)
+
+        full_group, unanswered, (attendees, decliners, _) = asyncio.run(rsvp())
+        assert full_group is True
+        assert unanswered == [player2.id]
+        assert attendees == (PlayerRef(test_player.id, test_player.name),)
+        assert decliners == (PlayerRef(player2.id, player2.name),)
+
+        # The cached values match what's in the database
+        assert players_from_docs(asyncio.run(seeded_tracker.db.get_attendees_for_guild(1))) == attendees
+        assert players_from_docs(asyncio.run(seeded_tracker.db.get_players_for_guild(1))) == asyncio.run(
+            seeded_tracker.get_players_for_guild(1)
+        )
+
+    def test_rsvp_bits_follow_writes(self, seeded_tracker, test_player):
+        player2 = User(name="test2", id=456)
+
+        async def rsvp():
+            await seeded_tracker.register_player(guild_id=1, player_username=player2.name, player_id=player2.id)
+            silent = await seeded_tracker.get_unanswered_players(1)
+            misses = seeded_tracker.cache_stats()["misses"]
+            await seeded_tracker.accept_for_guild(1, test_player)
+            await seeded_tracker.accept_for_guild(1, player2)
+            full_group = await seeded_tracker.is_full_group(1)
+            await seeded_tracker.decline_for_guild(1, player2)
+            unanswered = await seeded_tracker.get_unanswered_players(1)
+            # Kept up to date by the writes, rather than read again
+            assert seeded_tracker.cache_stats()["misses"] == misses
+            return silent, full_group, unanswered, await seeded_tracker.get_rsvp_bits(1)
+
+        silent, full_group, unanswered, bits = asyncio.run(rsvp())
+        assert silent == ["dnd-players"]
+        assert (full_group, unanswered) == (True, [])
+        assert (bits.attendees, bits.decliners) == (0b01, 0b10)
+
+    def test_cancel_session_updates_cached_config(self, seeded_tracker):
+        async def cancel():
+            await seeded_tracker.get_config_for_guild(1)
+            await seeded_tracker.cancel_session(1)
+            return await seeded_tracker.is_session_cancelled(1)
+
+        assert asyncio.run(cancel()) is True
+        assert seeded_tracker.cache_stats()["misses"] == 1
+
+    def test_set_board_message_updates_cached_config(self, seeded_tracker):
+        async def set_board():
+            await seeded_tracker.get_config_for_guild(1)
+            await seeded_tracker.set_board_message(1, 555)
+            return await seeded_tracker.get_config_for_guild(1)
+
+        assert asyncio.run(set_board()).board_message == 555
+        assert seeded_tracker.cache_stats()["misses"] == 1
+
+    def test_reset_invalidates_cache(self, seeded_tracker, test_player):
+        async def reset():
+            await seeded_tracker.accept_for_guild(1, test_player)
+            await seeded_tracker.get_attendees_for_guild(1)
+            await seeded_tracker.reset(1)
+            return await seeded_tracker.get_attendees_for_guild(1)
+
+        assert asyncio.run(reset()) == ()
+
+    def test_reset_guilds_invalidates_cache(self, seeded_tracker, test_player):
+        async def reset():
+            await seeded_tracker.cancel_session(1)
+            await seeded_tracker.accept_for_guild(1, test_player)
+            count = await seeded_tracker.reset_guilds([1, 2])
+            return count, await seeded_tracker.get_attendees_for_guild(1), await seeded_tracker.is_session_cancelled(1)
+
+        assert asyncio.run(reset()) == (1, (), False)
+
+    def test_rsvp_state_for_guilds_is_cached(self, seeded_tracker, test_player):
+        async def read():
+            await seeded_tracker.get_players_for_guild(1)
+            first = await seeded_tracker.get_rsvp_state_for_guilds([1, 2])
+            await seeded_tracker.accept_for_guild(1, test_player)
+            return first, await seeded_tracker.get_rsvp_state_for_guilds([1, 2])
+
+        first, second = asyncio.run(read())
+        assert first[1].players == (PlayerRef(test_player.id, test_player.name),)
+        assert first[2] == RsvpSnapshot(2)
+        # The second read is served from the cache, including the write-through from accepting
+        assert second[1].attendees == (PlayerRef(test_player.id, test_player.name),)
+        assert second[2] == first[2]
+        # 1 hit (players of guild 1) on the first read, then all 8 on the second
+        assert seeded_tracker.cache_stats()["hits"] == 9
+
+    def test_async_backend_is_awaitable(self, async_tracker, test_player):
+        async def register():
+            await async_tracker.db.database["players"].insert_one({"guild": 1, "players": []})
+            await async_tracker.register_player(guild_id=1, player_username=test_player.name, player_id=test_player.id)
+            return await async_tracker.get_players_for_guild(1)
+
+        assert asyncio.run(register()) == (PlayerRef(test_player.id, test_player.name),)
+
+    def test_inventory_items(self, async_tracker):
+        async def inventory():
+            await async_tracker.add_items(1, 123, [InventoryItem("Arrow", 20), InventoryItem("Rope", 1)])
+            await async_tracker.update_items(1, 123, [InventoryItem("rope", 0)])
+            return await async_tracker.get_inventory(1, 123), await async_tracker.count_inventory(1, 123)
+
+        assert asyncio.run(inventory()) == ([InventoryItem("Arrow", 20)], 1)
+
+
+@pytest.fixture(params=["async", "mongoengine", "guild-state"])
+def backend_tracker(request, async_mongo_client):
+    if request.param == "async":
+        yield Tracker(AsyncMongo(client=async_mongo_client))
+        return
+    mongoengine.connect(db="mongoenginetest", host="mongodb://localhost", mongo_client_class=mongomock.MongoClient)
+    db = MongoEngine() if request.param == "mongoengine" else GuildStateEngine()
+    db.connect = lambda conn_str=None: None
+    yield Tracker(db)
+    mongoengine.disconnect()
+
+
+def test_unknown_guild(backend_tracker):
+    # Every backend treats a guild it has no records of as having empty lists and no config
+    async def read():
+        return (
+            await backend_tracker.get_players_for_guild(999),
+            await backend_tracker.get_all(999),
+            await backend_tracker.is_full_group(999),
+            await backend_tracker.get_config_for_guild(999),
+            await backend_tracker.is_session_cancelled(999),
+        )
+
+    # (No players, so all of them have accepted)
+    assert asyncio.run(read()) == ((), ((), (), ()), True, None, False)
@@ -0,0 +1,167 @@
+import asyncio
+from dataclasses import replace
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.dispatcher import PHASES, AlertDispatcher
+from app.metrics import Metrics
+from app.model.values import GuildConfig, PlayerRef, RsvpSnapshot
+
+
+class FakeTracker:
+    """Just enough of `Tracker` for the dispatcher: one config per guild, and who has/hasn't answered"""
+
+    def __init__(self, configs: list[GuildConfig], cancelled=(), full=(), declined=()):
+        self.configs = configs
+        self.cancelled = set(cancelled)
+        self.full = set(full)
+        self.declined = set(declined)
+        self.bulk_reads = 0
+        self.reset = []
+
+    async def get_first_alert_configs(self, day_of_week):
+        return [c for c in self.configs if c.first_alert == day_of_week]
+
+    async def get_second_alert_configs(self, day_of_week):
+        return [c for c in self.configs if c.second_alert == day_of_week]
+
+    async def get_session_day_configs(self, day_of_week):
+        return [c for c in self.configs if c.session_day == day_of_week]
+
+    async def reset_guilds(self, guild_ids):
+        self.reset.append(sorted(guild_ids))
+        return len(guild_ids)
+
+    async def get_rsvp_state_for_guilds(self, guild_ids):
+        self.bulk_reads += 1
+        states = {}
+        configs = {config.guild: config for config in self.configs}
+        for guild_id in guild_ids:
+            players = (PlayerRef(guild_id * 10, "player"),)
+            states[guild_id] = RsvpSnapshot(
+                guild_id,
+                players,
+                attendees=players if guild_id in self.full else (),
+                decliners=players if guild_id in self.declined else (),
+                config=replace(configs[guild_id], cancel_session=guild_id in self.cancelled),
+            )
+        return states
+
+
+def make_config(guild_id, first_alert=0, second_alert=1, session_day=2) -> GuildConfig:
+    return GuildConfig(guild_id, session_day, "19:00", first_alert, second_alert, meeting_room=guild_id * 100)
+
+
+def alerted_guilds(mock) -> list[int]:
+    return sorted(call.args[0].guild for call in mock.await_args_list)
+
+
+class TestAlertDispatcher:
+    @pytest.fixture
+    def bot_tasks(self):
+        return AsyncMock()
+
+    def test_every_due_guild_is_alerted(self, bot_tasks):
+        # Used to stop at the first guild that was cancelled or not full
+        tracker = FakeTracker([make_config(guild_id) for guild_id in range(1, 6)], cancelled={1}, full={3})
+        asyncio.run(AlertDispatcher(tracker, bot_tasks).dispatch(today=0))
+        assert alerted_guilds(bot_tasks.cancel_alert_msg) == [1]
+        assert alerted_guilds(bot_tasks.first_alert) == [2, 4, 5]
+
+    def test_phases(self, bot_tasks):
+        tracker = FakeTracker(
+            [make_config(1), make_config(2, first_alert=5, second_alert=0), make_config(3, session_day=0)],
+            cancelled={3},
+        )
+        summaries = asyncio.run(AlertDispatcher(tracker, bot_tasks).dispatch(today=0))
+        assert [(s.name, s.guilds) for s in summaries] == [
+            ("first-alert", 2),
+            ("second-alert", 1),
+            ("session-dm", 1),
+            ("reset", 0),
+        ]
+        assert alerted_guilds(bot_tasks.second_alert) == [2]
+        # Cancelled sessions don't get a DM summary
+        bot_tasks.send_dm.assert_not_awaited()
+
+    def test_reads_are_batched(self, bot_tasks):
+        tracker = FakeTracker([make_config(guild_id, session_day=0) for guild_id in range(1, 51)], full=range(1, 26))
+        asyncio.run(AlertDispatcher(tracker, bot_tasks).dispatch(today=0))
+        # One bulk read per phase that needs the RSVP state (first alert and session DM), not one per guild
+        assert tracker.bulk_reads == 2
+        assert bot_tasks.first_alert.await_count == 25
+        assert bot_tasks.send_dm.await_count == 50
+        config, attendees, decliners = bot_tasks.send_dm.await_args_list[0].args
+        assert attendees == (PlayerRef(config.guild * 10, "player"),)
+
+    def test_guilds_are_reset_in_one_batch(self, bot_tasks):
+        # Sunday's sessions are reset on Monday
+        tracker = FakeTracker([make_config(guild_id, session_day=6) for guild_id in range(1, 11)])
+        summaries = asyncio.run(AlertDispatcher(tracker, bot_tasks).dispatch(today=0))
+        assert tracker.reset == [list(range(1, 11))]
+        assert (summaries[-1].name, summaries[-1].guilds, summaries[-1].failed) == ("reset", 10, [])
+
+    def test_reset_failure(self, bot_tasks):
+        tracker = FakeTracker([make_config(1, session_day=6), make_config(2, session_day=6)])
+        tracker.reset_guilds = AsyncMock(side_effect=RuntimeError("Connection refused"))
+        summaries = asyncio.run(AlertDispatcher(tracker, bot_tasks).dispatch(today=0))
+        assert summaries[-1].failed == [1, 2]
+
+    def test_bulk_read_failure(self, bot_tasks):
+        tracker = FakeTracker([make_config(1), make_config(2)])
+        tracker.get_rsvp_state_for_guilds = AsyncMock(side_effect=RuntimeError("Connection refused"))
+        summaries = asyncio.run(AlertDispatcher(tracker, bot_tasks).dispatch(today=0))
+        assert sorted(summaries[0].failed) == [1, 2]
+        bot_tasks.first_alert.assert_not_awaited()
+
+    def test_nobody_left_to_remind(self, bot_tasks):
+        tracker = FakeTracker([make_config(1)], declined={1})
+        asyncio.run(AlertDispatcher(tracker, bot_tasks).dispatch(today=0))
+        bot_tasks.first_alert.assert_not_awaited()
+
+    def test_failing_guild_is_isolated(self, bot_tasks):
+        async def first_alert(config, unanswered):
+            if config.guild == 2:
+                raise RuntimeError("Missing Access")
+
+        bot_tasks.first_alert.side_effect = first_alert
+        tracker = FakeTracker([make_config(guild_id) for guild_id in range(1, 4)])
+        summaries = asyncio.run(AlertDispatcher(tracker, bot_tasks).dispatch(today=0))
+        assert summaries[0].failed == [2]
+        assert alerted_guilds(bot_tasks.first_alert) == [1, 2, 3]
+
+    def test_slow_guild_times_out(self, bot_tasks):
+        async def first_alert(config, unanswered):
+            if config.guild == 1:
+                await asyncio.sleep(10)
+
+        bot_tasks.first_alert.side_effect = first_alert
+        tracker = FakeTracker([make_config(1), make_config(2)])
+        summaries = asyncio.run(AlertDispatcher(tracker, bot_tasks, timeout=0.05).dispatch(today=0))
+        assert summaries[0].timed_out == [1]
+        assert summaries[0].failed == []
+        assert summaries[0].elapsed < 1
+
+    def test_concurrency_is_bounded(self, bot_tasks):
+        in_flight, max_in_flight = 0, 0
+
+        async def first_alert(config, unanswered):
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+
+        bot_tasks.first_alert.side_effect = first_alert
+        tracker = FakeTracker([make_config(guild_id) for guild_id in range(1, 21)])
+        asyncio.run(AlertDispatcher(tracker, bot_tasks, concurrency=3).dispatch(today=0))
+        assert bot_tasks.first_alert.await_count == 20
+        assert max_in_flight == 3
+
+    def test_phases_are_measured(self, bot_tasks):
+        tracker = FakeTracker([make_config(guild_id) for guild_id in range(1, 4)])
+        metrics = Metrics()
+        asyncio.run(AlertDispatcher(tracker, bot_tasks, metrics=metrics).dispatch(today=0))
+        assert all(metrics.alert_phases.count(phase) == 1 for phase in PHASES)
+        assert metrics.alert_guilds.value("first-alert", "ok") == 3
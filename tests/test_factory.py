@@ -0,0 +1,109 @@
+import asyncio
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from app import constants
+from app.constants import (
+    DatabaseConfig,
+    DiscordConfig,
+    DndConfig,
+    MetricsConfig,
+    Settings,
+    get_settings,
+    override_settings,
+)
+from app.db.tracing import CommandCounter
+from app.factory import create_app
+
+
+@pytest.fixture
+def settings():
+    return Settings(
+        DiscordConfig("token", "?", "A test bot", 12, "Session"),
+        DatabaseConfig(
+            "localhost",
+            27017,
+            "user",
+            "password",
+            "dnd-bot",
+            backend="async",
+            connection_str="mongodb://localhost/dnd-bot",
+        ),
+        DndConfig("Test Campaign", "TC"),
+        MetricsConfig(port=0),
+    )
+
+
+class TestSettings:
+    def test_read_once(self):
+        assert get_settings() is get_settings()
+
+    def test_override(self, settings):
+        original = get_settings()
+        with override_settings(settings):
+            assert get_settings() is settings
+            assert (constants.db_config, constants.dnd_config) == (settings.db, settings.dnd)
+        assert get_settings() is original
+
+    def test_unknown_setting(self):
+        with pytest.raises(AttributeError):
+            constants.not_a_setting
+
+    def test_importing_reads_nothing(self):
+        # Run in a fresh interpreter, since this one has read the settings already
+        script = "import bot, app.constants as c; assert c._settings is None"
+        subprocess.run([sys.executable, "-c", script], cwd=Path(__file__).parents[1], check=True)
+
+
+class TestCreateApp:
+    def test_nothing_is_connected(self, settings):
+        app = create_app(settings)
+        assert app.db_client.db.client is None
+        assert app.bot.command_prefix == "?"
+        # Commands are only added in setup
+        assert app.bot.get_command("status") is None
+
+    def test_defaults_to_the_environment(self):
+        assert create_app().settings is get_settings()
+
+    def test_setup(self, settings, async_mongo_client):
+        app = create_app(settings)
+        app.db_client.db.client = async_mongo_client
+
+        async def setup():
+            await app.setup()
+            online = await app.health.check()
+            await app.close()
+            return online
+
+        assert asyncio.run(setup()) is True
+        assert app.bot.get_command("rsvp accept") is not None
+        assert app.bot.get_command("list") is not None
+
+    def test_metrics(self, settings, async_mongo_client):
+        app = create_app(settings)
+        app.db_client.db.client = async_mongo_client
+
+        async def read():
+            await app.db_client.connect()
+            await app.db_client.get_players_for_guild(1)
+            await app.db_client.get_players_for_guild(1)
+            return app.metrics.render()
+
+        exposition = asyncio.run(read())
+        assert 'dndbot_db_call_duration_seconds_count{method="get_players_for_guild"} 1' in exposition
+        assert "dndbot_cache_hit_ratio 0.5" in exposition
+        # Not connected to discord, so there's no gateway latency yet
+        assert "\ndndbot_gateway_latency_seconds " not in exposition
+
+    def test_tracing_is_opt_in(self, settings):
+        assert create_app(settings).tracing is None
+        settings.db.trace = True
+        app = create_app(settings)
+        assert app.db_client.db is app.tracing
+        assert any(
+            isinstance(listener, CommandCounter) for listener in app.connections.client_options()["event_listeners"]
+        )
@@ -0,0 +1,329 @@
+import mongoengine
+import mongomock
+import pytest
+
+from app.db.guild_state import GuildStateEngine
+from app.db.migrate_guild_state import migrate
+from app.inventory import InventoryItem
+from app.model.dao import (
+    Attendees,
+    Cancellers,
+    Config,
+    Decliners,
+    GuildState,
+    Players,
+    User,
+    _Config,
+)
+
+
+def seed_database():
+    player = User(name="test", id=123)
+    GuildState(
+        guild=123,
+        players=[player],
+        attendees=[player],
+        decliners=[player],
+        cancellers=[player],
+        config=_Config(
+            session_dm=player,
+            vc_id=1123,
+            session_day=2,
+            session_time="11:00",
+            meeting_room=1234567889,
+            first_alert=9,
+            second_alert=10,
+            cancel_session=False,
+        ),
+    ).save()
+
+
+class TestGuildStateEngine:
+    @pytest.fixture(autouse=True)
+    def run_before_and_after_tests(self):
+        """Fixture to execute asserts before and after a test is run"""
+        mongoengine.connect(
+            db="mongoenginetest",
+            host="mongodb://localhost",
+            mongo_client_class=mongomock.MongoClient,
+        )
+        self.db: GuildStateEngine = GuildStateEngine()
+        seed_database()
+        yield  # this is where the testing happens
+
+        mongoengine.disconnect()
+
+    @pytest.fixture
+    def test_player(self):
+        return User(name="test", id=123)
+
+    @pytest.fixture
+    def test_player2(self):
+        return User(name="test2", id=456)
+
+    @pytest.fixture
+    def test_guild_id(self):
+        return 123
+
+    def test_get_all(self, test_guild_id, test_player):
+        expected = ([test_player.to_mongo().to_dict()],) * 3
+        actual = self.db.get_all(guild_id=test_guild_id)
+        assert actual == expected
+
+    def test_get_all_unknown_guild(self):
+        assert self.db.get_all(guild_id=999) == ([], [], [])
+
+    def test_get_players_for_guild(self, test_guild_id, test_player):
+        res = self.db.get_players_for_guild(guild_id=test_guild_id)
+        assert res == [{"name": test_player.name, "id": test_player.id}]
+
+    def test_register_player_new_guild(self, test_player2):
+        self.db.register_player(guild_id=789, player_username=test_player2.name, player_id=test_player2.id)
+        assert self.db.get_players_for_guild(guild_id=789) == [{"name": test_player2.name, "id": test_player2.id}]
+
+    def test_add_player_is_idempotent(self, test_guild_id, test_player):
+        self.db.add_player_for_guild(guild_id=test_guild_id, player=test_player)
+        assert len(self.db.get_players_for_guild(guild_id=test_guild_id)) == 1
+
+    def test_rm_player_for_guild(self, test_guild_id, test_player):
+        self.db.rm_player_for_guild(guild_id=test_guild_id, player=test_player)
+        assert self.db.get_players_for_guild(guild_id=test_guild_id) == []
+
+    def test_is_full_group(self, test_guild_id, test_player2):
+        assert self.db.is_full_group(guild_id=test_guild_id) is True
+        self.db.add_player_for_guild(guild_id=test_guild_id, player=test_player2)
+        assert self.db.is_full_group(guild_id=test_guild_id) is False
+
+    def test_is_registered_player(self, test_guild_id, test_player, test_player2):
+        assert self.db.is_registered_player(guild_id=test_guild_id, player=test_player) is True
+        assert self.db.is_registered_player(guild_id=test_guild_id, player=test_player2) is False
+
+    def test_is_player_dm(self, test_guild_id, test_player, test_player2):
+        assert self.db.is_player_dm(guild_id=test_guild_id, player_id=test_player.id) is True
+        assert self.db.is_player_dm(guild_id=test_guild_id, player_id=test_player2.id) is False
+
+    def test_get_unanswered_players(self, test_guild_id, test_player2):
+        assert self.db.get_unanswered_players(guild_id=test_guild_id) == []
+        self.db.add_player_for_guild(guild_id=test_guild_id, player=test_player2)
+        assert self.db.get_unanswered_players(guild_id=test_guild_id) == [test_player2.id]
+
+    def test_add_and_rm_attendee_for_guild(self, test_guild_id, test_player2):
+        self.db.add_attendee_for_guild(guild_id=test_guild_id, attendee=test_player2)
+        assert len(self.db.get_attendees_for_guild(guild_id=test_guild_id)) == 2
+        self.db.rm_attendee_for_guild(guild_id=test_guild_id, attendee=test_player2)
+        assert len(self.db.get_attendees_for_guild(guild_id=test_guild_id)) == 1
+
+    def test_accept_for_guild(self, test_guild_id, test_player, test_player2):
+        self.db.add_decliner_for_guild(guild_id=test_guild_id, decliner=test_player2)
+        res = self.db.accept_for_guild(guild_id=test_guild_id, attendee=test_player2)
+        assert [user["id"] for user in res] == [test_player.id, test_player2.id]
+        assert [user["id"] for user in self.db.get_decliners_for_guild(guild_id=test_guild_id)] == [test_player.id]
+
+    def test_decline_for_guild(self, test_guild_id, test_player):
+        res = self.db.decline_for_guild(guild_id=test_guild_id, decliner=test_player)
+        assert [user["id"] for user in res] == [test_player.id]
+        assert self.db.get_attendees_for_guild(guild_id=test_guild_id) == []
+
+    def test_add_and_rm_decliner_for_guild(self, test_guild_id, test_player2):
+        self.db.add_decliner_for_guild(guild_id=test_guild_id, decliner=test_player2)
+        assert len(self.db.get_decliners_for_guild(guild_id=test_guild_id)) == 2
+        self.db.rm_decliner_for_guild(guild_id=test_guild_id, decliner=test_player2)
+        assert len(self.db.get_decliners_for_guild(guild_id=test_guild_id)) == 1
+
+    def test_add_and_rm_canceller_for_guild(self, test_guild_id, test_player2):
+        self.db.add_canceller_for_guild(guild_id=test_guild_id, canceller=test_player2)
+        assert len(self.db.get_cancellers_for_guild(guild_id=test_guild_id)) == 2
+        self.db.rm_canceller_for_guild(guild_id=test_guild_id, canceller=test_player2)
+        assert len(self.db.get_cancellers_for_guild(guild_id=test_guild_id)) == 1
+
+    def test_get_rsvp_state_for_guilds(self, test_guild_id, test_player2):
+        self.db.register_player(guild_id=789, player_username=test_player2.name, player_id=test_player2.id)
+        res = self.db.get_rsvp_state_for_guilds([test_guild_id, 789, 999])
+        assert res[test_guild_id]["decliners"] == [{"name": "test", "id": 123}]
+        assert res[test_guild_id]["config"]["config"] == self.db.get_config_for_guild(guild_id=test_guild_id)["config"]
+        assert res[789] == {"players": [{"name": "test2", "id": 456}], "attendees": [], "decliners": [], "config": {}}
+        assert res[999] == {"players": [], "attendees": [], "decliners": [], "config": {}}
+
+    def test_ping(self):
+        self.db.ping()
+
+    def test_get_config_for_guild(self, test_guild_id):
+        expected = 1123
+        res = self.db.get_config_for_guild(guild_id=test_guild_id)
+        actual = res.get("config").get("vc-id")
+        assert actual == expected
+
+    def test_get_config_fields(self, test_guild_id):
+        assert self.db.get_config_fields(test_guild_id, "vc-id", "session-time") == {
+            "vc-id": 1123,
+            "session-time": "11:00",
+        }
+        assert self.db.get_config_fields(999, "vc-id") == {}
+
+    def test_reset(self, test_guild_id, test_player):
+        self.db.cancel_session(guild_id=test_guild_id)
+        self.db.reset(guild_id=test_guild_id)
+        assert self.db.get_all(guild_id=test_guild_id) == ([], [], [])
+        assert self.db.is_session_cancelled(guild_id=test_guild_id) is False
+        # The roster and config are kept
+        assert self.db.is_registered_player(guild_id=test_guild_id, player=test_player) is True
+        assert self.db.get_voice_channel_id(guild_id=test_guild_id) == 1123
+
+    def test_reset_guilds(self, test_guild_id, test_player2):
+        self.db.register_player(guild_id=789, player_username=test_player2.name, player_id=test_player2.id)
+        self.db.accept_for_guild(guild_id=789, attendee=test_player2)
+        self.db.cancel_session(guild_id=test_guild_id)
+        assert self.db.reset_guilds([test_guild_id, 789, 999]) == 2
+        assert self.db.get_all(guild_id=test_guild_id) == ([], [], [])
+        assert self.db.get_all(guild_id=789) == ([], [], [])
+        assert self.db.is_session_cancelled(guild_id=test_guild_id) is False
+
+    def test_reset_unconfigured_guild(self, test_player2):
+        self.db.register_player(guild_id=5, player_username=test_player2.name, player_id=test_player2.id)
+        self.db.reset(guild_id=5)
+        # Resetting doesn't give a guild that was never configured a partial config
+        assert self.db.get_config_for_guild(guild_id=5) == {}
+
+    def test_add_items(self):
+        items = [InventoryItem("Healing Potion", 2), InventoryItem("Arrow", 20), InventoryItem("healing  potion", 1)]
+        assert self.db.add_items(1, 123, items) == 2
+        assert self.db.add_items(1, 123, [InventoryItem("Arrow", 5)]) == 1
+        expected = [{"name": "Arrow", "qty": 25}, {"name": "Healing Potion", "qty": 3}]
+        assert self.db.get_inventory(1, 123) == expected
+        # Inventories are per player, and per guild
+        assert self.db.get_inventory(1, 456) == []
+        assert self.db.get_inventory(2, 123) == []
+
+    def test_update_items(self):
+        self.db.add_items(1, 123, [InventoryItem("Arrow", 20), InventoryItem("Rope", 1)])
+        assert (
+            self.db.update_items(
+                1, 123, [InventoryItem("arrow", 3), InventoryItem("Rope", 0), InventoryItem("Torch", 2)]
+            )
+            == 3
+        )
+        assert self.db.get_inventory(1, 123) == [{"name": "Arrow", "qty": 3}, {"name": "Torch", "qty": 2}]
+
+    def test_inventory_pages(self):
+        self.db.add_items(1, 123, [InventoryItem(f"Item {i:03}", i + 1) for i in range(60)])
+        assert self.db.count_inventory(1, 123) == 60
+        page = self.db.get_inventory(1, 123, skip=25, limit=25)
+        assert [item["name"] for item in page] == [f"Item {i:03}" for i in range(25, 50)]
+        assert len(self.db.get_inventory(1, 123, skip=50, limit=25)) == 10
+
+    def test_remove_items(self):
+        self.db.add_items(1, 123, [InventoryItem("Arrow", 20), InventoryItem("Rope", 1)])
+        assert self.db.remove_items(1, 123, ["ARROW", "Shield"]) == 1
+        assert self.db.get_inventory(1, 123) == [{"name": "Rope", "qty": 1}]
+
+    def test_set_board_message(self, test_guild_id):
+        self.db.set_board_message(guild_id=test_guild_id, message_id=555)
+        assert self.db.get_config_for_guild(guild_id=test_guild_id)["config"]["board-message"] == 555
+        self.db.reset(guild_id=test_guild_id)
+        assert "board-message" not in self.db.get_config_for_guild(guild_id=test_guild_id)["config"]
+
+    def test_cancel_session(self, test_guild_id):
+        assert self.db.cancel_session(guild_id=test_guild_id) is True
+        assert self.db.is_session_cancelled(guild_id=test_guild_id) is True
+
+    def test_reset_cancel_flag(self, test_guild_id):
+        assert self.db.reset_cancel_flag(guild_id=test_guild_id) is False
+
+    def test_create_guild_config(self, test_player):
+        guild_id = 789
+        self.db.register_player(guild_id=guild_id, player_username=test_player.name, player_id=test_player.id)
+        self.db.create_guild_config(
+            guild_id=guild_id,
+            voice_channel_id=442211,
+            dm_username=test_player.name,
+            dm_id=test_player.id,
+            session_day="4",
+            session_time="11:00",
+            meeting_room=1234567889,
+            first_alert="9",
+            second_alert="10",
+        )
+        assert self.db.get_voice_channel_id(guild_id=guild_id) == 442211
+        # Configuring a guild doesn't touch its roster
+        assert len(self.db.get_players_for_guild(guild_id=guild_id)) == 1
+        assert GuildState.objects(guild=guild_id).count() == 1
+
+    def test_rm_guild_config(self, test_guild_id):
+        self.db.rm_guild_config(guild_id=test_guild_id)
+        assert self.db.get_config_for_guild(guild_id=test_guild_id) == {}
+        assert len(self.db.get_players_for_guild(guild_id=test_guild_id)) == 1
+
+    def test_get_first_alert_configs(self):
+        expected = 9
+        res = self.db.get_first_alert_configs(day_of_the_week=expected)[0]
+        actual = res.get("config").get("first-alert")
+        assert expected == actual
+
+    def test_get_second_alert_configs(self):
+        expected = 10
+        res = self.db.get_second_alert_configs(day_of_the_week=expected)[0]
+        actual = res.get("config").get("second-alert")
+        assert expected == actual
+
+    def test_get_session_day_configs(self, test_guild_id):
+        res = self.db.get_session_day_configs(day_of_the_week=2)
+        assert [config["guild"] for config in res] == [test_guild_id]
+        assert self.db.get_session_day_configs(day_of_the_week=3) == []
+
+    def test_get_campaign_session_dt(self, test_guild_id):
+        expected = (2, "11:00")
+        actual = self.db.get_campaign_session_dt(guild_id=test_guild_id)
+        assert actual == expected
+
+
+class TestMigrateGuildState:
+    @pytest.fixture(autouse=True)
+    def run_before_and_after_tests(self):
+        """Fixture to execute asserts before and after a test is run"""
+        mongoengine.connect(
+            db="mongoenginetest",
+            host="mongodb://localhost",
+            mongo_client_class=mongomock.MongoClient,
+        )
+        player = User(name="test", id=123)
+        player2 = User(name="test2", id=456)
+        Players(guild=123, players=[player, player2]).save()
+        Attendees(guild=123, attendees=[player]).save()
+        Decliners(guild=123, decliners=[player2]).save()
+        Cancellers(guild=123, cancellers=[]).save()
+        Players(guild=789, players=[player2]).save()
+        Config(
+            guild=123,
+            config=_Config(
+                session_dm=player,
+                vc_id=1123,
+                session_day=2,
+                session_time="11:00",
+                meeting_room=1234567889,
+                first_alert=9,
+                second_alert=10,
+            ),
+        ).save()
+        yield  # this is where the testing happens
+
+        mongoengine.disconnect()
+
+    def test_migrate(self):
+        assert migrate() == 2
+        db = GuildStateEngine()
+        assert [p["id"] for p in db.get_players_for_guild(guild_id=123)] == [123, 456]
+        assert db.get_unanswered_players(guild_id=123) == []
+        assert db.get_voice_channel_id(guild_id=123) == 1123
+        assert db.get_players_for_guild(guild_id=789) == [{"name": "test2", "id": 456}]
+        assert db.get_config_for_guild(guild_id=789) == {}
+
+    def test_migrate_is_rerunnable(self):
+        migrate()
+        migrate()
+        assert GuildState.objects.count() == 2
+
+    def test_migrate_drop_old(self):
+        migrate(drop_old=True)
+        assert Players.objects.count() == 0
+        assert Config.objects.count() == 0
+        assert GuildState.objects.count() == 2
@@ -0,0 +1,74 @@
+import asyncio
+from subprocess import CalledProcessError
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app import health
+from app.db.mongo_async import AsyncMongo
+from app.db_client import Tracker
+from app.health import BuildInfo, HealthMonitor
+
+
+def test_resolve_build_info():
+    with patch.object(health, "check_output", return_value=b"abc1234\n"):
+        assert health.resolve_build_info() == BuildInfo("abc1234")
+    with patch.object(health, "check_output", side_effect=CalledProcessError(128, "git")):
+        assert health.resolve_build_info() == BuildInfo("unknown")
+
+
+class TestHealthMonitor:
+    @pytest.fixture
+    def tracker(self):
+        return MagicMock(ping=AsyncMock())
+
+    @pytest.fixture
+    def monitor(self, tracker):
+        return HealthMonitor(tracker, build=BuildInfo("abc1234"), interval=0.01, timeout=0.05)
+
+    def test_unknown_before_the_first_ping(self, monitor):
+        expected = "unknown"
+        actual = monitor.stats()["db_status"]
+        assert expected == actual
+
+    def test_online(self, monitor):
+        assert asyncio.run(monitor.check()) is True
+        stats = monitor.stats()
+        assert (stats["db_status"], stats["failures"], stats["commit"]) == ("online", 0, "abc1234")
+        assert stats["latency_p99"] >= stats["latency_p50"] >= 0
+
+    def test_offline(self, tracker, monitor):
+        tracker.ping.side_effect = ConnectionError("no route to host")
+        assert asyncio.run(monitor.check()) is False
+        stats = monitor.stats()
+        assert stats["db_status"] == "offline"
+        assert "no route to host" in stats["last_error"]
+
+    def test_slow_ping_times_out(self, tracker, monitor):
+        async def ping():
+            await asyncio.sleep(1)
+
+        tracker.ping.side_effect = ping
+        assert asyncio.run(monitor.check()) is False
+
+    def test_recovers(self, tracker, monitor):
+        tracker.ping.side_effect = [ConnectionError(), None]
+        asyncio.run(monitor.check())
+        asyncio.run(monitor.check())
+        stats = monitor.stats()
+        assert (stats["db_status"], stats["failures"], stats["last_error"]) == ("online", 1, None)
+
+    def test_background_pings(self, tracker, monitor):
+        async def run():
+            monitor.start()
+            monitor.start()
+            await asyncio.sleep(0.05)
+            monitor.stop()
+
+        asyncio.run(run())
+        assert tracker.ping.await_count >= 2
+        assert monitor.db_status == "online"
+
+    def test_pings_through_the_tracker(self, async_mongo_client):
+        monitor = HealthMonitor(Tracker(AsyncMongo(client=async_mongo_client)), build=BuildInfo("abc1234"))
+        assert asyncio.run(monitor.check()) is True
@@ -0,0 +1,95 @@
+import asyncio
+
+import mongoengine
+import mongomock
+import pytest
+
+from app.db import indexes
+from app.db.guild_state import GuildStateEngine
+from app.db.mongo_async import AsyncMongo
+from app.db.mongo_odm import MongoEngine
+from app.model.dao import Config, Inventory, Players, User
+
+
+def test_index_report():
+    specs = [{"fields": [("guild", 1)], "unique": True}, {"fields": [("config.first-alert", 1), ("config.alerts", 1)]}]
+    information = {"_id_": {"key": [("_id", 1)]}, "guild_1": {"key": [("guild", 1)], "unique": True}}
+    usage = {"_id_": 0, "guild_1": 0}
+    expected = {"missing": [[("config.first-alert", 1), ("config.alerts", 1)]], "unused": ["guild_1"]}
+    assert indexes.index_report(specs, information, usage) == expected
+
+
+def test_index_usage():
+    stats = [{"name": "guild_1", "accesses": {"ops": 3}}, {"name": "_id_", "accesses": {"ops": 0}}]
+    assert indexes.index_usage(stats) == {"guild_1": 3, "_id_": 0}
+
+
+class TestDocumentIndexes:
+    @pytest.fixture(autouse=True)
+    def run_before_and_after_tests(self):
+        """Fixture to execute asserts before and after a test is run"""
+        mongoengine.connect(
+            db="mongoenginetest",
+            host="mongodb://localhost",
+            mongo_client_class=mongomock.MongoClient,
+        )
+        yield  # this is where the testing happens
+
+        mongoengine.disconnect()
+
+    def test_mongoengine_ensure_indexes(self):
+        db = MongoEngine()
+        db.ensure_indexes()
+        db.ensure_indexes()
+        report = db.index_report()
+        assert set(report) == {"players", "attendees", "decliners", "cancellers", "config", "inventories"}
+        assert all(not collection["missing"] for collection in report.values())
+
+    def test_guild_state_ensure_indexes(self):
+        db = GuildStateEngine()
+        db.ensure_indexes()
+        expected = {"guild-state": {"missing": [], "unused": []}, "inventories": {"missing": [], "unused": []}}
+        assert db.index_report() == expected
+
+    def test_unique_guild_index(self):
+        MongoEngine().ensure_indexes()
+        Players(guild=1, players=[]).save()
+        with pytest.raises(mongoengine.NotUniqueError):
+            Players(guild=1, players=[User(name="test", id=123)]).save()
+
+    def test_unique_inventory_item_index(self):
+        MongoEngine().ensure_indexes()
+        Inventory(guild=1, player=123, item="arrow", name="Arrow", qty=1).save()
+        # The same item of another player is fine, the same item twice isn't
+        Inventory(guild=1, player=456, item="arrow", name="Arrow", qty=1).save()
+        with pytest.raises(mongoengine.NotUniqueError):
+            Inventory(guild=1, player=123, item="arrow", name="arrow", qty=2).save()
+
+    def test_duplicate_guilds_are_reported_as_missing(self):
+        collection = Config._get_collection()
+        collection.drop_indexes()
+        collection.insert_many([{"guild": 1}, {"guild": 1}])
+        # The unique index can't be created, but that shouldn't stop the others (or the bot) from starting
+        db = MongoEngine()
+        db.ensure_indexes()
+        report = db.index_report()
+        # Only the unique index is missing: the config's alert indexes, which the dispatcher's queries need, still exist
+        assert report["config"]["missing"] == [[("guild", 1)]]
+        existing = [info["key"] for info in collection.index_information().values()]
+        assert [("config.first-alert", 1), ("config.alerts", 1)] in existing
+        assert [("config.session-day", 1), ("config.alerts", 1)] in existing
+        assert report["players"]["missing"] == []
+
+
+def test_async_mongo_ensure_indexes(async_mongo_client):
+    db = AsyncMongo(client=async_mongo_client)
+    db.connect(conn_str="mongodb://localhost")
+
+    async def ensure():
+        await db.ensure_indexes()
+        return await db.index_report()
+
+    report = asyncio.run(ensure())
+    assert report["config"] == {"missing": [], "unused": []}
+    assert report["players"] == {"missing": [], "unused": []}
+    assert report["inventories"] == {"missing": [], "unused": []}
@@ -0,0 +1,60 @@
+import pytest
+from pymongo import DeleteOne, UpdateOne
+
+from app.db import inventory
+from app.inventory import MAX_QTY, InventoryError, InventoryItem, normalize_item, parse_items
+
+
+class TestParseItems:
+    def test_pairs(self):
+        expected = [InventoryItem("Healing Potion", 3), InventoryItem("Arrow", 50)]
+        actual = parse_items("3:Healing   Potion, 50 : Arrow,")
+        assert actual == expected
+
+    def test_zero_quantity(self):
+        assert parse_items("0:Rope", min_qty=0) == [InventoryItem("Rope", 0)]
+        with pytest.raises(InventoryError, match="at least 1"):
+            parse_items("0:Rope")
+
+    def test_max_quantity(self):
+        assert parse_items(f"{MAX_QTY}:Arrow") == [InventoryItem("Arrow", MAX_QTY)]
+        assert parse_items("0003:Arrow") == [InventoryItem("Arrow", 3)]
+        for qty in (MAX_QTY + 1, 2**64, "9" * 5000):
+            with pytest.raises(InventoryError, match="at most"):
+                parse_items(f"{qty}:Arrow")
+
+    @pytest.mark.parametrize("text", ["", " , ", "Rope", "x:Rope", "3:", "-1:Rope", "٣:Rope", "3:" + "a" * 101])
+    def test_invalid(self, text):
+        with pytest.raises(InventoryError):
+            parse_items(text)
+
+    def test_normalize_item(self):
+        assert normalize_item("  Healing\tPOTION ") == normalize_item("healing potion") == "healing potion"
+
+
+class TestInventoryWrites:
+    def test_add_writes_merge_duplicates(self):
+        items = [InventoryItem("Arrow", 20), InventoryItem("arrow", 5), InventoryItem("Rope", 1)]
+        expected = [
+            UpdateOne(
+                {"guild": 1, "player": 2, "item": "arrow"},
+                {"$inc": {"qty": 25}, "$setOnInsert": {"name": "Arrow"}},
+                upsert=True,
+            ),
+            UpdateOne(
+                {"guild": 1, "player": 2, "item": "rope"},
+                {"$inc": {"qty": 1}, "$setOnInsert": {"name": "Rope"}},
+                upsert=True,
+            ),
+        ]
+        assert inventory.add_writes(1, 2, items) == expected
+
+    def test_update_writes_last_one_wins(self):
+        items = [InventoryItem("Arrow", 20), InventoryItem("Rope", 1), InventoryItem("arrow", 0)]
+        writes = inventory.update_writes(1, 2, items)
+        assert writes[0] == DeleteOne({"guild": 1, "player": 2, "item": "arrow"})
+        assert writes[1] == UpdateOne(
+            {"guild": 1, "player": 2, "item": "rope"},
+            {"$set": {"qty": 1}, "$setOnInsert": {"name": "Rope"}},
+            upsert=True,
+        )
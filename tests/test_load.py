@@ -0,0 +1,233 @@
+import asyncio
+import functools
+import itertools
+import random
+import time
+from collections import defaultdict
+from types import SimpleNamespace
+
+import pytest
+
+from app import helpers
+from app.board import SessionBoard
+from app.cog import SessionCog
+from app.constants import DatabaseConfig, DiscordConfig, DndConfig, MetricsConfig, Settings, override_settings
+from app.db.mongo_async import AsyncMongo
+from app.db_client import Tracker
+from app.dispatcher import AlertDispatcher
+from app.outbox import Outbox
+from app.scheduler import AlertScheduler
+from app.tasks import BotTasks
+
+# The size of the simulated load. Scale these up to look for regressions at production sizes
+GUILDS = 20
+PLAYERS = 8
+INVOCATIONS = 2000
+CONCURRENCY = 100
+# The same seed gives the same sequence of commands (and so comparable runs)
+SEED = 1234
+
+# Which commands are run, and how often relative to each other
+COMMAND_WEIGHTS = {"rsvp accept": 4, "rsvp decline": 3, "vote cancel": 1, "list": 2}
+
+# Alerts go out on Mondays in the simulation
+TODAY = 0
+
+# Rate limits are discord's concern, and would only measure how long the outbox waits
+UNLIMITED = (10**9, 1.0)
+
+_ids = itertools.count(1)
+
+
+class FakeChannel:
+    """A text channel, or a member's DMs. Counts what's sent to it"""
+
+    def __init__(self, channel_id: int):
+        self.id = channel_id
+        self.sent = 0
+
+    async def send(self, content: str = None, **kwargs):
+        self.sent += 1
+        return FakeMessage(self, next(_ids))
+
+    def get_partial_message(self, message_id: int):
+        return FakeMessage(self, message_id)
+
+
+class FakeMessage:
+    def __init__(self, channel: FakeChannel, message_id: int = 0):
+        self.channel = channel
+        self.id = message_id
+
+    async def add_reaction(self, emoji: str):
+        pass
+
+    async def reply(self, content: str = None, **kwargs):
+        return await self.channel.send(content, **kwargs)
+
+    async def edit(self, **kwargs):
+        return self
+
+
+class FakeGuild:
+    def __init__(self, guild_id: int):
+        self.id = guild_id
+        self.voice_channels = []
+
+    async def create_scheduled_event(self, **kwargs):
+        return SimpleNamespace(url=f"https://discord.com/events/{self.id}/{next(_ids)}")
+
+
+class FakeBot:
+    """Just enough of `commands.Bot` for the cog, alerts, and session boards: every channel and user exists"""
+
+    command_prefix = "!"
+
+    def __init__(self):
+        self.channels: dict[int, FakeChannel] = {}
+
+    def get_channel(self, channel_id: int) -> FakeChannel:
+        return self.channels.setdefault(channel_id, FakeChannel(channel_id))
+
+    async def fetch_channel(self, channel_id: int) -> FakeChannel:
+        return self.get_channel(channel_id)
+
+    get_user = get_channel
+    fetch_user = fetch_channel
+
+
+def make_context(bot: FakeBot, guild_id: int, player_id: int) -> SimpleNamespace:
+    author = SimpleNamespace(id=player_id, name=f"player{player_id}")
+    channel = bot.get_channel(guild_id)
+    return SimpleNamespace(guild=FakeGuild(guild_id), author=author, message=FakeMessage(channel))
+
+
+def player_ids(guild_id: int) -> list[int]:
+    return [guild_id * 1000 + i for i in range(PLAYERS)]
+
+
+@pytest.fixture
+def settings():
+    return Settings(
+        DiscordConfig("token", "!", "A test bot", 12, "Session"),
+        DatabaseConfig("localhost", 27017, "user", "password", "dnd-bot"),
+        DndConfig("Load Test", "LT"),
+        MetricsConfig(port=0),
+    )
+
+
+class TestLoad:
+    """Seeds `GUILDS` guilds of `PLAYERS` players each, then drives `INVOCATIONS` RSVP, vote, and list commands through
+    the real cog (at most `CONCURRENCY` at a time) followed by a full alert run, and reports throughput and latency
+
+    Discord is faked and the database is the in-memory async mongo stand-in from `conftest.py`, so the numbers cover
+    the bot's own overhead: the tracker and its cache, the backend's queries, the outbox, and the session boards. Run
+    with `pytest -s tests/test_load.py` to see the report.
+    """
+
+    @pytest.fixture
+    def harness(self, settings, async_mongo_client):
+        # Wired the same way as `app.factory.App`, around the fakes
+        bot = FakeBot()
+        outbox = Outbox(channel_rate=UNLIMITED, global_rate=UNLIMITED, reaction_rate=UNLIMITED)
+        tracker = Tracker(AsyncMongo(client=async_mongo_client))
+        tasks = BotTasks(bot, outbox=outbox)
+        dispatcher = AlertDispatcher(tracker, tasks)
+        app = SimpleNamespace(
+            bot=bot,
+            settings=settings,
+            db_client=tracker,
+            outbox=outbox,
+            health=None,
+            board=SessionBoard(tracker, tasks.resolver, outbox, delay=0),
+            dispatcher=dispatcher,
+            scheduler=AlertScheduler(tracker, dispatcher, alert_hour=12),
+            start_time=helpers.current_time(),
+        )
+        with override_settings(settings):
+            yield SessionCog(app)
+
+    async def seed(self, cog: SessionCog):
+        day_before, _ = helpers.adjacent_days(TODAY)
+        for guild_id in range(1, GUILDS + 1):
+            for player_id in player_ids(guild_id):
+                await cog.db_client.register_player(guild_id, f"player{player_id}", player_id)
+            await cog.db_client.create_guild_config(
+                guild_id=guild_id,
+                voice_channel_id=guild_id * 10,
+                dm_username=f"player{player_ids(guild_id)[0]}",
+                dm_id=player_ids(guild_id)[0],
+                # Half the guilds play today (and get a DM summary), the other half played yesterday (and get reset)
+                session_day=TODAY if guild_id % 2 else day_before,
+                session_time="19:00",
+                meeting_room=guild_id,
+                first_alert=TODAY,
+                second_alert=TODAY,
+            )
+
+    async def drive(self, cog: SessionCog) -> tuple[dict[str, list[float]], float]:
+        # The commands' callbacks, bound to the cog (which discord.py only does once the cog is added to a bot)
+        commands = {
+            name: functools.partial(command.callback, cog)
+            for name, command in (
+                ("rsvp accept", cog._accept),
+                ("rsvp decline", cog._decline),
+                ("vote cancel", cog._vote_cancel),
+                ("list", cog.list_),
+            )
+        }
+        rng = random.Random(SEED)
+        invocations = [
+            (
+                rng.choices(list(COMMAND_WEIGHTS), weights=list(COMMAND_WEIGHTS.values()))[0],
+                guild_id := rng.randint(1, GUILDS),
+                rng.choice(player_ids(guild_id)),
+            )
+            for _ in range(INVOCATIONS)
+        ]
+        latencies = defaultdict(list)
+        semaphore = asyncio.Semaphore(CONCURRENCY)
+
+        async def invoke(name: str, guild_id: int, player_id: int):
+            async with semaphore:
+                start = time.perf_counter()
+                await commands[name](make_context(cog.bot, guild_id, player_id))
+                latencies[name].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(invoke(*invocation) for invocation in invocations))
+        # Include the board redraws and messages the commands left queued
+        await cog.board.flush()
+        await cog.outbox.flush()
+        return latencies, time.perf_counter() - start
+
+    def test_load(self, harness):
+        async def run():
+            await self.seed(harness)
+            latencies, elapsed = await self.drive(harness)
+            dispatch_start = time.perf_counter()
+            summaries = await harness.dispatcher.dispatch(TODAY)
+            await harness.outbox.flush()
+            return latencies, elapsed, summaries, time.perf_counter() - dispatch_start
+
+        latencies, elapsed, summaries, dispatch_elapsed = asyncio.run(run())
+
+        print(f"\n{INVOCATIONS} commands over {GUILDS} guilds x {PLAYERS} players, {CONCURRENCY} at a time")
+        print(f"  throughput: {INVOCATIONS / elapsed:.0f} commands/s ({elapsed:.2f}s)")
+        for name, samples in sorted(latencies.items()):
+            p50, p95, p99 = (helpers.percentile(samples, pct) * 1000 for pct in (50, 95, 99))
+            print(f"  {name:>12}: {len(samples):>5} runs, p50 {p50:.1f}ms, p95 {p95:.1f}ms, p99 {p99:.1f}ms")
+        print(f"  alert run: {dispatch_elapsed * 1000:.0f}ms - {'; '.join(map(str, summaries))}")
+        print(f"  tracker cache: {harness.db_client.cache_stats()}, outbox: {harness.outbox.stats()}")
+
+        # Every command ran to completion
+        assert sum(map(len, latencies.values())) == INVOCATIONS
+        assert set(latencies) == set(COMMAND_WEIGHTS)
+        # And every phase of the alert run reached every guild due one
+        assert all(not summary.failed and not summary.timed_out for summary in summaries)
+        assert {summary.name: summary.guilds for summary in summaries} == {
+            "first-alert": GUILDS,
+            "second-alert": GUILDS,
+            "session-dm": GUILDS // 2,
+            "reset": GUILDS // 2,
+        }
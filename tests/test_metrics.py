@@ -0,0 +1,101 @@
+import asyncio
+import math
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import aiohttp
+import pytest
+
+from app.dispatcher import PhaseSummary
+from app.metrics import CONTENT_TYPE, Counter, Histogram, Metrics, MetricsServer
+
+
+class TestExposition:
+    def test_counter(self):
+        counter = Counter("calls_total", "Calls", ("method",))
+        counter.inc("get")
+        counter.inc("get", amount=2)
+        counter.inc('say "hi"')
+        assert counter.value("get") == 3
+        assert list(counter.samples()) == [
+            ("calls_total", '{method="get"}', 3.0),
+            ("calls_total", '{method="say \\"hi\\""}', 1.0),
+        ]
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram("latency_seconds", "Latency", ("method",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 2.0):
+            histogram.observe(value, "get")
+        expected = [
+            ("latency_seconds_bucket", '{method="get",le="0.1"}', 2),
+            ("latency_seconds_bucket", '{method="get",le="1.0"}', 3),
+            ("latency_seconds_bucket", '{method="get",le="+Inf"}', 4),
+            ("latency_seconds_sum", '{method="get"}', 2.65),
+            ("latency_seconds_count", '{method="get"}', 4),
+        ]
+        assert list(histogram.samples()) == expected
+        assert histogram.count("get") == 4
+
+    def test_render(self):
+        metrics = Metrics()
+        metrics.db_calls.observe(0.02, "get_players_for_guild")
+        metrics.gauge("up", "Whether it's up", lambda: 1)
+        metrics.gauge("latency", "Not known yet", lambda: math.inf)
+        metrics.gauge("broken", "Raises", lambda: 1 / 0)
+        exposition = metrics.render()
+        assert "# TYPE dndbot_db_call_duration_seconds histogram" in exposition
+        assert 'dndbot_db_call_duration_seconds_bucket{method="get_players_for_guild",le="0.025"} 1' in exposition
+        assert "\nup 1\n" in exposition
+        # Unknown values are left out, rather than breaking the whole scrape
+        assert "\nlatency " not in exposition
+        assert "\nbroken " not in exposition
+        assert exposition.endswith("\n")
+
+
+class TestRecording:
+    def test_commands(self):
+        metrics = Metrics()
+        command = SimpleNamespace(qualified_name="rsvp accept")
+        ctx = MagicMock(command=command, invoked_subcommand=command, command_failed=False)
+
+        async def invoke():
+            await metrics.command_started(ctx)
+            await metrics.command_finished(ctx)
+            # The group's own hooks around a subcommand are skipped
+            ctx.command = SimpleNamespace(qualified_name="rsvp")
+            await metrics.command_finished(ctx)
+
+        asyncio.run(invoke())
+        assert metrics.commands.count("rsvp accept", "ok") == 1
+        assert metrics.commands.count("rsvp", "ok") == 0
+
+    def test_phase_finished(self):
+        metrics = Metrics()
+        metrics.phase_finished(PhaseSummary("first-alert", guilds=5, failed=[1], timed_out=[2, 3], elapsed=1.5))
+        assert metrics.alert_phases.count("first-alert") == 1
+        assert metrics.alert_guilds.value("first-alert", "ok") == 2
+        assert metrics.alert_guilds.value("first-alert", "timed_out") == 2
+
+
+@pytest.fixture
+def metrics():
+    metrics = Metrics()
+    metrics.gauge("up", "Whether it's up", lambda: 1)
+    return metrics
+
+
+def test_metrics_server(metrics):
+    async def scrape():
+        server = MetricsServer(metrics, port=0)
+        await server.start()
+        host, port = server.addresses[0][:2]
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(f"http://{host}:{port}/metrics") as response:
+                    return response.headers["Content-Type"], await response.text()
+        finally:
+            await server.stop()
+
+    content_type, body = asyncio.run(scrape())
+    assert content_type == CONTENT_TYPE
+    assert body == metrics.render()
@@ -0,0 +1,262 @@
+import asyncio
+
+import pytest
+
+from app.constants import Collections
+from app.db.mongo_async import AsyncMongo
+from app.inventory import InventoryItem
+from app.model.dao import User
+
+
+async def seed_database(db: AsyncMongo):
+    player = {"name": "test", "id": 123}
+    await db._collection(Collections.PLAYERS).insert_one({"guild": 123, "players": [player]})
+    await db._collection(Collections.DECLINERS).insert_one({"guild": 123, "decliners": [player]})
+    await db._collection(Collections.ATTENDEES).insert_one({"guild": 123, "attendees": [player]})
+    await db._collection(Collections.CANCELLERS).insert_one({"guild": 123, "cancellers": [player]})
+    await db.create_guild_config(
+        guild_id=123,
+        voice_channel_id=1123,
+        dm_username="test",
+        dm_id=123,
+        session_day="2",
+        session_time="11:00",
+        meeting_room=1234567889,
+        first_alert="9",
+        second_alert="10",
+    )
+
+
+class TestAsyncMongo:
+    @pytest.fixture(autouse=True)
+    def run_before_and_after_tests(self, async_mongo_client):
+        """Fixture to execute asserts before and after a test is run"""
+        self.db: AsyncMongo = AsyncMongo(client=async_mongo_client)
+        self.db.connect(conn_str="mongodb://localhost")
+        asyncio.run(seed_database(self.db))
+        yield  # this is where the testing happens
+
+    @pytest.fixture
+    def test_player(self):
+        return User(name="test", id=123)
+
+    @pytest.fixture
+    def test_player2(self):
+        return User(name="test2", id=456)
+
+    @pytest.fixture
+    def test_guild_id(self):
+        return 123
+
+    def test_get_all(self, test_guild_id):
+        expected = 3
+        res = asyncio.run(self.db.get_all(guild_id=test_guild_id))
+        actual = len(res)
+        assert actual == expected
+
+    def test_get_players_for_guild(self, test_guild_id, test_player):
+        res = asyncio.run(self.db.get_players_for_guild(guild_id=test_guild_id))
+        assert res == [{"name": test_player.name, "id": test_player.id}]
+
+    def test_get_players_for_unknown_guild(self):
+        res = asyncio.run(self.db.get_players_for_guild(guild_id=999))
+        assert res == []
+
+    def test_register_player(self, test_guild_id, test_player2):
+        expected = 2
+        asyncio.run(
+            self.db.register_player(
+                guild_id=test_guild_id, player_username=test_player2.name, player_id=test_player2.id
+            )
+        )
+        actual = len(asyncio.run(self.db.get_players_for_guild(guild_id=test_guild_id)))
+        assert actual == expected
+
+    def test_rm_player_for_guild(self, test_guild_id, test_player):
+        asyncio.run(self.db.rm_player_for_guild(guild_id=test_guild_id, player=test_player))
+        assert asyncio.run(self.db.get_players_for_guild(guild_id=test_guild_id)) == []
+
+    def test_is_full_group(self, test_guild_id):
+        assert asyncio.run(self.db.is_full_group(guild_id=test_guild_id)) is True
+
+    def test_is_not_full_group(self, test_guild_id, test_player2):
+        asyncio.run(self.db.add_player_for_guild(guild_id=test_guild_id, player=test_player2))
+        assert asyncio.run(self.db.is_full_group(guild_id=test_guild_id)) is False
+
+    def test_is_registered_player(self, test_guild_id, test_player, test_player2):
+        assert asyncio.run(self.db.is_registered_player(guild_id=test_guild_id, player=test_player)) is True
+        assert asyncio.run(self.db.is_registered_player(guild_id=test_guild_id, player=test_player2)) is False
+
+    def test_is_player_dm(self, test_guild_id, test_player, test_player2):
+        assert asyncio.run(self.db.is_player_dm(guild_id=test_guild_id, player_id=test_player.id)) is True
+        assert asyncio.run(self.db.is_player_dm(guild_id=test_guild_id, player_id=test_player2.id)) is False
+
+    def test_get_unanswered_players(self, test_guild_id, test_player2):
+        asyncio.run(self.db.add_player_for_guild(guild_id=test_guild_id, player=test_player2))
+        actual = asyncio.run(self.db.get_unanswered_players(guild_id=test_guild_id))
+        assert actual == [test_player2.id]
+
+    def test_add_attendee_for_guild(self, test_guild_id, test_player2):
+        asyncio.run(self.db.add_attendee_for_guild(guild_id=test_guild_id, attendee=test_player2))
+        res = asyncio.run(self.db.get_attendees_for_guild(guild_id=test_guild_id))
+        assert len(res) == 2
+        assert res[1]["name"] == test_player2.name
+
+    def test_rm_attendee_for_guild(self, test_guild_id, test_player):
+        asyncio.run(self.db.rm_attendee_for_guild(guild_id=test_guild_id, attendee=test_player))
+        assert asyncio.run(self.db.get_attendees_for_guild(guild_id=test_guild_id)) == []
+
+    def test_add_attendee_is_idempotent(self, test_guild_id, test_player):
+        asyncio.run(self.db.add_attendee_for_guild(guild_id=test_guild_id, attendee=test_player))
+        assert len(asyncio.run(self.db.get_attendees_for_guild(guild_id=test_guild_id))) == 1
+
+    def test_add_attendee_for_new_guild(self, test_player):
+        asyncio.run(self.db.add_attendee_for_guild(guild_id=789, attendee=test_player))
+        res = asyncio.run(self.db.get_attendees_for_guild(guild_id=789))
+        assert res == [{"name": test_player.name, "id": test_player.id}]
+
+    def test_accept_for_guild(self, test_guild_id, test_player, test_player2):
+        asyncio.run(self.db.add_decliner_for_guild(guild_id=test_guild_id, decliner=test_player2))
+        res = asyncio.run(self.db.accept_for_guild(guild_id=test_guild_id, attendee=test_player2))
+        assert [user["id"] for user in res] == [test_player.id, test_player2.id]
+        decliners = asyncio.run(self.db.get_decliners_for_guild(guild_id=test_guild_id))
+        assert [user["id"] for user in decliners] == [test_player.id]
+
+    def test_decline_for_guild(self, test_guild_id, test_player):
+        res = asyncio.run(self.db.decline_for_guild(guild_id=test_guild_id, decliner=test_player))
+        assert [user["id"] for user in res] == [test_player.id]
+        assert asyncio.run(self.db.get_attendees_for_guild(guild_id=test_guild_id)) == []
+
+    def test_add_decliner_for_guild(self, test_guild_id, test_player2):
+        asyncio.run(self.db.add_decliner_for_guild(guild_id=test_guild_id, decliner=test_player2))
+        res = asyncio.run(self.db.get_decliners_for_guild(guild_id=test_guild_id))
+        assert len(res) == 2
+
+    def test_rm_decliner_for_guild(self, test_guild_id, test_player):
+        asyncio.run(self.db.rm_decliner_for_guild(guild_id=test_guild_id, decliner=test_player))
+        assert asyncio.run(self.db.get_decliners_for_guild(guild_id=test_guild_id)) == []
+
+    def test_add_canceller_for_guild(self, test_guild_id, test_player2):
+        asyncio.run(self.db.add_canceller_for_guild(guild_id=test_guild_id, canceller=test_player2))
+        res = asyncio.run(self.db.get_cancellers_for_guild(guild_id=test_guild_id))
+        assert len(res) == 2
+
+    def test_rm_canceller_for_guild(self, test_guild_id, test_player):
+        asyncio.run(self.db.rm_canceller_for_guild(guild_id=test_guild_id, canceller=test_player))
+        assert asyncio.run(self.db.get_cancellers_for_guild(guild_id=test_guild_id)) == []
+
+    def test_get_rsvp_state_for_guilds(self, test_guild_id, test_player2):
+        asyncio.run(self.db.add_player_for_guild(guild_id=789, player=test_player2))
+        res = asyncio.run(self.db.get_rsvp_state_for_guilds([test_guild_id, 789, 999]))
+        assert res[test_guild_id]["players"] == [{"name": "test", "id": 123}]
+        assert res[test_guild_id]["config"] == asyncio.run(self.db.get_config_for_guild(guild_id=test_guild_id))
+        assert res[789] == {"players": [{"name": "test2", "id": 456}], "attendees": [], "decliners": [], "config": {}}
+        assert res[999] == {"players": [], "attendees": [], "decliners": [], "config": {}}
+
+    def test_get_config_for_guild(self, test_guild_id):
+        expected = 1123
+        res = asyncio.run(self.db.get_config_for_guild(guild_id=test_guild_id))
+        actual = res.get("config").get("vc-id")
+        assert actual == expected
+
+    def test_get_config_fields(self, test_guild_id):
+        res = asyncio.run(self.db.get_config_fields(test_guild_id, "vc-id", "session-day"))
+        assert res == {"vc-id": 1123, "session-day": 2}
+        assert asyncio.run(self.db.get_config_fields(999, "vc-id")) == {}
+
+    def test_create_guild_config_casts_days(self, test_guild_id):
+        res = asyncio.run(self.db.get_config_for_guild(guild_id=test_guild_id))
+        assert res["config"]["session-day"] == 2
+        assert res["config"]["first-alert"] == 9
+        assert res["config"]["alerts"] is True
+
+    def test_rm_guild_config(self, test_guild_id):
+        asyncio.run(self.db.rm_guild_config(guild_id=test_guild_id))
+        assert asyncio.run(self.db.get_config_for_guild(guild_id=test_guild_id)) == {}
+
+    def test_reset(self, test_guild_id):
+        asyncio.run(self.db.cancel_session(guild_id=test_guild_id))
+        asyncio.run(self.db.reset(guild_id=test_guild_id))
+        assert asyncio.run(self.db.get_all(guild_id=test_guild_id)) == ([], [], [])
+        assert asyncio.run(self.db.is_session_cancelled(guild_id=test_guild_id)) is False
+
+    def test_reset_guilds(self, test_guild_id):
+        asyncio.run(self.db.cancel_session(guild_id=test_guild_id))
+        assert asyncio.run(self.db.reset_guilds([test_guild_id, 999])) == 1
+        assert asyncio.run(self.db.get_all(guild_id=test_guild_id)) == ([], [], [])
+        assert asyncio.run(self.db.is_session_cancelled(guild_id=test_guild_id)) is False
+
+    def test_add_items(self):
+        items = [InventoryItem("Healing Potion", 2), InventoryItem("Arrow", 20), InventoryItem("healing  potion", 1)]
+        assert asyncio.run(self.db.add_items(1, 123, items)) == 2
+        assert asyncio.run(self.db.add_items(1, 123, [InventoryItem("Arrow", 5)])) == 1
+        expected = [{"name": "Arrow", "qty": 25}, {"name": "Healing Potion", "qty": 3}]
+        assert asyncio.run(self.db.get_inventory(1, 123)) == expected
+        # Inventories are per player, and per guild
+        assert asyncio.run(self.db.get_inventory(1, 456)) == []
+        assert asyncio.run(self.db.get_inventory(2, 123)) == []
+
+    def test_update_items(self):
+        asyncio.run(self.db.add_items(1, 123, [InventoryItem("Arrow", 20), InventoryItem("Rope", 1)]))
+        assert (
+            asyncio.run(
+                self.db.update_items(
+                    1, 123, [InventoryItem("arrow", 3), InventoryItem("Rope", 0), InventoryItem("Torch", 2)]
+                )
+            )
+            == 3
+        )
+        assert asyncio.run(self.db.get_inventory(1, 123)) == [{"name": "Arrow", "qty": 3}, {"name": "Torch", "qty": 2}]
+
+    def test_inventory_pages(self):
+        asyncio.run(self.db.add_items(1, 123, [InventoryItem(f"Item {i:03}", i + 1) for i in range(60)]))
+        assert asyncio.run(self.db.count_inventory(1, 123)) == 60
+        page = asyncio.run(self.db.get_inventory(1, 123, skip=25, limit=25))
+        assert [item["name"] for item in page] == [f"Item {i:03}" for i in range(25, 50)]
+        assert len(asyncio.run(self.db.get_inventory(1, 123, skip=50, limit=25))) == 10
+
+    def test_remove_items(self):
+        asyncio.run(self.db.add_items(1, 123, [InventoryItem("Arrow", 20), InventoryItem("Rope", 1)]))
+        assert asyncio.run(self.db.remove_items(1, 123, ["ARROW", "Shield"])) == 1
+        assert asyncio.run(self.db.get_inventory(1, 123)) == [{"name": "Rope", "qty": 1}]
+
+    def test_set_board_message(self, test_guild_id):
+        asyncio.run(self.db.set_board_message(guild_id=test_guild_id, message_id=555))
+        config = asyncio.run(self.db.get_config_for_guild(guild_id=test_guild_id))
+        assert config.get("config").get("board-message") == 555
+        asyncio.run(self.db.reset(guild_id=test_guild_id))
+        config = asyncio.run(self.db.get_config_for_guild(guild_id=test_guild_id))
+        assert "board-message" not in config.get("config")
+
+    def test_cancel_session(self, test_guild_id):
+        assert asyncio.run(self.db.cancel_session(guild_id=test_guild_id)) is True
+        assert asyncio.run(self.db.is_session_cancelled(guild_id=test_guild_id)) is True
+
+    def test_reset_cancel_flag(self, test_guild_id):
+        assert asyncio.run(self.db.reset_cancel_flag(guild_id=test_guild_id)) is False
+
+    def test_get_first_alert_configs(self):
+        expected = 9
+        res = asyncio.run(self.db.get_first_alert_configs(day_of_the_week=expected))[0]
+        actual = res.get("config").get("first-alert")
+        assert expected == actual
+
+    def test_get_second_alert_configs(self):
+        expected = 10
+        res = asyncio.run(self.db.get_second_alert_configs(day_of_the_week=expected))[0]
+        actual = res.get("config").get("second-alert")
+        assert expected == actual
+
+    def test_get_session_day_configs(self):
+        expected = 2
+        res = asyncio.run(self.db.get_session_day_configs(day_of_the_week=expected))[0]
+        actual = res.get("config").get("session-day")
+        assert expected == actual
+
+    def test_get_voice_channel_id(self, test_guild_id):
+        assert asyncio.run(self.db.get_voice_channel_id(guild_id=test_guild_id)) == 1123
+
+    def test_get_campaign_session_dt(self, test_guild_id):
+        expected = (2, "11:00")
+        actual = asyncio.run(self.db.get_campaign_session_dt(guild_id=test_guild_id))
+        assert actual == expected
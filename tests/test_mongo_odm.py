@@ -1,9 +1,9 @@
 import mongoengine
 import mongomock
 import pytest
-from mongoengine import DoesNotExist
 
 from app.db.mongo_odm import MongoEngine
+from app.inventory import InventoryItem
 from app.model.dao import (
     Attendees,
     Cancellers,
@@ -172,6 +172,30 @@ class TestMongoEngine:
         actual = len(res)
         assert actual == expected
 
+    def test_add_attendee_is_idempotent(self, test_guild_id, test_player):
+        expected = 1
+        self.db.add_attendee_for_guild(guild_id=test_guild_id, attendee=test_player)
+        res = self.db.get_attendees_for_guild(guild_id=test_guild_id)
+        actual = len(res)
+        assert actual == expected
+
+    def test_add_attendee_for_new_guild(self, test_player):
+        expected = [{"name": test_player.name, "id": test_player.id}]
+        self.db.add_attendee_for_guild(guild_id=789, attendee=test_player)
+        actual = self.db.get_attendees_for_guild(guild_id=789)
+        assert actual == expected
+
+    def test_accept_for_guild(self, test_guild_id, test_player, test_player2):
+        self.db.add_decliner_for_guild(guild_id=test_guild_id, decliner=test_player2)
+        res = self.db.accept_for_guild(guild_id=test_guild_id, attendee=test_player2)
+        assert [user["id"] for user in res] == [test_player.id, test_player2.id]
+        assert [user["id"] for user in self.db.get_decliners_for_guild(guild_id=test_guild_id)] == [test_player.id]
+
+    def test_decline_for_guild(self, test_guild_id, test_player):
+        res = self.db.decline_for_guild(guild_id=test_guild_id, decliner=test_player)
+        assert [user["id"] for user in res] == [test_player.id]
+        assert self.db.get_attendees_for_guild(guild_id=test_guild_id) == []
+
     def test__get_decliners_by_guild_id(self, test_guild_id, test_player):
         expected = 1
         res = self.db._get_decliners_by_guild_id(guild_id=test_guild_id)
@@ -238,12 +262,29 @@ class TestMongoEngine:
         actual = res.config.vc_id
         assert actual == expected
 
+    def test_get_rsvp_state_for_guilds(self, test_guild_id, test_player2):
+        self.db.register_player(guild_id=789, player_username=test_player2.name, player_id=test_player2.id)
+        res = self.db.get_rsvp_state_for_guilds([test_guild_id, 789, 999])
+        assert res[test_guild_id]["attendees"] == [{"name": "test", "id": 123}]
+        assert res[test_guild_id]["config"]["config"]["vc-id"] == 1123
+        assert res[789] == {"players": [{"name": "test2", "id": 456}], "attendees": [], "decliners": [], "config": {}}
+        assert res[999] == {"players": [], "attendees": [], "decliners": [], "config": {}}
+
+    def test_ping(self):
+        self.db.ping()
+
     def test_get_config_for_guild(self, test_guild_id):
         expected = 1123
         res = self.db.get_config_for_guild(guild_id=test_guild_id)
         actual = res.get("config").get("vc-id")
         assert actual == expected
 
+    def test_get_config_fields(self, test_guild_id):
+        expected = {"vc-id": 1123, "session-time": "11:00"}
+        actual = self.db.get_config_fields(test_guild_id, "vc-id", "session-time")
+        assert actual == expected
+        assert self.db.get_config_fields(999, "vc-id") == {}
+
     def test_get_gm_for_guild(self, test_guild_id):
         expected = "test"
         res = self.db.get_config_for_guild(guild_id=test_guild_id)
@@ -260,8 +301,58 @@ class TestMongoEngine:
         original_cancellers = self.db.get_cancellers_for_guild(guild_id=test_guild_id)
         assert len(original_cancellers) == 1
         self.db.reset(guild_id=test_guild_id)
-        with pytest.raises(DoesNotExist):
-            self.db.get_cancellers_for_guild(guild_id=test_guild_id)
+        assert self.db.get_cancellers_for_guild(guild_id=test_guild_id) == []
+
+    def test_reset_guilds(self, test_guild_id, test_player):
+        self.db.cancel_session(guild_id=test_guild_id)
+        assert self.db.reset_guilds([test_guild_id, 999]) == 1
+        assert self.db.is_session_cancelled(guild_id=test_guild_id) is False
+        assert self.db.get_attendees_for_guild(guild_id=test_guild_id) == []
+        # The roster is kept
+        assert self.db.is_registered_player(guild_id=test_guild_id, player=test_player) is True
+
+    def test_add_items(self):
+        items = [InventoryItem("Healing Potion", 2), InventoryItem("Arrow", 20), InventoryItem("healing  potion", 1)]
+        assert self.db.add_items(1, 123, items) == 2
+        assert self.db.add_items(1, 123, [InventoryItem("Arrow", 5)]) == 1
+        expected = [{"name": "Arrow", "qty": 25}, {"name": "Healing Potion", "qty": 3}]
+        assert self.db.get_inventory(1, 123) == expected
+        # Inventories are per player, and per guild
+        assert self.db.get_inventory(1, 456) == []
+        assert self.db.get_inventory(2, 123) == []
+
+    def test_update_items(self):
+        self.db.add_items(1, 123, [InventoryItem("Arrow", 20), InventoryItem("Rope", 1)])
+        assert (
+            self.db.update_items(
+                1, 123, [InventoryItem("arrow", 3), InventoryItem("Rope", 0), InventoryItem("Torch", 2)]
+            )
+            == 3
+        )
+        assert self.db.get_inventory(1, 123) == [{"name": "Arrow", "qty": 3}, {"name": "Torch", "qty": 2}]
+
+    def test_inventory_pages(self):
+        self.db.add_items(1, 123, [InventoryItem(f"Item {i:03}", i + 1) for i in range(60)])
+        assert self.db.count_inventory(1, 123) == 60
+        page = self.db.get_inventory(1, 123, skip=25, limit=25)
+        assert [item["name"] for item in page] == [f"Item {i:03}" for i in range(25, 50)]
+        assert len(self.db.get_inventory(1, 123, skip=50, limit=25)) == 10
+
+    def test_remove_items(self):
+        self.db.add_items(1, 123, [InventoryItem("Arrow", 20), InventoryItem("Rope", 1)])
+        assert self.db.remove_items(1, 123, ["ARROW", "Shield"]) == 1
+        assert self.db.get_inventory(1, 123) == [{"name": "Rope", "qty": 1}]
+
+    def test_set_board_message(self, test_guild_id):
+        expected = 555
+        self.db.set_board_message(guild_id=test_guild_id, message_id=expected)
+        actual = self.db.get_config_for_guild(guild_id=test_guild_id).get("config").get("board-message")
+        assert expected == actual
+
+    def test_reset_clears_board_message(self, test_guild_id):
+        self.db.set_board_message(guild_id=test_guild_id, message_id=555)
+        self.db.reset(guild_id=test_guild_id)
+        assert "board-message" not in self.db.get_config_for_guild(guild_id=test_guild_id).get("config")
 
     def test_cancel_session(self, test_guild_id):
         expected = True
@@ -291,6 +382,23 @@ class TestMongoEngine:
         actual = res.get("config").get("vc-id")
         assert expected == actual
 
+    def test_create_guild_config_replaces_existing(self, test_guild_id, test_player):
+        expected = 1
+        self.db.create_guild_config(
+            guild_id=test_guild_id,
+            voice_channel_id=442211,
+            dm_username=test_player.name,
+            dm_id=test_player.id,
+            session_day="4",
+            session_time="11:00",
+            meeting_room=1234567889,
+            first_alert="9",
+            second_alert="10",
+        )
+        actual = Config.objects(guild=test_guild_id).count()
+        assert actual == expected
+        assert self.db.get_voice_channel_id(guild_id=test_guild_id) == 442211
+
     def test_rm_guild_config(self, test_guild_id):
         expected = 0
         self.db.rm_guild_config(guild_id=test_guild_id)
@@ -0,0 +1,203 @@
+import asyncio
+import logging
+import time
+from unittest.mock import AsyncMock, MagicMock
+
+import discord
+import pytest
+
+from app.outbox import Outbox, TokenBucket
+
+
+def make_channel(channel_id: int):
+    channel = MagicMock(id=channel_id)
+    channel.send = AsyncMock(side_effect=lambda **kwargs: {"channel": channel_id, **kwargs})
+    return channel
+
+
+def test_token_bucket():
+    now = 0.0
+    bucket = TokenBucket(2, 1.0, clock=lambda: now)
+    assert bucket.delay() == 0
+    bucket.take()
+    bucket.take()
+    assert bucket.delay() == pytest.approx(0.5)
+    now = 0.25
+    assert bucket.delay() == pytest.approx(0.25)
+    now = 10.0
+    bucket.delay()
+    # Never refills past its capacity
+    assert bucket.tokens == 2
+
+
+class TestOutbox:
+    @pytest.fixture
+    def channel(self):
+        return make_channel(1)
+
+    def test_send(self, channel):
+        outbox = Outbox()
+
+        async def send():
+            return await outbox.send(channel, "hello", embed="embed")
+
+        assert asyncio.run(send()) == {"channel": 1, "content": "hello", "embed": "embed"}
+        assert outbox.stats()["sent"] == 1
+        assert outbox.depth == 0
+
+    def test_reply(self, channel):
+        outbox = Outbox()
+        message = MagicMock(channel=channel, reply=AsyncMock(return_value="reply"))
+
+        async def reply():
+            return await outbox.reply(message, "hi")
+
+        assert asyncio.run(reply()) == "reply"
+        message.reply.assert_awaited_once_with(content="hi")
+
+    def test_messages_keep_their_order(self, channel):
+        outbox = Outbox()
+
+        async def send():
+            await asyncio.gather(*(outbox.send(channel, str(i)) for i in range(5)))
+
+        asyncio.run(send())
+        assert [call.kwargs["content"] for call in channel.send.await_args_list] == ["0", "1", "2", "3", "4"]
+
+    def test_coalescing(self, channel):
+        outbox = Outbox()
+
+        async def send():
+            first = outbox.send(channel, "intro")
+            lists = [outbox.send(channel, f"attendees: {i}", coalesce_key="attendees") for i in range(3)]
+            last = outbox.send(channel, "outro")
+            return await asyncio.gather(first, *lists, last)
+
+        results = asyncio.run(send())
+        assert [call.kwargs["content"] for call in channel.send.await_args_list] == [
+            "intro",
+            "attendees: 2",
+            "outro",
+        ]
+        # Every caller gets the message that was actually sent
+        assert [result["content"] for result in results[1:4]] == ["attendees: 2"] * 3
+        assert outbox.stats()["coalesced"] == 2
+
+    def test_edits_of_a_message_are_coalesced(self, channel):
+        outbox = Outbox()
+        message = MagicMock(id=7, channel=channel, edit=AsyncMock(return_value="edited"))
+
+        async def edit():
+            return await asyncio.gather(*(outbox.edit(message, content=str(i)) for i in range(3)))
+
+        assert asyncio.run(edit()) == ["edited"] * 3
+        message.edit.assert_awaited_once_with(content="2")
+
+    def test_channel_rate_limit(self, channel):
+        outbox = Outbox(channel_rate=(2, 0.2))
+
+        async def send():
+            start = time.monotonic()
+            await asyncio.gather(*(outbox.send(channel, str(i)) for i in range(4)))
+            return time.monotonic() - start
+
+        # 2 go out right away, then one every 0.1s
+        assert asyncio.run(send()) >= 0.18
+        assert channel.send.await_count == 4
+
+    def test_reactions_are_added_concurrently(self, channel):
+        outbox = Outbox(reaction_rate=(7, 1.0))
+        in_flight, max_in_flight = 0, 0
+
+        async def add_reaction(emoji):
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+
+        message = MagicMock(channel=channel, add_reaction=AsyncMock(side_effect=add_reaction))
+        asyncio.run(outbox.react(message, *"abcdefg"))
+        assert [call.args[0] for call in message.add_reaction.await_args_list] == list("abcdefg")
+        assert max_in_flight == 7
+
+    def test_reaction_rate_limit(self, channel):
+        outbox = Outbox(reaction_rate=(2, 0.2))
+        message = MagicMock(channel=channel, add_reaction=AsyncMock())
+
+        async def react():
+            start = time.monotonic()
+            await outbox.react(message, "a", "b", "c", "d")
+            return time.monotonic() - start
+
+        assert asyncio.run(react()) >= 0.18
+        assert message.add_reaction.await_count == 4
+
+    def test_channels_are_limited_separately(self, channel):
+        outbox = Outbox(channel_rate=(1, 10.0))
+        other = make_channel(2)
+
+        async def send():
+            outbox.send(channel, "first")
+            blocked = outbox.send(channel, "second")
+            await asyncio.wait_for(outbox.send(other, "other"), timeout=1)
+            assert outbox.stats()["depth"] == 1
+            blocked.cancel()
+
+        asyncio.run(send())
+        other.send.assert_awaited_once()
+
+    def test_global_rate_limit(self):
+        outbox = Outbox(global_rate=(2, 0.2))
+        channels = [make_channel(i) for i in range(4)]
+
+        async def send():
+            start = time.monotonic()
+            await asyncio.gather(*(outbox.send(channel, "hi") for channel in channels))
+            return time.monotonic() - start
+
+        assert asyncio.run(send()) >= 0.18
+
+    def test_failed_send_is_isolated(self, channel):
+        outbox = Outbox()
+        channel.send.side_effect = [RuntimeError("Missing Permissions"), "sent"]
+
+        async def send():
+            return await asyncio.gather(outbox.send(channel, "a"), outbox.send(channel, "b"), return_exceptions=True)
+
+        failed, sent = asyncio.run(send())
+        assert isinstance(failed, RuntimeError)
+        assert sent == "sent"
+        assert outbox.stats()["failed"] == 1
+
+    def test_not_found_is_left_to_the_caller(self, channel, caplog):
+        outbox = Outbox()
+        message = MagicMock(channel=channel)
+        message.edit = AsyncMock(side_effect=discord.NotFound(MagicMock(status=404), "Unknown Message"))
+
+        async def edit():
+            return await outbox.edit(message, content="a")
+
+        with caplog.at_level(logging.DEBUG), pytest.raises(discord.NotFound):
+            asyncio.run(edit())
+        # Expected (e.g. a deleted session board), so it's not logged as an error
+        assert "no longer exists" in caplog.text
+        assert not [record for record in caplog.records if record.levelno >= logging.ERROR]
+        assert outbox.stats()["failed"] == 1
+
+    def test_stats(self, channel):
+        outbox = Outbox()
+
+        async def send():
+            outbox.send(channel, "a")
+            outbox.send(make_channel(2), "b")
+            outbox.send(channel, "c")
+            queued = outbox.stats()
+            await outbox.flush()
+            return queued
+
+        queued = asyncio.run(send())
+        assert (queued["depth"], queued["channels"], queued["max_channel_depth"]) == (3, 2, 2)
+        stats = outbox.stats()
+        assert (stats["depth"], stats["sent"]) == (0, 3)
+        assert stats["latency_p95"] >= stats["latency_p50"] >= 0
@@ -0,0 +1,99 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import discord
+import pytest
+
+from app.pages import Paginator, sliced
+
+
+def make_interaction(user_id: int = 1):
+    interaction = MagicMock()
+    interaction.user.id = user_id
+    interaction.response.edit_message = AsyncMock()
+    interaction.response.send_message = AsyncMock()
+    return interaction
+
+
+def render(rows) -> list[dict]:
+    return [{"name": f"Row {row}", "value": str(row)} for row in rows]
+
+
+class TestPaginator:
+    @pytest.fixture
+    def author(self):
+        return MagicMock(id=1)
+
+    @pytest.fixture
+    def fetch(self):
+        rows = list(range(60))
+        fetched = []
+
+        async def fetch(skip: int, limit: int):
+            fetched.append((skip, limit))
+            return await sliced(rows)(skip, limit)
+
+        fetch.fetched = fetched
+        return fetch
+
+    def test_pages_are_fetched_lazily(self, author, fetch):
+        async def browse():
+            pages = Paginator(author, "Rows", fetch, render, total=60)
+            first = await pages.embed()
+            # Nothing past the first page has been read yet
+            assert fetch.fetched == [(0, 25)]
+            await pages.next.callback(make_interaction())
+            await pages.next.callback(make_interaction())
+            last = await pages.embed()
+            await pages.previous.callback(make_interaction())
+            await pages.previous.callback(make_interaction())
+            return pages, first, last
+
+        pages, first, last = asyncio.run(browse())
+        assert pages.pages == 3
+        assert len(first.fields) == 25
+        assert first.footer.text == "Page 1 of 3"
+        assert [field.value for field in last.fields] == [str(row) for row in range(50, 60)]
+        assert last.footer.text == "Page 3 of 3"
+        # Going back shows the pages already fetched, without reading them again
+        assert fetch.fetched == [(0, 25), (25, 25), (50, 25)]
+
+    def test_buttons_stop_at_the_ends(self, author, fetch):
+        async def browse():
+            pages = Paginator(author, "Rows", fetch, render, total=60)
+            await pages.embed()
+            at_start = (pages.previous.disabled, pages.next.disabled)
+            await pages.previous.callback(make_interaction())
+            return pages, at_start
+
+        pages, at_start = asyncio.run(browse())
+        assert at_start == (True, False)
+        assert pages.page == 0
+
+    def test_single_page(self, author):
+        async def show():
+            pages = Paginator(author, "Rows", sliced([1, 2]), render, total=2)
+            return pages, await pages.embed()
+
+        pages, embed = asyncio.run(show())
+        assert pages.pages == 1
+        assert len(embed.fields) == 2
+        assert not embed.footer.text
+
+    def test_only_the_author_can_turn_pages(self, author, fetch):
+        async def check():
+            pages = Paginator(author, "Rows", fetch, render, total=60)
+            return await pages.interaction_check(make_interaction(1)), await pages.interaction_check(
+                make_interaction(2)
+            )
+
+        assert asyncio.run(check()) == (True, False)
+
+    def test_timeout_of_a_deleted_message(self, author, fetch):
+        async def time_out():
+            pages = Paginator(author, "Rows", fetch, render, total=60)
+            pages.message = MagicMock(edit=AsyncMock(side_effect=discord.NotFound(MagicMock(status=404), "Unknown")))
+            await pages.on_timeout()
+            return pages.message
+
+        asyncio.run(time_out()).edit.assert_awaited_once_with(view=None)
@@ -0,0 +1,79 @@
+import os
+import timeit
+
+import mongoengine
+import mongomock
+import pytest
+
+from app import helpers
+from app.db.guild_state import GuildStateEngine
+from app.db.mongo_odm import MongoEngine
+from app.model.dao import GuildState, Players, User
+
+ROSTER_SIZES = (10, 100, 1000)
+
+# Timings depend on the machine (and how busy it is), so they're only compared when asked for: `BENCHMARK=1 pytest -s
+# tests/test_read_benchmark.py`. Otherwise only the results of both read paths are checked
+BENCHMARK = os.environ.get("BENCHMARK") == "1"
+
+
+def best_of(read, size: int, repeat: int = 3) -> float:
+    """Best per-call time of `read` in seconds, calling it fewer times for larger rosters"""
+    number = max(1, 1000 // size)
+    return min(timeit.repeat(read, number=number, repeat=repeat)) / number
+
+
+class TestReadBenchmark:
+    """Compares the raw (projection + as_pymongo) read path with building Documents and running them through
+    `helpers.doc_to_dict`, for rosters of increasing size
+
+    Run with `BENCHMARK=1 pytest -s tests/test_read_benchmark.py` to time them.
+    """
+
+    @pytest.fixture(autouse=True)
+    def setup_and_teardown(self):
+        mongoengine.connect("mongoenginetest", host="mongodb://localhost", mongo_client_class=mongomock.MongoClient)
+        for size in ROSTER_SIZES:
+            players = [User(name=f"player{i}", id=i) for i in range(size)]
+            Players(guild=size, players=players).save()
+            GuildState(guild=size, players=players).save()
+        yield
+        mongoengine.disconnect()
+
+    def compare(self, document_read, raw_read, size: int):
+        document_time, raw_time = best_of(document_read, size), best_of(raw_read, size)
+        print(f"\n{size} players: doc_to_dict {document_time * 1e6:.0f}us, raw {raw_time * 1e6:.0f}us")
+        if size >= 1000:
+            # The gap grows with the roster, so only the large roster is asserted on
+            assert raw_time < document_time
+
+    @pytest.mark.parametrize("size", ROSTER_SIZES)
+    def test_per_list_players(self, size):
+        db = MongoEngine()
+
+        def document_read():
+            return helpers.doc_to_dict(Players.objects(guild=size).get()).get("players", [])
+
+        def raw_read():
+            return db.get_players_for_guild(size)
+
+        assert raw_read() == document_read()
+        assert len(raw_read()) == size
+
+        if BENCHMARK:
+            self.compare(document_read, raw_read, size)
+
+    @pytest.mark.parametrize("size", ROSTER_SIZES)
+    def test_guild_state_players(self, size):
+        db = GuildStateEngine()
+
+        def document_read():
+            return helpers.doc_to_dict(GuildState.objects(guild=size).only("players").first().players)
+
+        def raw_read():
+            return db.get_players_for_guild(size)
+
+        assert raw_read() == document_read()
+
+        if BENCHMARK:
+            self.compare(document_read, raw_read, size)
@@ -0,0 +1,121 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.cache import TTLCache
+from app.model.values import GuildConfig
+from app.resolver import DiscordResolver
+from app.tasks import BotTasks
+
+
+class TestDiscordResolver:
+    @pytest.fixture
+    def bot(self):
+        bot = MagicMock()
+        bot.get_channel.return_value = None
+        bot.get_user.return_value = None
+        bot.fetch_channel = AsyncMock(side_effect=lambda channel_id: f"channel-{channel_id}")
+        bot.fetch_user = AsyncMock(side_effect=lambda user_id: f"user-{user_id}")
+        return bot
+
+    @pytest.fixture
+    def resolver(self, bot):
+        return DiscordResolver(bot)
+
+    def test_gateway_cache_first(self, bot, resolver):
+        bot.get_channel.return_value = "gateway-channel"
+        assert asyncio.run(resolver.channel(1)) == "gateway-channel"
+        bot.fetch_channel.assert_not_awaited()
+        assert resolver.stats()["gateway_hits"] == {"channel": 1}
+
+    def test_fetched_objects_are_cached(self, bot, resolver):
+        async def resolve():
+            return [await resolver.channel(1) for _ in range(4)]
+
+        assert asyncio.run(resolve()) == ["channel-1"] * 4
+        assert bot.fetch_channel.await_count == 1
+        assert resolver.hit_ratio == 0.75
+
+    def test_users(self, bot, resolver):
+        async def resolve():
+            return await resolver.user(1), await resolver.user(1), await resolver.user(2)
+
+        assert asyncio.run(resolve()) == ("user-1", "user-1", "user-2")
+        assert resolver.stats()["fetches"] == {"user": 2}
+
+    def test_cache_expires(self, bot):
+        now = 0.0
+        resolver = DiscordResolver(bot, TTLCache(ttl=60, timer=lambda: now))
+        asyncio.run(resolver.channel(1))
+        now = 61.0
+        asyncio.run(resolver.channel(1))
+        assert bot.fetch_channel.await_count == 2
+
+    def test_concurrent_lookups_share_a_fetch(self, bot, resolver):
+        async def fetch_channel(channel_id):
+            await asyncio.sleep(0.01)
+            return f"channel-{channel_id}"
+
+        bot.fetch_channel.side_effect = fetch_channel
+
+        async def resolve():
+            return await asyncio.gather(*(resolver.channel(1) for _ in range(10)))
+
+        assert asyncio.run(resolve()) == ["channel-1"] * 10
+        assert bot.fetch_channel.await_count == 1
+        assert resolver.stats()["shared_fetches"] == {"channel": 9}
+
+    def test_cancelled_fetch_doesnt_hang_waiters(self, bot, resolver):
+        started = []
+
+        async def fetch_channel(channel_id):
+            started.append(channel_id)
+            if len(started) == 1:
+                # The first fetch never finishes on its own
+                await asyncio.Event().wait()
+            return f"channel-{channel_id}"
+
+        bot.fetch_channel.side_effect = fetch_channel
+
+        async def resolve():
+            first = asyncio.create_task(resolver.channel(1))
+            await asyncio.sleep(0)
+            waiter = asyncio.create_task(resolver.channel(1))
+            await asyncio.sleep(0)
+            first.cancel()
+            result = await asyncio.wait_for(waiter, timeout=1)
+            with pytest.raises(asyncio.CancelledError):
+                await first
+            return result
+
+        assert asyncio.run(resolve()) == "channel-1"
+        assert bot.fetch_channel.await_count == 2
+        assert resolver._in_flight == {}
+
+    def test_failed_fetch_is_not_cached(self, bot, resolver):
+        bot.fetch_channel.side_effect = [RuntimeError("Not Found"), "channel-1"]
+        with pytest.raises(RuntimeError):
+            asyncio.run(resolver.channel(1))
+        assert asyncio.run(resolver.channel(1)) == "channel-1"
+
+    def test_invalidate(self, bot, resolver):
+        asyncio.run(resolver.channel(1))
+        resolver.invalidate("channel", 1)
+        asyncio.run(resolver.channel(1))
+        assert bot.fetch_channel.await_count == 2
+
+    def test_bot_tasks_alerts_reuse_channels(self, bot):
+        channel = MagicMock(send=AsyncMock())
+        bot.fetch_channel = AsyncMock(return_value=channel)
+        bot_tasks = BotTasks(bot)
+        config = GuildConfig(1, 2, "19:00", 0, 1, meeting_room=42)
+
+        async def alert():
+            await bot_tasks.first_alert(config, [123])
+            await bot_tasks.second_alert(config, [123])
+            await bot_tasks.cancel_alert_msg(config)
+
+        asyncio.run(alert())
+        bot.fetch_channel.assert_awaited_once_with(42)
+        assert channel.send.await_count == 3
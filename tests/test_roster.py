@@ -0,0 +1,83 @@
+import pytest
+
+from app.roster import Roster, RsvpBits
+
+
+def users(*ids: int) -> list[dict]:
+    return [{"name": f"player{i}", "id": i} for i in ids]
+
+
+class TestRoster:
+    @pytest.fixture
+    def roster(self):
+        return Roster([10, 20, 30])
+
+    def test_slots(self, roster):
+        assert roster.slots == {10: 0, 20: 1, 30: 2}
+        assert roster.everyone == 0b111
+        assert len(roster) == 3
+
+    def test_duplicates_share_a_slot(self):
+        assert Roster([10, 10, 20]).ids == (10, 20)
+
+    def test_mask(self, roster):
+        expected = 0b101
+        actual = roster.mask([10, 30, 99])
+        assert expected == actual
+
+    def test_members(self, roster):
+        expected = [10, 30]
+        actual = roster.members(0b101)
+        assert expected == actual
+
+    def test_new_players_keep_existing_slots(self, roster):
+        bigger = roster.with_player(40)
+        assert bigger.slots == {10: 0, 20: 1, 30: 2, 40: 3}
+        assert roster.with_player(20) is roster
+
+
+class TestRsvpBits:
+    @pytest.fixture
+    def bits(self):
+        return RsvpBits.from_lists(users(10, 20, 30), [], [])
+
+    def test_silent(self, bits):
+        assert bits.silent is True
+        assert bits.unanswered_ids() == ["dnd-players"]
+
+    def test_unanswered(self, bits):
+        bits = bits.accept(10).decline(30)
+        assert bits.unanswered_ids() == [20]
+        assert (bits.silent, bits.full) == (False, False)
+
+    def test_full(self, bits):
+        assert bits.accept(10).accept(20).accept(30).full is True
+
+    def test_accept_then_decline(self, bits):
+        bits = bits.accept(10).decline(10)
+        assert (bits.attendees, bits.decliners) == (0, 0b001)
+
+    def test_set(self, bits):
+        bits = bits.set("attendees", 20, True)
+        assert bits.attendees == 0b010
+        assert bits.set("attendees", 20, False).attendees == 0
+
+    def test_unregistered_users_are_ignored(self, bits):
+        assert bits.accept(99) == bits
+
+    def test_new_player_is_unanswered(self, bits):
+        bits = bits.accept(10).accept(20).accept(30).with_player(40)
+        assert bits.full is False
+        assert bits.unanswered_ids() == [40]
+
+    def test_empty_roster(self):
+        # Matches the list based checks: no players means everyone (no one) has accepted, and no one has answered
+        bits = RsvpBits.from_lists([], [], [])
+        assert bits.full is True
+        assert bits.unanswered_ids() == ["dnd-players"]
+
+    def test_large_roster(self):
+        players = users(*range(1000))
+        bits = RsvpBits.from_lists(players, players[:-1], [])
+        assert bits.full is False
+        assert bits.unanswered_ids() == [999]
@@ -0,0 +1,229 @@
+import asyncio
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app import constants, helpers
+from app.dispatcher import PhaseSummary
+from app.model.values import GuildConfig
+from app.scheduler import AlertScheduler
+
+
+def eastern(*args) -> datetime:
+    return constants.eastern_tz.localize(datetime(*args))
+
+
+def make_config(
+    guild_id=1, first_alert=0, second_alert=1, session_day=2, alerts=True, session_time="19:00"
+) -> GuildConfig:
+    return GuildConfig(guild_id, session_day, session_time, first_alert, second_alert, meeting_room=10, alerts=alerts)
+
+
+class FakeTracker:
+    def __init__(self, configs: dict[int, GuildConfig]):
+        self.configs = configs
+
+    async def get_config_for_guild(self, guild_id):
+        return self.configs.get(guild_id)
+
+    async def get_session_day_configs(self, day_of_week):
+        return [config for config in self.configs.values() if config.session_day == day_of_week and config.alerts]
+
+
+class Clock:
+    def __init__(self, now: datetime):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_next_weekday_at():
+    # 2024-01-01 was a Monday
+    now = eastern(2024, 1, 1, 9, 30)
+    assert helpers.next_weekday_at(0, 12, now) == eastern(2024, 1, 1, 12)
+    assert helpers.next_weekday_at(0, 9, now) == eastern(2024, 1, 8, 9)
+    assert helpers.next_weekday_at(2, 12, now) == eastern(2024, 1, 3, 12)
+
+
+def test_next_weekday_at_across_dst():
+    # Clocks went forward on 2024-03-10, but the alert should still go out at noon local time
+    actual = helpers.next_weekday_at(0, 12, eastern(2024, 3, 8, 12))
+    assert actual == eastern(2024, 3, 11, 12)
+    assert actual.utcoffset() == timedelta(hours=-4)
+
+
+class TestAlertScheduler:
+    @pytest.fixture
+    def clock(self):
+        # A Monday morning
+        return Clock(eastern(2024, 1, 1, 9))
+
+    @pytest.fixture
+    def dispatcher(self):
+        dispatcher = AsyncMock()
+        dispatcher.dispatch_guilds.side_effect = lambda phase, configs: PhaseSummary(phase, len(configs))
+        return dispatcher
+
+    @pytest.fixture
+    def tracker(self):
+        return FakeTracker(
+            {1: make_config(1), 2: make_config(2, first_alert=3, session_day=4), 3: make_config(3, alerts=False)}
+        )
+
+    @pytest.fixture
+    def scheduler(self, tracker, dispatcher, clock):
+        return AlertScheduler(tracker, dispatcher, alert_hour=12, clock=clock)
+
+    def dispatched(self, dispatcher) -> list[tuple[str, list[int]]]:
+        return [
+            (call.args[0], sorted(config.guild for config in call.args[1]))
+            for call in dispatcher.dispatch_guilds.await_args_list
+        ]
+
+    def test_load(self, scheduler):
+        assert asyncio.run(scheduler.load()) == 2
+        pending = scheduler.pending()
+        assert {alert.guild_id for alert in pending} == {1, 2}
+        assert [(alert.phase, alert.when) for alert in pending if alert.guild_id == 1] == [
+            ("first-alert", eastern(2024, 1, 1, 12)),
+            ("second-alert", eastern(2024, 1, 2, 12)),
+            ("session-dm", eastern(2024, 1, 3, 12)),
+            ("reset", eastern(2024, 1, 4, 12)),
+        ]
+
+    @pytest.mark.parametrize("session_time, hour", [("19:00", 12), ("12:00", 11), ("10:30", 10)])
+    def test_session_day_alerts_come_before_the_session(self, scheduler, session_time, hour):
+        # The second alert is on the session day too
+        scheduler.schedule(1, make_config(1, second_alert=2, session_time=session_time))
+        phases = {alert.phase: alert.when for alert in scheduler.pending()}
+        assert phases["first-alert"] == eastern(2024, 1, 1, 12)
+        assert phases["second-alert"] == phases["session-dm"] == eastern(2024, 1, 3, hour)
+        assert phases["reset"] == eastern(2024, 1, 4, 12)
+
+    def test_next_alert(self, scheduler):
+        asyncio.run(scheduler.load())
+        alert = scheduler.next_alert()
+        assert (alert.guild_id, alert.phase, alert.when) == (1, "first-alert", eastern(2024, 1, 1, 12))
+
+    def test_reschedule_replaces_old_alerts(self, scheduler, tracker):
+        asyncio.run(scheduler.load())
+        tracker.configs[1] = make_config(1, first_alert=5, second_alert=6, session_day=0)
+        asyncio.run(scheduler.reschedule(1))
+        phases = {alert.phase: alert.when for alert in scheduler.pending() if alert.guild_id == 1}
+        assert phases["first-alert"] == eastern(2024, 1, 6, 12)
+        assert len([alert for alert in scheduler.pending() if alert.guild_id == 1]) == 4
+
+    def test_unschedule(self, scheduler):
+        asyncio.run(scheduler.load())
+        scheduler.unschedule(1)
+        assert {alert.guild_id for alert in scheduler.pending()} == {2}
+        assert scheduler.next_alert().guild_id == 2
+
+    def test_nothing_due(self, scheduler, dispatcher):
+        asyncio.run(scheduler.load())
+        assert asyncio.run(scheduler.run_due()) == []
+        dispatcher.dispatch_guilds.assert_not_awaited()
+
+    def test_run_due(self, scheduler, dispatcher, clock):
+        asyncio.run(scheduler.load())
+        clock.now = eastern(2024, 1, 1, 12)
+        summaries = asyncio.run(scheduler.run_due())
+        assert [summary.name for summary in summaries] == ["first-alert"]
+        assert self.dispatched(dispatcher) == [("first-alert", [1])]
+        # It's then scheduled for the following week
+        phases = {alert.phase: alert.when for alert in scheduler.pending() if alert.guild_id == 1}
+        assert phases["first-alert"] == eastern(2024, 1, 8, 12)
+
+    def test_catches_up_on_missed_alerts(self, scheduler, dispatcher, clock):
+        asyncio.run(scheduler.load())
+        clock.now = eastern(2024, 1, 3, 13)
+        asyncio.run(scheduler.run_due())
+        assert self.dispatched(dispatcher) == [("first-alert", [1]), ("second-alert", [1, 2]), ("session-dm", [1])]
+
+    def test_removed_config_is_not_alerted(self, scheduler, dispatcher, tracker, clock):
+        asyncio.run(scheduler.load())
+        del tracker.configs[1]
+        clock.now = eastern(2024, 1, 1, 12)
+        asyncio.run(scheduler.run_due())
+        dispatcher.dispatch_guilds.assert_not_awaited()
+        assert {alert.guild_id for alert in scheduler.pending()} == {2}
+
+    def test_run_sleeps_until_next_alert(self, tracker, dispatcher):
+        # Due in 50ms
+        clock = Clock(helpers.next_weekday_at(0, 12, eastern(2024, 1, 1, 9)) - timedelta(milliseconds=50))
+        scheduler = AlertScheduler(tracker, dispatcher, alert_hour=12, clock=clock)
+
+        async def run():
+            task = scheduler.start()
+            await asyncio.sleep(0.01)
+            assert dispatcher.dispatch_guilds.await_count == 0
+            clock.now = eastern(2024, 1, 1, 12)
+            await asyncio.sleep(0.1)
+            task.cancel()
+
+        asyncio.run(run())
+        assert self.dispatched(dispatcher) == [("first-alert", [1])]
+
+    def test_schedule_wakes_up_run(self, dispatcher, clock):
+        tracker = FakeTracker({})
+        scheduler = AlertScheduler(tracker, dispatcher, alert_hour=12, clock=clock)
+
+        async def run():
+            task = scheduler.start()
+            await asyncio.sleep(0.01)
+            # Nothing was scheduled on startup, so the loop is waiting without a timeout until something is
+            tracker.configs[1] = make_config(1)
+            clock.now = eastern(2024, 1, 1, 11, 59, 59, 950000)
+            scheduler.schedule(1, make_config(1))
+            await asyncio.sleep(0.01)
+            clock.now = eastern(2024, 1, 1, 12)
+            await asyncio.sleep(0.1)
+            task.cancel()
+
+        asyncio.run(run())
+        assert self.dispatched(dispatcher) == [("first-alert", [1])]
+
+    def test_run_retries_load(self, tracker, dispatcher, caplog):
+        clock = Clock(helpers.next_weekday_at(0, 12, eastern(2024, 1, 1, 9)) - timedelta(milliseconds=50))
+        scheduler = AlertScheduler(tracker, dispatcher, alert_hour=12, clock=clock, load_retry_delay=0.01)
+        get_session_day_configs = tracker.get_session_day_configs
+        failures = []
+
+        async def unreachable_once(day_of_week):
+            if not failures:
+                failures.append(day_of_week)
+                raise ConnectionError("Database is unreachable")
+            return await get_session_day_configs(day_of_week)
+
+        tracker.get_session_day_configs = unreachable_once
+
+        async def run():
+            task = scheduler.start()
+            await asyncio.sleep(0.05)
+            clock.now = eastern(2024, 1, 1, 12)
+            await asyncio.sleep(0.1)
+            await scheduler.stop()
+            return task
+
+        task = asyncio.run(run())
+        assert task.cancelled()
+        assert "Couldn't load the alert schedule" in caplog.text
+        # The loop kept going once the configs loaded, and sent the alerts that came due
+        assert self.dispatched(dispatcher) == [("first-alert", [1])]
+
+    def test_stop(self, tracker, dispatcher, clock):
+        scheduler = AlertScheduler(tracker, dispatcher, alert_hour=12, clock=clock)
+
+        async def run():
+            task = scheduler.start()
+            await asyncio.sleep(0.01)
+            await scheduler.stop()
+            # Stopping twice (or before starting) does nothing
+            await scheduler.stop()
+            return task
+
+        task = asyncio.run(run())
+        assert task.cancelled()
+        assert scheduler._task is None
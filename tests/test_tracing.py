@@ -0,0 +1,127 @@
+import asyncio
+import inspect
+import logging
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import mongoengine
+import mongomock
+import pytest
+
+from app.board import SessionBoard
+from app.db.mongo_async import AsyncMongo
+from app.db.mongo_odm import MongoEngine
+from app.db.tracing import CommandCounter, TracingDB, trace
+from app.db_client import Tracker
+from app.model.dao import User
+
+
+class TestTracingDB:
+    @pytest.fixture
+    def test_player(self):
+        return User(name="test", id=123)
+
+    @pytest.fixture
+    def tracker(self, async_mongo_client, test_player):
+        tracker = Tracker(TracingDB(AsyncMongo(client=async_mongo_client)))
+
+        async def seed():
+            await tracker.register_player(guild_id=1, player_username=test_player.name, player_id=test_player.id)
+
+        asyncio.run(seed())
+        return tracker
+
+    def test_calls_are_traced(self, tracker, test_player):
+        async def accept():
+            await tracker.is_registered_player(1, test_player)
+            await tracker.accept_for_guild(1, test_player)
+            await tracker.is_full_group(1)
+
+        with trace("rsvp accept") as accepted:
+            asyncio.run(accept())
+        # Read the roster, write the RSVP, then one bulk read for the rest of the RSVP state
+        assert accepted.methods() == ["get_players_for_guild", "accept_for_guild", "get_rsvp_state_for_guilds"]
+        assert [call.guild_id for call in accepted.calls] == [1, 1, [1]]
+        assert "rsvp accept: 3 db calls" in str(accepted)
+
+    def test_nothing_is_collected_outside_a_trace(self, tracker):
+        with trace("before") as before:
+            pass
+        asyncio.run(tracker.get_players_for_guild(1))
+        assert before.calls == []
+
+    def test_blocking_backend_stays_blocking(self, test_player):
+        mongoengine.connect(db="mongoenginetest", host="mongodb://localhost", mongo_client_class=mongomock.MongoClient)
+        try:
+            db = MongoEngine()
+            db.connect = lambda conn_str=None: None
+            tracing = TracingDB(db)
+            assert not inspect.iscoroutinefunction(tracing.register_player)
+            tracker = Tracker(tracing)
+
+            async def register():
+                await tracker.register_player(guild_id=1, player_username=test_player.name, player_id=test_player.id)
+
+            # Run in a worker thread, which still records into the trace
+            with trace("register") as registered:
+                asyncio.run(register())
+            assert registered.methods() == ["register_player"]
+        finally:
+            mongoengine.disconnect()
+
+    def test_slow_calls_are_logged(self, tracker, caplog):
+        tracker.db.slow_threshold = 0
+        with caplog.at_level(logging.WARNING):
+            asyncio.run(tracker.reset_guilds([1, 2]))
+        assert "Slow call: reset_guilds(guild [1, 2])" in caplog.text
+
+    def test_mongo_ops_are_counted(self):
+        counter = CommandCounter()
+
+        class Backend:
+            def get_players_for_guild(self, guild_id: int):
+                # What pymongo does for each command it sends
+                counter.started(MagicMock())
+                counter.started(MagicMock())
+                return []
+
+        with trace("players") as players:
+            TracingDB(Backend()).get_players_for_guild(7)
+        counter.started(MagicMock())  # Outside of a traced call
+        assert str(players.calls[0]).startswith("get_players_for_guild(guild 7)")
+        assert players.mongo_ops == 2
+
+    def test_command_hooks(self, tracker, test_player, caplog):
+        group = SimpleNamespace(qualified_name="rsvp")
+        accept = SimpleNamespace(qualified_name="rsvp accept")
+        ctx = MagicMock(spec=["command", "invoked_subcommand"], command=group, invoked_subcommand=accept)
+
+        async def invoke():
+            await tracker.db.command_started(ctx)
+            await tracker.db.command_finished(ctx)
+            ctx.command = accept
+            await tracker.db.command_started(ctx)
+            await tracker.accept_for_guild(1, test_player)
+            await tracker.db.command_finished(ctx)
+
+        with caplog.at_level(logging.INFO):
+            asyncio.run(invoke())
+        assert "[db] rsvp accept: 1 db calls" in caplog.text
+
+    def test_background_tasks_arent_traced_with_the_command(self, tracker, test_player):
+        board = SessionBoard(tracker, MagicMock(channel=AsyncMock()), MagicMock(), delay=0)
+        accept = SimpleNamespace(qualified_name="rsvp accept")
+        ctx = MagicMock(spec=["command", "invoked_subcommand"], command=accept, invoked_subcommand=None)
+
+        async def invoke():
+            await tracker.db.command_started(ctx)
+            await tracker.accept_for_guild(1, test_player)
+            # The board is redrawn while the command is still running
+            await board.request_update(1)
+            command_trace = ctx.db_trace
+            await tracker.db.command_finished(ctx)
+            return command_trace
+
+        command_trace = asyncio.run(invoke())
+        assert "get_config_for_guild" not in command_trace.methods()
+        assert command_trace.methods()[-1] == "accept_for_guild"
@@ -0,0 +1,78 @@
+import dataclasses
+
+import pytest
+
+from app.model.values import GuildConfig, PlayerRef, RsvpSnapshot, players_from_docs
+
+
+@pytest.fixture
+def config_doc() -> dict:
+    return {
+        "guild": 1,
+        "config": {
+            "session-day": 2,
+            "session-time": "19:00",
+            "first-alert": 0,
+            "second-alert": 1,
+            "meeting-room": 42,
+            "vc-id": 1123,
+            "session-dm": {"name": "dm", "id": 7},
+            "alerts": True,
+            "cancel-session": False,
+        },
+    }
+
+
+class TestPlayerRef:
+    def test_hashed_by_id(self):
+        # Renaming a discord account doesn't make it a different player
+        assert PlayerRef(123, "old") == PlayerRef(123, "new")
+        assert len({PlayerRef(123, "old"), PlayerRef(123, "new"), PlayerRef(456, "other")}) == 2
+
+    def test_round_trip(self):
+        doc = {"name": "test", "id": 123}
+        assert PlayerRef.from_doc(doc).to_doc() == doc
+        assert players_from_docs([doc, {"name": "test2", "id": 456}]) == (PlayerRef(123), PlayerRef(456))
+        assert players_from_docs(None) == ()
+
+    def test_frozen_and_slotted(self):
+        player = PlayerRef(123, "test")
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            player.id = 456
+        assert not hasattr(player, "__dict__")
+
+
+class TestGuildConfig:
+    def test_from_doc(self, config_doc):
+        config = GuildConfig.from_doc(config_doc)
+        assert (config.guild, config.session_day, config.meeting_room, config.vc_id) == (1, 2, 42, 1123)
+        assert config.session_dm == PlayerRef(7, "dm")
+        assert config.board_message is None
+
+    def test_unconfigured(self):
+        assert GuildConfig.from_doc({}) is None
+        assert GuildConfig.from_doc(None) is None
+        assert GuildConfig.from_doc({"guild": 1, "config": None}) is None
+
+    def test_hashed_by_guild(self, config_doc):
+        config = GuildConfig.from_doc(config_doc)
+        cancelled = dataclasses.replace(config, cancel_session=True)
+        assert config != cancelled
+        assert hash(config) == hash(cancelled) == hash(1)
+
+
+class TestRsvpSnapshot:
+    def test_from_state(self, config_doc):
+        players = [{"name": "test", "id": 123}, {"name": "test2", "id": 456}]
+        state = {"players": players, "attendees": players[:1], "decliners": [], "config": config_doc}
+        snapshot = RsvpSnapshot.from_state(1, state)
+        assert snapshot.attendees == (PlayerRef(123, "test"),)
+        assert not snapshot.cancelled
+        bits = snapshot.bits()
+        assert not bits.full
+        assert bits.unanswered_ids() == [456]
+
+    def test_unconfigured_guild_is_not_cancelled(self):
+        snapshot = RsvpSnapshot.from_state(2, {"players": [], "attendees": [], "decliners": [], "config": {}})
+        assert snapshot == RsvpSnapshot(2)
+        assert not snapshot.cancelled
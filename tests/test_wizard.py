@@ -0,0 +1,81 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app import helpers
+from app.wizard import ConfigWizard, DaySelect, SessionTimeModal
+
+
+def make_interaction(user_id: int = 1):
+    interaction = MagicMock()
+    interaction.user.id = user_id
+    interaction.response.defer = AsyncMock()
+    interaction.response.send_message = AsyncMock()
+    interaction.response.send_modal = AsyncMock()
+    return interaction
+
+
+def test_parse_session_time():
+    assert helpers.parse_session_time(" 7:30 ") == "07:30"
+    assert helpers.parse_session_time("19:00") == "19:00"
+    assert helpers.parse_session_time("25:00") is None
+    assert helpers.parse_session_time("tonight") is None
+
+
+class TestConfigWizard:
+    @pytest.fixture
+    def author(self):
+        return MagicMock(id=1)
+
+    def test_layout(self, author):
+        async def build():
+            return ConfigWizard(author)
+
+        wizard = asyncio.run(build())
+        selects = [item for item in wizard.children if isinstance(item, DaySelect)]
+        assert [select.key for select in selects] == ["session-day", "first-alert", "second-alert"]
+        assert all(len(select.options) == 7 for select in selects)
+
+    def test_answers_and_save(self, author):
+        async def configure():
+            wizard = ConfigWizard(author)
+            for select, day in zip([item for item in wizard.children if isinstance(item, DaySelect)], (2, 0, 1)):
+                select._values = [str(day)]
+                await select.callback(make_interaction())
+
+            # Can't be saved without a time
+            await wizard.save.callback(make_interaction())
+            assert not wizard.saved
+
+            modal = SessionTimeModal(wizard)
+            modal.session_time._value = "19:30"
+            await modal.on_submit(make_interaction())
+            await wizard.save.callback(make_interaction())
+            return wizard, await wizard.wait()
+
+        wizard, timed_out = asyncio.run(configure())
+        assert (wizard.saved, timed_out) == (True, False)
+        assert wizard.answers == {"session-day": 2, "first-alert": 0, "second-alert": 1, "session-time": "19:30"}
+
+    def test_invalid_time(self, author):
+        async def configure():
+            wizard = ConfigWizard(author)
+            modal = SessionTimeModal(wizard)
+            modal.session_time._value = "soon"
+            interaction = make_interaction()
+            await modal.on_submit(interaction)
+            return wizard, interaction
+
+        wizard, interaction = asyncio.run(configure())
+        assert "session-time" not in wizard.answers
+        interaction.response.send_message.assert_awaited_once()
+
+    def test_only_the_author_can_answer(self, author):
+        async def check():
+            wizard = ConfigWizard(author)
+            return await wizard.interaction_check(make_interaction(1)), await wizard.interaction_check(
+                make_interaction(2)
+            )
+
+        assert asyncio.run(check()) == (True, False)